@@ -0,0 +1,147 @@
+# benchmarks/bench_activity.py
+# Coste del registro de actividad (utils/activity.py) en las escrituras:
+# dos servidores sobre la misma base, uno con ACTIVITY_ENABLED=0 y otro con 1,
+# cargados por turnos con altas de comentarios y cambios de estado de tareas.
+# Con el registro, cada escritura sólo encola su fila; la inserción va por
+# lotes fuera de la petición. Falla si la mediana del p50 de las escrituras
+# empeora más de --max-overhead.
+#
+#   cd backend && python -m benchmarks.bench_activity --concurrency 20
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+import httpx
+
+from benchmarks import common
+
+common.use_local_database()
+
+from sqlalchemy import select  # noqa: E402
+
+import models  # noqa: E402
+from database import engine  # noqa: E402
+
+STATUSES = ["todo", "in_progress", "review", "done"]
+
+def load_writers() -> list:
+    # (cabeceras, proyecto, tareas del proyecto) por miembro
+    with engine.connect() as conn:
+        members = conn.execute(
+            select(models.Membership.user_id, models.Membership.project_id, models.User.email)
+            .join(models.User, models.User.user_id == models.Membership.user_id)
+        ).all()
+        tasks = {}
+        for task_id, project_id, title, due_date, assigned_to in conn.execute(select(
+            models.Task.task_id, models.Task.project_id, models.Task.title, models.Task.due_date,
+            models.Task.assigned_to
+        )):
+            tasks.setdefault(project_id, []).append({
+                "task_id": task_id, "title": title, "description": "Tarea de benchmark",
+                "due_date": due_date.isoformat(), "assigned_to": assigned_to,
+            })
+    return [(common.auth_headers(email), user_id, project_id, tasks[project_id])
+            for user_id, project_id, email in members]
+
+async def run_writes(base_url: str, writers, concurrency: int, total: int, seed: int) -> dict:
+    latencies, errors = [], 0
+    remaining = total
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker(worker_id: int):
+            nonlocal remaining, errors
+            rng = random.Random(seed * 1000 + worker_id)
+            while remaining > 0:
+                remaining -= 1
+                headers, user_id, project_id, tasks = rng.choice(writers)
+                if rng.random() < 0.5:
+                    request = client.post("/api/comments/", headers=headers, json={
+                        "content": "Comentario de benchmark", "project_id": project_id, "user_id": user_id,
+                    })
+                else:
+                    task = rng.choice(tasks)
+                    body = {key: value for key, value in task.items() if key != "task_id"}
+                    request = client.put(f"/api/tasks/{task['task_id']}", headers=headers,
+                                         json={**body, "status": rng.choice(STATUSES)})
+                start = time.perf_counter()
+                try:
+                    response = await request
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return common.summarize(latencies, errors, elapsed)
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=1000, help="Escrituras por ronda y servidor")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--max-overhead", type=float, default=0.10,
+                        help="Empeoramiento máximo del p50 de las escrituras (mediana de las rondas)")
+    args = parser.parse_args()
+
+    common.reset_database()
+    common.seed(users=100, projects=20, tasks_per_project=50, comments_per_project=0, members_per_project=5)
+    writers = load_writers()
+
+    env = {"PASSWORD_POOL_SIZE": "0"}
+    with common.serve("main:app", env={**env, "ACTIVITY_ENABLED": "0"}, with_process=True) as off, \
+            common.serve("main:app", env={**env, "ACTIVITY_ENABLED": "1"}, with_process=True) as on:
+        servers = {"sin registro": off, "con registro": on}
+        for base_url, _ in servers.values():
+            asyncio.run(run_writes(base_url, writers, args.concurrency, args.warmup, seed=-1))
+
+        rounds = {name: [] for name in servers}
+        for round_ in range(args.rounds):
+            # Se alterna quién va primero; la pausa deja terminar el volcado
+            # para que no compita por la base de datos con el otro servidor
+            order = list(servers) if round_ % 2 == 0 else list(servers)[::-1]
+            for name in order:
+                base_url, proc = servers[name]
+                cpu = common.cpu_seconds(proc.pid)
+                result = asyncio.run(run_writes(base_url, writers, args.concurrency, args.requests, seed=round_))
+                result["cpu_ms"] = (common.cpu_seconds(proc.pid) - cpu) * 1000 / result["requests"]
+                rounds[name].append(result)
+                time.sleep(1.5)
+        stats = httpx.get(on[0] + "/activity/stats").json()
+
+    print(f"\nEscrituras, c={args.concurrency} (mediana de {args.rounds} rondas)")
+    print(f"{'caso':<16}{'req':>8}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'CPU ms/req':>12}")
+    summary = {}
+    for name, results in rounds.items():
+        summary[name] = {key: statistics.median(r[key] for r in results)
+                         for key in ("requests", "errors", "rps", "p50_ms", "p95_ms", "cpu_ms")}
+        r = summary[name]
+        print(f"{name:<16}{r['requests']:>8.0f}{r['errors']:>6.0f}{r['rps']:>10.1f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['cpu_ms']:>12.2f}")
+    rows_per_batch = stats["flushed"] / stats["batches"] if stats["batches"] else 0
+    print(f"\nRegistro: {stats['flushed']} filas en {stats['batches']} inserciones "
+          f"({rows_per_batch:.0f} filas por lote), {stats['pending']} en cola, {stats['failures']} fallos")
+
+    failed = []
+    overhead = summary["con registro"]["p50_ms"] / summary["sin registro"]["p50_ms"] - 1
+    print(f"Sobrecoste del p50: {overhead:+.1%}")
+    if overhead > args.max_overhead:
+        failed.append(f"el p50 empeora {overhead:.1%} > {args.max_overhead:.0%}")
+    if any(r["errors"] for r in summary.values()):
+        failed.append("hay escrituras con error")
+    if stats["failures"] or stats["pending"]:
+        failed.append("el registro no ha volcado todas las filas")
+    for failure in failed:
+        print(f"FAIL {failure}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+# benchmarks/bench_async_db.py
+# Compara el camino síncrono (Session + threadpool) con el asíncrono
+# (AsyncSession) sobre la misma consulta de tareas por proyecto: la misma
+# página keyset serializada igual, y sin caché de respuestas, para que sólo
+# cambie el acceso a la base.
+#
+#   cd backend && python -m benchmarks.bench_async_db --concurrency 50 200 1000
+import argparse
+import asyncio
+
+from benchmarks import common
+
+common.use_local_database()
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import models  # noqa: E402
+import schemas  # noqa: E402
+from database import get_db  # noqa: E402
+from routes import tasks  # noqa: E402
+from utils.pagination import keyset, make_page, DEFAULT_PAGE_SIZE  # noqa: E402
+from utils.serialization import json_response  # noqa: E402
+
+app = FastAPI()
+app.include_router(tasks.router, prefix="/async/tasks")
+
+@app.get("/")
+async def root():
+    return {"status": "ok"}
+
+# Réplica síncrona de get_project_tasks: mismas consultas y misma respuesta
+@app.get("/sync/tasks/project/{project_id}/tasks", response_model=schemas.Page[schemas.TaskResponse])
+def get_project_tasks_sync(project_id: int, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                           db: Session = Depends(get_db)):
+    project = db.execute(
+        select(models.Project.title, models.Project.status)
+        .where(models.Project.project_id == project_id)
+    ).first()
+    query = tasks.PROJECT_TASK_ROWS.select().where(models.Task.project_id == project_id)
+    rows = db.execute(keyset(query, [models.Task.task_id], cursor, limit)).all()
+    return json_response(make_page(
+        rows, lambda t: (t.task_id,), limit,
+        tasks.PROJECT_TASK_ROWS.transform(project_title=project.title, project_status=project.status)
+    ))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--projects", type=int, default=20)
+    args = parser.parse_args()
+
+    common.reset_database()
+    common.seed(projects=args.projects)
+
+    rows = []
+    # Sin caché de respuestas: la ruta asíncrona es @cached_response
+    with common.serve("benchmarks.bench_async_db:app", env={"RESPONSE_CACHE_TTL": "0"}) as base_url:
+        for concurrency in args.concurrency:
+            for mode in ("sync", "async"):
+                paths = [f"/{mode}/tasks/project/{p}/tasks" for p in range(1, args.projects + 1)]
+                result = asyncio.run(common.run_load(base_url, paths, concurrency, args.requests))
+                rows.append((f"{mode} c={concurrency}", result))
+
+    common.print_table("Sync vs async: GET tasks/project/{id}/tasks", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_bulk_tasks.py
+# Tareas por segundo creando una a una (POST /api/tasks/) frente al lote
+# (POST /api/tasks/bulk) y actualizando en lote (PATCH /api/tasks/bulk).
+#
+#   cd backend && python -m benchmarks.bench_bulk_tasks --rows 2000 --min-speedup 50
+import argparse
+import sys
+import time
+
+from benchmarks import common
+
+common.use_local_database()
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import app  # noqa: E402
+
+def task_payload(i: int, projects: int, users: int) -> dict:
+    return {
+        "title": f"Tarea {i}",
+        "description": "Tarea importada de benchmark",
+        "due_date": "2030-01-01T00:00:00",
+        "project_id": i % projects + 1,
+        "assigned_to": i % users + 1,
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000, help="Tareas del lote")
+    parser.add_argument("--single-rows", type=int, default=200, help="Tareas creadas una a una")
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--min-speedup", type=float, default=50.0)
+    args = parser.parse_args()
+
+    common.reset_database()
+    common.seed(users=args.users, projects=args.projects, tasks_per_project=0,
+                comments_per_project=0, members_per_project=1)
+    client = TestClient(app, headers=common.auth_headers("user1@example.com"))
+
+    start = time.perf_counter()
+    for i in range(args.single_rows):
+        client.post("/api/tasks/", json=task_payload(i, args.projects, args.users)).raise_for_status()
+    single_rate = args.single_rows / (time.perf_counter() - start)
+
+    payload = [task_payload(i, args.projects, args.users) for i in range(args.rows)]
+    start = time.perf_counter()
+    result = client.post("/api/tasks/bulk", json=payload).raise_for_status().json()
+    bulk_rate = args.rows / (time.perf_counter() - start)
+    assert result["count"] == args.rows and not result["errors"], result
+
+    task_ids = result["task_ids"] or range(1, args.rows + 1)
+    updates = [{"task_id": task_id, "status": "done"} for task_id in task_ids]
+    start = time.perf_counter()
+    result = client.patch("/api/tasks/bulk", json=updates).raise_for_status().json()
+    update_rate = len(updates) / (time.perf_counter() - start)
+    assert result["count"] == len(updates) and not result["errors"], result
+
+    speedup = bulk_rate / single_rate
+    print(f"{'caso':<24}{'tareas/s':>12}")
+    print(f"{'POST /api/tasks/':<24}{single_rate:>12.0f}")
+    print(f"{'POST /api/tasks/bulk':<24}{bulk_rate:>12.0f}")
+    print(f"{'PATCH /api/tasks/bulk':<24}{update_rate:>12.0f}")
+    print(f"speedup de creación: {speedup:.1f}x")
+    if speedup < args.min_speedup:
+        print(f"FAIL: el lote es {speedup:.1f}x (< {args.min_speedup}x) la creación una a una")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# benchmarks/bench_cache.py
+# Corrección de la caché de respuestas (utils/response_cache.py): dos
+# servidores sobre la misma base, uno con la caché y otro sin ninguna caché
+# de proceso (respuestas, permisos y tokens con TTL 0) como referencia. Tras cada ruta de
+# escritura, atendida por el primero, las lecturas cacheadas de los proyectos
+# deben coincidir en ambos; falla con la primera escritura que deje una
+# respuesta obsoleta. Informa también de la latencia de las lecturas con y
+# sin caché.
+#
+#   cd backend && python -m benchmarks.bench_cache
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+import httpx
+
+from benchmarks import common
+
+common.use_local_database()
+
+from sqlalchemy import text  # noqa: E402
+
+from database import engine  # noqa: E402
+
+TASK = {"title": "Tarea", "description": "Tarea de benchmark", "status": "todo",
+        "due_date": "2030-01-01T00:00:00"}
+
+# La referencia tampoco cachea permisos: no ve las invalidaciones del otro proceso
+UNCACHED = {"RESPONSE_CACHE_TTL": "0", "MEMBERSHIP_CACHE_TTL": "0", "TOKEN_CACHE_TTL": "0"}
+
+# Escrituras que no tocan datos de proyectos
+NOT_PROJECT_WRITES = {"POST /api/auth/login", "PUT /profiler"}
+
+def reads(project_id: int) -> list:
+    # Las lecturas con @cached_response, con y sin cursor
+    return [
+        f"/api/projects/{project_id}",
+        f"/api/tasks/project/{project_id}/tasks",
+        f"/api/tasks/project/{project_id}/tasks?limit=1",
+        f"/api/comments/project/{project_id}/comments",
+        f"/api/memberships/project/{project_id}/memberships",
+        f"/api/files/project/{project_id}/files",
+    ]
+
+def last_id(table: str, column: str) -> int:
+    # Las respuestas de alta de tareas, comentarios y membresías no llevan id
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT MAX({column}) FROM {table}")).scalar()
+
+def writes(projects: list) -> list:
+    # (nombre, función(cliente)) de cada ruta de escritura, en un orden en el
+    # que todas tienen sobre qué actuar
+    p, q = projects
+    ids = {}
+
+    def call(client, method, url, code=200, **kwargs):
+        response = client.request(method, url, **kwargs)
+        if response.status_code != code:
+            raise AssertionError(f"{method} {url}: {response.status_code} {response.text}")
+        return response.json() if response.content else None
+
+    def new_upload(client):
+        ids["upload"] = call(client, "POST", "/api/files/uploads", json={
+            "project_id": p, "file_name": "partes.bin"})["upload_id"]
+
+    def complete_upload(client):
+        ids["completed"] = call(client, "POST", f"/api/files/uploads/{ids['upload']}/complete")["file_id"]
+
+    def new_membership(client):
+        call(client, "POST", "/api/memberships/", json={"user_id": ids["user"], "project_id": p, "role": "viewer"})
+        ids["membership"] = last_id("memberships", "membership_id")
+
+    def new_user(client):
+        ids["user"] = call(client, "POST", "/api/users/", json={
+            "name": "Temporal", "email": "temporal@example.com", "password": "Passw0rd!"})["user_id"]
+
+    return [
+        ("POST /api/users/", new_user),
+        ("PUT /api/projects/{project_id}", lambda c: call(c, "PUT", f"/api/projects/{p}", json={
+            "title": "Proyecto editado", "description": "Proyecto de benchmark", "status": "completed"})),
+        ("POST /api/projects/{project_id}/members", lambda c: call(c, "POST", f"/api/projects/{p}/members", json={
+            "user_id": 2, "project_id": p, "role": "member"})),
+        ("POST /api/memberships/", new_membership),
+        ("POST /api/memberships/bulk", lambda c: call(c, "POST", "/api/memberships/bulk", json=[
+            {"user_id": 3, "project_id": p, "role": "viewer"}])),
+        ("POST /api/memberships/bulk?on_conflict=update", lambda c: call(
+            c, "POST", "/api/memberships/bulk?on_conflict=update", json=[
+                {"user_id": 3, "project_id": p, "role": "member", "is_active": False}])),
+        ("PUT /api/memberships/{membership_id}", lambda c: call(
+            c, "PUT", f"/api/memberships/{last_id('memberships', 'membership_id')}", json={"role": "member"})),
+        ("POST /api/tasks/", lambda c: call(c, "POST", "/api/tasks/", json={
+            **TASK, "project_id": p, "assigned_to": 2})),
+        ("POST /api/tasks/bulk", lambda c: call(c, "POST", "/api/tasks/bulk", json=[
+            {**TASK, "project_id": p, "assigned_to": 1}, {**TASK, "project_id": q, "assigned_to": 1}])),
+        ("PATCH /api/tasks/bulk", lambda c: call(c, "PATCH", "/api/tasks/bulk", json=[
+            {"task_id": last_id("tasks", "task_id") - 1, "status": "done"}])),
+        ("PUT /api/tasks/{task_id}", lambda c: call(c, "PUT", f"/api/tasks/{last_id('tasks', 'task_id') - 1}", json={
+            **TASK, "title": "Tarea editada", "status": "in_progress", "assigned_to": 2})),
+        ("POST /api/comments/", lambda c: call(c, "POST", "/api/comments/", json={
+            "content": "Comentario", "project_id": p, "user_id": 1})),
+        ("PUT /api/comments/{comment_id}", lambda c: call(
+            c, "PUT", f"/api/comments/{last_id('comments', 'comment_id')}", json={"content": "Editado"})),
+        ("POST /api/files/", lambda c: call(c, "POST", "/api/files/", json={
+            "file_name": "enlace", "file_url": "https://example.com/a.pdf", "project_id": p, "user_id": 1})),
+        ("POST /api/files/upload", lambda c: call(
+            c, "POST", f"/api/files/upload?project_id={p}&file_name=directo.bin", content=b"contenido")),
+        ("POST /api/files/uploads", new_upload),
+        ("PUT /api/files/uploads/{upload_id}/parts/{part_number}", lambda c: call(
+            c, "PUT", f"/api/files/uploads/{ids['upload']}/parts/1", content=b"parte")),
+        ("POST /api/files/uploads/{upload_id}/complete", complete_upload),
+        ("DELETE /api/files/uploads/{upload_id}", lambda c: call(c, "DELETE", "/api/files/uploads/" + call(
+            c, "POST", "/api/files/uploads", json={"project_id": p, "file_name": "cancelada.bin"})["upload_id"], 204)),
+        ("DELETE /api/files/{file_id}", lambda c: call(c, "DELETE", f"/api/files/{ids['completed']}", 204)),
+        ("PUT /api/users/{user_id}", lambda c: call(c, "PUT", "/api/users/2", json={"name": "Renombrado"})),
+        ("DELETE /api/comments/{comment_id}", lambda c: call(
+            c, "DELETE", f"/api/comments/{last_id('comments', 'comment_id')}", 204)),
+        ("DELETE /api/tasks/{task_id}", lambda c: call(c, "DELETE", f"/api/tasks/{last_id('tasks', 'task_id') - 1}", 204)),
+        # Sin membresías: borrar un usuario que las tiene no está permitido
+        ("DELETE /api/memberships/{membership_id}", lambda c: call(c, "DELETE", f"/api/memberships/{ids['membership']}", 204)),
+        ("DELETE /api/users/{user_id}", lambda c: call(c, "DELETE", f"/api/users/{ids['user']}", 204)),
+        ("DELETE /api/projects/{project_id}", lambda c: call(c, "DELETE", f"/api/projects/{q}", 204)),
+        # En SQLite el nuevo reutiliza el id del borrado
+        ("POST /api/projects/", lambda c: call(c, "POST", "/api/projects/", json={
+            "title": "Proyecto nuevo", "description": "Proyecto de benchmark", "owner_id": 1})),
+    ]
+
+def write_routes() -> set:
+    # Todas las rutas de escritura de la app, del esquema de OpenAPI
+    import main
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        paths = main.app.openapi()["paths"]
+    return {f"{method.upper()} {path}" for path, operations in paths.items() for method in operations
+            if method in ("post", "put", "patch", "delete")} - NOT_PROJECT_WRITES
+
+def snapshot(client: httpx.Client, paths) -> list:
+    return [(client.get(path).status_code, client.get(path).content) for path in paths]
+
+def timed(client: httpx.Client, paths, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in paths:
+            client.get(path).raise_for_status()
+    return (time.perf_counter() - start) * 1000 / (repeat * len(paths))
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200, help="Lecturas por ruta para medir la latencia")
+    args = parser.parse_args()
+
+    common.reset_database()
+    common.seed(users=3, projects=1, tasks_per_project=0, comments_per_project=0, members_per_project=0)
+    storage_dir = tempfile.mkdtemp(prefix="bench_cache_")
+    env = {"PASSWORD_POOL_SIZE": "0", "BCRYPT_ROUNDS": "4", "FILES_STORAGE_DIR": storage_dir}
+    headers = common.auth_headers("user1@example.com")
+    failed = []
+    try:
+        with common.serve("main:app", env=env) as cached_url, \
+                common.serve("main:app", env={**env, **UNCACHED}) as fresh_url, \
+                httpx.Client(base_url=cached_url, headers=headers, timeout=30) as cached, \
+                httpx.Client(base_url=fresh_url, headers=headers, timeout=30) as fresh:
+            projects = [cached.post("/api/projects/", json={
+                "title": f"Proyecto {n}", "description": "Proyecto de benchmark", "owner_id": 1
+            }).json()["project_id"] for n in (1, 2)]
+            paths = [path for project_id in projects for path in reads(project_id)]
+            cases = writes(projects)
+
+            for name, write in [("(sin escrituras)", lambda client: None), *cases]:
+                # Lecturas en caché antes de escribir; después, las mismas
+                # respuestas que sin caché
+                snapshot(cached, paths)
+                write(cached)
+                after, expected = snapshot(cached, paths), snapshot(fresh, paths)
+                stale = [path for path, got, want in zip(paths, after, expected) if got != want]
+                print(f"{'OBSOLETA' if stale else 'ok':<10}{name}")
+                failed += [f"{name}: {path} obsoleta" for path in stale]
+
+            live = reads(projects[0])
+            print(f"\nLecturas de {len(live)} rutas x{args.repeat}: "
+                  f"{timed(cached, live, args.repeat):.2f} ms con caché, "
+                  f"{timed(fresh, live, args.repeat):.2f} ms sin caché")
+            stats = cached.get("/cache/stats").json()["responses"]
+            print(f"Caché: {stats}")
+    finally:
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+    missing = write_routes() - {name.partition("?")[0] for name, _ in cases}
+    failed += [f"{route}: ruta de escritura sin comprobar" for route in sorted(missing)]
+    for failure in failed:
+        print(f"FAIL {failure}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
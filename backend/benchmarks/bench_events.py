@@ -0,0 +1,121 @@
+# benchmarks/bench_events.py
+# Abre N conexiones SSE inactivas (10k por defecto) contra un único proceso
+# uvicorn, mide la memoria por conexión y el tiempo que tarda un cambio en
+# llegar a todas. Falla si alguna conexión no se establece o no recibe el evento.
+#
+#   cd backend && python -m benchmarks.bench_events --connections 10000
+import argparse
+import asyncio
+import sys
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from benchmarks import common
+
+common.use_local_database()
+
+from database import engine  # noqa: E402
+import models  # noqa: E402
+
+TASK_UPDATE = {"title": "Tarea observada", "description": "Tarea de benchmark", "status": "in_progress",
+               "due_date": "2030-01-01T00:00:00", "assigned_to": 1}
+
+async def open_stream(host: str, port: int, headers: dict, limit: asyncio.Semaphore):
+    async with limit:
+        reader, writer = await asyncio.open_connection(host, port)
+        request = "GET /api/events/1 HTTP/1.1\r\nHost: {}\r\nAccept: text/event-stream\r\n{}\r\n".format(
+            host, "".join(f"{name}: {value}\r\n" for name, value in headers.items()))
+        writer.write(request.encode())
+        await writer.drain()
+        received = b""
+        while b"retry:" not in received:
+            chunk = await reader.read(4096)
+            if not chunk:
+                raise ConnectionError(received[:80])
+            received += chunk
+        return reader, writer
+
+async def wait_for_event(reader, event_type: bytes) -> float:
+    received = b""
+    while event_type not in received:
+        chunk = await reader.read(4096)
+        if not chunk:
+            raise ConnectionError("stream closed")
+        # Sólo interesa el final: el tipo puede quedar partido entre dos lecturas
+        received = received[-64:] + chunk
+    return time.perf_counter()
+
+async def run(base_url: str, connections: int, rounds: int, idle_seconds: float, headers: dict) -> dict:
+    url = urlsplit(base_url)
+    limit = asyncio.Semaphore(200)
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(open_stream(url.hostname, url.port, headers, limit) for _ in range(connections)),
+        return_exceptions=True,
+    )
+    streams = [result for result in results if not isinstance(result, BaseException)]
+    opened = time.perf_counter() - start
+    print(f"{len(streams)}/{connections} conexiones en {opened:.1f} s")
+    if idle_seconds:
+        print(f"Inactivas durante {idle_seconds:.0f} s...")
+        await asyncio.sleep(idle_seconds)
+
+    deliveries = []
+    async with httpx.AsyncClient(base_url=base_url, headers=headers) as client:
+        stats = (await client.get("/events/stats")).json()
+        for _ in range(rounds):
+            waiters = [asyncio.ensure_future(wait_for_event(reader, b"event: task.updated"))
+                       for reader, _ in streams]
+            await asyncio.sleep(0)
+            sent = time.perf_counter()
+            (await client.put("/api/tasks/1", json=TASK_UPDATE)).raise_for_status()
+            done = await asyncio.gather(*waiters, return_exceptions=True)
+            received = [t - sent for t in done if not isinstance(t, BaseException)]
+            deliveries.append(received)
+    for _, writer in streams:
+        writer.close()
+    return {"streams": len(streams), "server_connections": stats["connections"], "deliveries": deliveries}
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--idle-seconds", type=float, default=20.0)
+    parser.add_argument("--max-p99-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    common.reset_database()
+    common.seed(users=1, projects=1, tasks_per_project=1, comments_per_project=0, members_per_project=0)
+    with engine.begin() as conn:
+        conn.execute(models.Membership.__table__.insert(), [
+            {"user_id": 1, "project_id": 1, "role": models.MembershipRole.OWNER, "is_active": True}
+        ])
+
+    headers = common.auth_headers("user1@example.com")
+    # Latido corto para que también se ejerza durante el periodo inactivo
+    env = {"PASSWORD_POOL_SIZE": "0", "BCRYPT_ROUNDS": "4", "EVENTS_HEARTBEAT_SECONDS": "5"}
+    with common.serve("main:app", extra_args=["--backlog", "4096"], env=env,
+                      with_process=True) as (base_url, proc):
+        baseline = common.rss_bytes(proc.pid)
+        result = asyncio.run(run(base_url, args.connections, args.rounds, args.idle_seconds, headers))
+        loaded = common.rss_bytes(proc.pid)
+
+    per_connection = (loaded - baseline) / max(result["streams"], 1)
+    print(f"RSS del servidor: {baseline / 2**20:.0f} MB -> {loaded / 2**20:.0f} MB "
+          f"({per_connection / 1024:.1f} KB por conexión)")
+    print(f"{'ronda':<8}{'recibidos':>12}{'p50 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+    failed = result["streams"] < args.connections or result["server_connections"] < args.connections
+    for round_, received in enumerate(result["deliveries"], 1):
+        ms = [seconds * 1000 for seconds in received]
+        p99 = common.percentile(ms, 99)
+        print(f"{round_:<8}{len(ms):>12}{common.percentile(ms, 50):>10.1f}{p99:>10.1f}{max(ms, default=0):>10.1f}")
+        failed |= len(ms) < result["streams"] or p99 > args.max_p99_ms
+    if failed:
+        print("FAIL: conexiones perdidas o entrega por encima del límite")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# benchmarks/bench_export.py
+# Exporta en streaming un volumen grande de comentarios sintéticos (1M por
+# defecto) en cada formato y comprueba que el RSS del servidor no supera un
+# techo fijo: la memoria no debe crecer con el número de filas.
+#
+#   cd backend && python -m benchmarks.bench_export --rows 1000000 --max-rss-mb 300
+import argparse
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from benchmarks import common
+
+common.use_local_database()
+
+import models  # noqa: E402
+from database import engine  # noqa: E402
+
+SEED_CHUNK = 50_000
+
+def seed_comments(rows: int):
+    common.seed(users=1, projects=1, tasks_per_project=0, comments_per_project=0, members_per_project=1)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, rows, SEED_CHUNK):
+            conn.execute(models.Comment.__table__.insert(), [
+                {"content": f"Comentario sintético número {i} para la exportación",
+                 "project_id": 1, "user_id": 1, "created_at": now - timedelta(seconds=i)}
+                for i in range(start, min(rows, start + SEED_CHUNK))
+            ])
+
+def export(base_url: str, pid: int, params: dict, headers: dict) -> dict:
+    peak = common.rss_bytes(pid)
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, common.rss_bytes(pid))
+            time.sleep(0.05)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    size, start = 0, time.perf_counter()
+    try:
+        with httpx.stream("GET", f"{base_url}/api/exports/comments", params=params,
+                          headers=headers, timeout=None) as response:
+            response.raise_for_status()
+            for chunk in response.iter_raw():
+                size += len(chunk)
+    finally:
+        done.set()
+        sampler.join()
+    return {"seconds": time.perf_counter() - start, "bytes": size, "peak_rss": peak}
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--formats", nargs="+", default=["ndjson", "csv", "parquet"])
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--max-rss-mb", type=float, default=300.0)
+    args = parser.parse_args()
+
+    common.reset_database()
+    print(f"Insertando {args.rows} comentarios...")
+    seed_comments(args.rows)
+
+    headers = common.auth_headers("user1@example.com")
+    env = {"PASSWORD_POOL_SIZE": "0", "BCRYPT_ROUNDS": "4"}
+    failed = False
+    with common.serve("main:app", env=env, with_process=True) as (base_url, proc):
+        baseline = common.rss_bytes(proc.pid)
+        print(f"RSS inicial del servidor: {baseline / 2**20:.0f} MB")
+        print(f"{'formato':<16}{'s':>8}{'MB':>10}{'filas/s':>12}{'RSS pico MB':>14}")
+        for format in args.formats:
+            params = {"format": format, "project_id": 1, "gzip": str(args.gzip).lower()}
+            result = export(base_url, proc.pid, params, headers)
+            peak_mb = result["peak_rss"] / 2**20
+            label = format + (".gz" if args.gzip else "")
+            print(f"{label:<16}{result['seconds']:>8.1f}{result['bytes'] / 2**20:>10.1f}"
+                  f"{args.rows / result['seconds']:>12.0f}{peak_mb:>14.0f}")
+            if peak_mb > args.max_rss_mb:
+                print(f"FAIL: {label} supera el techo de {args.max_rss_mb:.0f} MB")
+                failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
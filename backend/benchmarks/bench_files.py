@@ -0,0 +1,155 @@
+# benchmarks/bench_files.py
+# Sube y descarga un archivo grande (2 GB por defecto) contra el servidor y
+# comprueba que su RSS no supera un techo fijo: subida directa en streaming,
+# la misma en partes reanudables (debe quedar un solo blob), descarga completa
+# y lecturas por Range al azar.
+#
+#   cd backend && python -m benchmarks.bench_files --size-mb 2048 --max-rss-mb 200
+import argparse
+import contextlib
+import hashlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from benchmarks import common
+
+common.use_local_database()
+
+BLOCK = 1024 * 1024
+
+def content(size: int, digest):
+    # Contenido sintético por bloques de 1 MB; se hashea según se envía
+    rng = random.Random(size)
+    sent = 0
+    while sent < size:
+        block = rng.randbytes(min(BLOCK, size - sent))
+        digest.update(block)
+        sent += len(block)
+        yield block
+
+@contextlib.contextmanager
+def peak_rss(pid: int):
+    result = {"peak": common.rss_bytes(pid)}
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            result["peak"] = max(result["peak"], common.rss_bytes(pid))
+            time.sleep(0.05)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    try:
+        yield result
+    finally:
+        done.set()
+        sampler.join()
+
+def upload(client: httpx.Client, size: int) -> tuple:
+    digest = hashlib.sha256()
+    response = client.post("/api/files/upload", params={"project_id": 1, "file_name": "directo.bin"},
+                           content=content(size, digest))
+    response.raise_for_status()
+    return response.json(), digest.hexdigest()
+
+def upload_parts(client: httpx.Client, size: int, part_size: int) -> tuple:
+    digest = hashlib.sha256()
+    upload_id = client.post("/api/files/uploads", json={"project_id": 1, "file_name": "partes.bin"}).json()["upload_id"]
+    blocks = content(size, digest)
+    per_part = part_size // BLOCK
+    for part_number in range(1, (size + part_size - 1) // part_size + 1):
+        def part():
+            for _ in range(per_part):
+                block = next(blocks, None)
+                if block is None:
+                    return
+                yield block
+        client.put(f"/api/files/uploads/{upload_id}/parts/{part_number}", content=part()).raise_for_status()
+    response = client.post(f"/api/files/uploads/{upload_id}/complete")
+    response.raise_for_status()
+    return response.json(), digest.hexdigest()
+
+def download(client: httpx.Client, url: str) -> str:
+    digest = hashlib.sha256()
+    with client.stream("GET", url) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def ranges(client: httpx.Client, url: str, size: int, count: int, length: int = 64 * 1024) -> dict:
+    rng = random.Random(0)
+    latencies = []
+    for _ in range(count):
+        start = rng.randrange(0, max(1, size - length))
+        begin = time.perf_counter()
+        response = client.get(url, headers={"Range": f"bytes={start}-{start + length - 1}"})
+        latencies.append(time.perf_counter() - begin)
+        assert response.status_code == 206 and len(response.content) == min(length, size - start)
+    return common.summarize(latencies, 0, sum(latencies))
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--part-mb", type=int, default=64)
+    parser.add_argument("--ranges", type=int, default=200, help="Lecturas Range de 64 KB")
+    parser.add_argument("--max-rss-mb", type=float, default=200.0)
+    args = parser.parse_args()
+    size = args.size_mb * 2**20
+
+    common.reset_database()
+    common.seed(users=1, projects=1, tasks_per_project=0, comments_per_project=0, members_per_project=1)
+    storage_dir = tempfile.mkdtemp(prefix="bench_files_")
+    env = {"PASSWORD_POOL_SIZE": "0", "FILES_STORAGE_DIR": storage_dir, "FILES_MAX_BYTES": str(size)}
+    failed = []
+    try:
+        with common.serve("main:app", env=env, with_process=True) as (base_url, proc), \
+                httpx.Client(base_url=base_url, headers=common.auth_headers("user1@example.com"),
+                             timeout=None) as client:
+            print(f"RSS inicial del servidor: {common.rss_bytes(proc.pid) / 2**20:.0f} MB")
+            print(f"{'caso':<22}{'s':>8}{'MB/s':>10}{'RSS pico MB':>14}")
+
+            def report(name, seconds, peak):
+                print(f"{name:<22}{seconds:>8.1f}{args.size_mb / seconds:>10.0f}{peak / 2**20:>14.0f}")
+                if peak / 2**20 > args.max_rss_mb:
+                    failed.append(f"{name}: RSS {peak / 2**20:.0f} MB > {args.max_rss_mb:.0f} MB")
+
+            for name, run in (("subida directa", lambda: upload(client, size)),
+                              (f"subida en partes {args.part_mb} MB",
+                               lambda: upload_parts(client, size, args.part_mb * 2**20))):
+                start = time.perf_counter()
+                with peak_rss(proc.pid) as rss:
+                    file, expected = run()
+                report(name, time.perf_counter() - start, rss["peak"])
+                if file["content_hash"] != expected or file["size"] != size:
+                    failed.append(f"{name}: hash o tamaño distintos")
+
+            blobs = sum(len(names) for _, _, names in os.walk(os.path.join(storage_dir, "blobs")))
+            if blobs != 1:
+                failed.append(f"{blobs} blobs para dos subidas iguales")
+
+            start = time.perf_counter()
+            with peak_rss(proc.pid) as rss:
+                downloaded = download(client, file["file_url"])
+            report("descarga", time.perf_counter() - start, rss["peak"])
+            if downloaded != file["content_hash"]:
+                failed.append("descarga: el contenido no coincide")
+
+            result = ranges(client, file["file_url"], size, args.ranges)
+            print(f"\nRange 64 KB x{args.ranges}: p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms")
+    finally:
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+    for failure in failed:
+        print(f"FAIL {failure}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+# benchmarks/bench_load.py
+# Prueba de carga de main:app con la mezcla de peticiones del frontend: cada
+# usuario virtual recorre las pantallas de frontend/src/components con las
+# llamadas de services/api.js que hacen al cargar o guardar. Informa de RPS y
+# p50/p95/p99 por endpoint y compara con un baseline guardado: falla si hay
+# errores o si algún endpoint empeora más de la tolerancia.
+#
+#   cd backend && python -m benchmarks.bench_load --concurrency 10 50
+#   cd backend && python -m benchmarks.bench_load --save-baseline   # tras un cambio aceptado
+#
+# Con DATABASE_URL apuntando a MySQL (p. ej. un contenedor) usa esa base.
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import httpx
+
+from benchmarks import common
+
+common.use_local_database()
+
+from sqlalchemy import select  # noqa: E402
+
+import models  # noqa: E402
+from database import engine  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(common.BACKEND_DIR, "benchmarks", "baselines", "load.json")
+
+# template identifica el endpoint en el informe y en el baseline
+Request = namedtuple("Request", "method template path body")
+# Datos de un usuario virtual: sus proyectos y las tareas de cada uno
+Visitor = namedtuple("Visitor", "user_id email projects tasks")
+
+def _get(template: str, path: str) -> Request:
+    return Request("GET", template, path, None)
+
+def _task_body(rng, visitor, project_id: int) -> dict:
+    return {
+        "title": f"Tarea {rng.randint(1, 10**6)}",
+        "description": "Tarea creada por la prueba de carga",
+        "status": rng.choice(list(models.TaskStatus)).value,
+        "due_date": (datetime.utcnow() + timedelta(days=rng.randint(1, 60))).isoformat(),
+        "assigned_to": visitor.user_id,
+        "project_id": project_id,
+    }
+
+# Cada pantalla devuelve tandas de peticiones: las de una tanda van en
+# paralelo (Promise.all en el frontend) y las tandas, una tras otra
+def home(rng, visitor):
+    # Home.jsx: proyectos y tareas del usuario a la vez
+    return [[
+        _get("/api/projects/user/{user_id}/projects", f"/api/projects/user/{visitor.user_id}/projects"),
+        _get("/api/tasks/user/{user_id}/tasks", f"/api/tasks/user/{visitor.user_id}/tasks"),
+    ]]
+
+def project_view(rng, visitor):
+    # ProjectView.jsx: detalle y después sus tareas
+    project_id = rng.choice(visitor.projects)
+    return [
+        [_get("/api/projects/{project_id}", f"/api/projects/{project_id}")],
+        [_get("/api/tasks/project/{project_id}/tasks", f"/api/tasks/project/{project_id}/tasks")],
+    ]
+
+def task_view(rng, visitor):
+    # TaskView.jsx: la tarea y luego su proyecto (para los miembros)
+    project_id = rng.choice(visitor.projects)
+    task_id = rng.choice(visitor.tasks[project_id])
+    return [
+        [_get("/api/tasks/{task_id}", f"/api/tasks/{task_id}")],
+        [_get("/api/projects/{project_id}", f"/api/projects/{project_id}")],
+    ]
+
+def edit_task(rng, visitor):
+    # Home.jsx: guardar una tarea editada y recargar el panel
+    project_id = rng.choice(visitor.projects)
+    task_id = rng.choice(visitor.tasks[project_id])
+    body = _task_body(rng, visitor, project_id)
+    del body["project_id"]
+    return [[Request("PUT", "/api/tasks/{task_id}", f"/api/tasks/{task_id}", body)]] + home(rng, visitor)
+
+def create_task(rng, visitor):
+    # CreateTaskForm.jsx: miembros del proyecto y alta de la tarea
+    project_id = rng.choice(visitor.projects)
+    return [
+        [_get("/api/projects/{project_id}", f"/api/projects/{project_id}")],
+        [Request("POST", "/api/tasks/", "/api/tasks/", _task_body(rng, visitor, project_id))],
+    ]
+
+def edit_project(rng, visitor):
+    # ProjectView.jsx: guardar el proyecto y recargarlo
+    project_id = rng.choice(visitor.projects)
+    body = {"title": f"Project {project_id}", "description": "Proyecto de benchmark editado",
+            "status": models.ProjectStatus.ACTIVE.value}
+    return [[Request("PUT", "/api/projects/{project_id}", f"/api/projects/{project_id}", body)]] \
+        + project_view(rng, visitor)[1:]
+
+def add_member_dialog(rng, visitor):
+    # ProjectView.jsx: el diálogo de añadir miembro lista los usuarios. El alta
+    # no se repite: la segunda vez sería un 400 por membresía duplicada
+    return [[_get("/api/users/", "/api/users/")]]
+
+# Peso relativo de cada pantalla en la mezcla
+SCREENS = [
+    (home, 35),
+    (project_view, 30),
+    (task_view, 15),
+    (edit_task, 8),
+    (create_task, 5),
+    (edit_project, 3),
+    (add_member_dialog, 4),
+]
+
+def load_visitors() -> list:
+    # Usuarios con al menos un proyecto que tenga tareas
+    with engine.connect() as conn:
+        tasks = {}
+        for task_id, project_id in conn.execute(select(models.Task.task_id, models.Task.project_id)):
+            tasks.setdefault(project_id, []).append(task_id)
+        projects = {}
+        for user_id, project_id in conn.execute(
+            select(models.Membership.user_id, models.Membership.project_id)
+            .where(models.Membership.is_active.is_(True))
+        ):
+            if project_id in tasks:
+                projects.setdefault(user_id, []).append(project_id)
+        emails = dict(conn.execute(select(models.User.user_id, models.User.email)).all())
+    return [Visitor(user_id, emails[user_id], sorted(project_ids), tasks)
+            for user_id, project_ids in sorted(projects.items())]
+
+async def run_mix(base_url: str, visitors, concurrency: int, total_requests: int, seed: int = 0,
+                  failures: dict = None):
+    # `concurrency` usuarios virtuales recorren pantallas hasta completar el total;
+    # `failures` acumula (endpoint, motivo) -> veces para el informe de errores
+    stats = {}  # "GET /api/..." -> [latencias, errores]
+    failures = {} if failures is None else failures
+    remaining = total_requests
+    screens, weights = zip(*SCREENS)
+    # Caducidad por debajo del keep-alive de uvicorn (5 s): si coinciden, el
+    # cliente puede reutilizar una conexión justo cuando el servidor la cierra
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2,
+                          keepalive_expiry=2)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def send(request: Request, headers: dict):
+            start = time.perf_counter()
+            reason = None
+            try:
+                response = await client.request(request.method, request.path, json=request.body, headers=headers)
+                if response.status_code >= 400:
+                    reason = f"{response.status_code} {response.text[:120]}"
+            except httpx.HTTPError as exc:
+                reason = repr(exc)
+            name = f"{request.method} {request.template}"
+            entry = stats.setdefault(name, [[], 0])
+            entry[0].append(time.perf_counter() - start)
+            if reason is not None:
+                entry[1] += 1
+                failures[(name, reason)] = failures.get((name, reason), 0) + 1
+
+        async def visitor_loop(index: int):
+            nonlocal remaining
+            rng = random.Random(seed * 1_000_003 + index)
+            visitor = visitors[index % len(visitors)]
+            headers = common.auth_headers(visitor.email)
+            while remaining > 0:
+                screen = rng.choices(screens, weights)[0]
+                for wave in screen(rng, visitor):
+                    remaining -= len(wave)
+                    await asyncio.gather(*(send(request, headers) for request in wave))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(visitor_loop(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    results = {name: common.summarize(latencies, errors, elapsed)
+               for name, (latencies, errors) in sorted(stats.items())}
+    all_latencies = [latency for latencies, _ in stats.values() for latency in latencies]
+    results["TOTAL"] = common.summarize(all_latencies, sum(errors for _, errors in stats.values()), elapsed)
+    return results
+
+def median_rounds(rounds) -> dict:
+    # Mediana de cada métrica entre rondas; peticiones y errores se suman
+    merged = {}
+    for name in rounds[0]:
+        samples = [result[name] for result in rounds if name in result]
+        merged[name] = {metric: statistics.median(sample[metric] for sample in samples)
+                        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms")}
+        merged[name]["requests"] = sum(sample["requests"] for sample in samples)
+        merged[name]["errors"] = sum(sample["errors"] for sample in samples)
+    return merged
+
+def compare(results: dict, baseline: dict, tolerance: float, tail_tolerance: float,
+            min_delta_ms: float, min_samples: int) -> list:
+    """Regresiones frente al baseline: errores, latencia (p50/p95) o RPS total.
+
+    Una latencia empeora si supera a la del baseline en más de `tolerance`
+    (p50) o `tail_tolerance` (p95, más ruidoso) y además en más de
+    `min_delta_ms` (para no fallar por ruido en endpoints de pocos ms). Los endpoints con menos de
+    `min_samples` peticiones se informan pero no se comparan: su p95 es ruido.
+    """
+    problems = []
+    for level, endpoints in results.items():
+        reference = baseline.get(level, {})
+        for name, current in endpoints.items():
+            if current["errors"]:
+                problems.append(f"{level} {name}: {current['errors']} errores")
+            before = reference.get(name)
+            if before is None or current["requests"] < min_samples:
+                continue
+            for metric, allowed in (("p50_ms", tolerance), ("p95_ms", tail_tolerance)):
+                limit = max(before[metric] * (1 + allowed), before[metric] + min_delta_ms)
+                if current[metric] > limit:
+                    problems.append(f"{level} {name}: {metric} {current[metric]:.1f} > {limit:.1f} "
+                                    f"(baseline {before[metric]:.1f})")
+            if name == "TOTAL" and current["rps"] < before["rps"] * (1 - tolerance):
+                problems.append(f"{level} TOTAL: {current['rps']:.1f} rps < "
+                                f"{before['rps'] * (1 - tolerance):.1f} (baseline {before['rps']:.1f})")
+    return problems
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--requests", type=int, default=3000, help="Peticiones medidas por ronda")
+    parser.add_argument("--rounds", type=int, default=3, help="Rondas por nivel; se compara la mediana")
+    parser.add_argument("--warmup", type=int, default=300)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--tasks-per-project", type=int, default=200)
+    parser.add_argument("--comments-per-project", type=int, default=200)
+    parser.add_argument("--members-per-project", type=int, default=8)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda este resultado como baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Para p50 y RPS total")
+    parser.add_argument("--tail-tolerance", type=float, default=0.5, help="Para p95")
+    parser.add_argument("--min-delta-ms", type=float, default=3.0)
+    parser.add_argument("--min-samples", type=int, default=300,
+                        help="Peticiones mínimas de un endpoint para comparar su latencia")
+    args = parser.parse_args()
+
+    # El baseline sólo es comparable con los mismos datos y la misma carga
+    params = {name: getattr(args, name) for name in (
+        "concurrency", "requests", "rounds", "users", "projects", "tasks_per_project",
+        "comments_per_project", "members_per_project")}
+
+    common.reset_database()
+    common.seed(users=args.users, projects=args.projects, tasks_per_project=args.tasks_per_project,
+                comments_per_project=args.comments_per_project, members_per_project=args.members_per_project)
+    visitors = load_visitors()
+
+    results, failures = {}, {}
+    with common.serve("main:app", env={"PASSWORD_POOL_SIZE": "0"}) as base_url:
+        asyncio.run(run_mix(base_url, visitors, min(args.concurrency), args.warmup, seed=-1))
+        for concurrency in args.concurrency:
+            level = f"c={concurrency}"
+            results[level] = median_rounds([
+                asyncio.run(run_mix(base_url, visitors, concurrency, args.requests, seed=round_, failures=failures))
+                for round_ in range(args.rounds)
+            ])
+            common.print_table(f"Mezcla del frontend, {level} (mediana de {args.rounds} rondas)", [
+                (name.replace("/api", ""), result) for name, result in results[level].items()
+            ])
+
+    for (name, reason), count in sorted(failures.items()):
+        print(f"ERROR {name}: {reason} (x{count})")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"params": params, "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline guardado en {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nSin baseline en {args.baseline}: ejecuta con --save-baseline para crearlo")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["params"] != params:
+        print(f"\nFAIL: parámetros distintos de los del baseline {baseline['params']}")
+        return 1
+    problems = compare(results, baseline["results"], args.tolerance, args.tail_tolerance,
+                       args.min_delta_ms, args.min_samples)
+    for problem in problems:
+        print(f"REGRESIÓN {problem}")
+    if problems:
+        print("FAIL: rendimiento peor que el baseline")
+        return 1
+    print(f"\nOK: dentro de un {args.tolerance:.0%} del baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+# benchmarks/bench_login.py
+# Logins por segundo según el tamaño del pool de bcrypt (PASSWORD_POOL_SIZE)
+# y latencia de una ruta ligera servida a la vez. Con 0 bcrypt se ejecuta en
+# el threadpool del servidor, como antes del pool de procesos.
+#
+#   cd backend && python -m benchmarks.bench_login --pool-sizes 0 1 2 4
+import argparse
+import asyncio
+import sys
+
+from benchmarks import common
+
+common.use_local_database()
+
+from passlib.hash import bcrypt  # noqa: E402
+
+import models  # noqa: E402
+from database import engine  # noqa: E402
+
+PASSWORD = "Passw0rd!"
+
+def seed_users(count: int, rounds: int):
+    # Mismo hash para todos: sólo importa el coste de verificarlo
+    hashed = bcrypt.using(rounds=rounds).hash(PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"name": f"User {i}", "email": f"login{i}@example.com", "password": hashed,
+             "role": models.UserRole.USER}
+            for i in range(count)
+        ])
+
+async def measure(base_url: str, args) -> tuple:
+    login, background = await asyncio.gather(
+        common.run_load(base_url, ["/api/auth/login"], args.concurrency, args.logins,
+                        method="POST", data={"username": "login0@example.com", "password": PASSWORD}),
+        common.run_load(base_url, ["/"], 4, args.logins * 4),
+    )
+    return login, background
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+
+    common.reset_database()
+    seed_users(1, args.rounds)
+
+    rows = []
+    for size in args.pool_sizes:
+        env = {"PASSWORD_POOL_SIZE": str(size), "BCRYPT_ROUNDS": str(args.rounds)}
+        with common.serve("main:app", env=env) as base_url:
+            login, background = asyncio.run(measure(base_url, args))
+        rows.append((f"login pool={size}", login))
+        rows.append((f"  GET / pool={size}", background))
+    common.print_table(f"bcrypt rounds={args.rounds}, concurrencia={args.concurrency}", rows)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# benchmarks/bench_metrics.py
+# Coste de las métricas de Prometheus (utils/metrics.py) con la mezcla de
+# peticiones de bench_load: dos servidores sobre la misma base, uno con
+# METRICS_ENABLED=0 y otro con 1, cargados por turnos en cada ronda. Compara
+# la CPU del servidor por petición (menos ruidosa que el RPS con el cliente
+# en la misma máquina) y el RPS; falla si el sobrecoste supera --max-overhead.
+#
+#   cd backend && python -m benchmarks.bench_metrics --concurrency 50
+import argparse
+import asyncio
+import statistics
+import sys
+
+import httpx
+
+from benchmarks import common
+from benchmarks.bench_load import load_visitors, run_mix
+
+def measure(base_url: str, pid: int, visitors, concurrency: int, requests: int, seed: int) -> dict:
+    cpu = common.cpu_seconds(pid)
+    result = asyncio.run(run_mix(base_url, visitors, concurrency, requests, seed=seed))["TOTAL"]
+    result["cpu_ms"] = (common.cpu_seconds(pid) - cpu) * 1000 / result["requests"]
+    return result
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="Peticiones por ronda y servidor")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--max-overhead", type=float, default=0.02,
+                        help="Sobrecoste máximo de CPU por petición (mediana de las rondas)")
+    args = parser.parse_args()
+
+    common.reset_database()
+    common.seed(users=200, projects=50, tasks_per_project=200, comments_per_project=200, members_per_project=8)
+    visitors = load_visitors()
+
+    env = {"PASSWORD_POOL_SIZE": "0"}
+    with common.serve("main:app", env={**env, "METRICS_ENABLED": "0"}, with_process=True) as off, \
+            common.serve("main:app", env={**env, "METRICS_ENABLED": "1"}, with_process=True) as on:
+        servers = {"sin métricas": off, "con métricas": on}
+        for base_url, _ in servers.values():
+            asyncio.run(run_mix(base_url, visitors, args.concurrency, args.warmup, seed=-1))
+
+        rounds = {name: [] for name in servers}
+        for round_ in range(args.rounds):
+            # Mismo orden de peticiones en ambos; se alterna quién va primero
+            order = list(servers) if round_ % 2 == 0 else list(servers)[::-1]
+            for name in order:
+                base_url, proc = servers[name]
+                rounds[name].append(measure(base_url, proc.pid, visitors, args.concurrency,
+                                            args.requests, seed=round_))
+        scraped = httpx.get(on[0] + "/metrics").text
+
+    print(f"\nMezcla del frontend, c={args.concurrency} (mediana de {args.rounds} rondas)")
+    print(f"{'caso':<16}{'req':>8}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'CPU ms/req':>12}")
+    summary = {}
+    for name, results in rounds.items():
+        summary[name] = {key: statistics.median(r[key] for r in results)
+                         for key in ("rps", "p50_ms", "p95_ms", "cpu_ms")}
+        errors = sum(r["errors"] for r in results)
+        s = summary[name]
+        print(f"{name:<16}{sum(r['requests'] for r in results):>8}{errors:>6}{s['rps']:>10.1f}"
+              f"{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['cpu_ms']:>12.3f}")
+
+    cpu_overhead = summary["con métricas"]["cpu_ms"] / summary["sin métricas"]["cpu_ms"] - 1
+    rps_overhead = 1 - summary["con métricas"]["rps"] / summary["sin métricas"]["rps"]
+    series = sum(1 for line in scraped.splitlines() if line and not line.startswith("#"))
+    print(f"\nSobrecoste: CPU/petición {cpu_overhead:+.1%}, RPS {rps_overhead:+.1%}; "
+          f"/metrics: {series} series, {len(scraped) / 1024:.0f} KB")
+    if any(r["errors"] for results in rounds.values() for r in results):
+        print("FAIL: hubo errores")
+        return 1
+    if cpu_overhead > args.max_overhead:
+        print(f"FAIL: sobrecoste por encima de {args.max_overhead:.0%}")
+        return 1
+    print(f"OK: sobrecoste por debajo de {args.max_overhead:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# benchmarks/bench_project_detail.py
+# Mide GET /api/projects/{id} al escalar a la vez tareas, comentarios,
+# miembros y archivos de un proyecto. Con una carga por colección el coste
+# crece de forma lineal con el número de hijos; el JOIN anterior de todas
+# las colecciones crecía con su producto.
+#
+#   cd backend && python -m benchmarks.bench_project_detail --scales 1 2 4 8
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import common
+
+common.use_local_database()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+import models  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from main import app  # noqa: E402
+from utils.pagination import MAX_PAGE_SIZE  # noqa: E402
+
+BASE = {"tasks": 10, "comments": 20, "members": 3, "files": 2}
+
+def seed_project(project_id: int, scale: int) -> dict:
+    counts = {name: value * scale for name, value in BASE.items()}
+    now = datetime.utcnow()
+    first_user = project_id * 1000
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"user_id": first_user + i, "name": f"User {i}", "email": f"u{first_user + i}@example.com",
+             "password": "x", "role": models.UserRole.USER}
+            for i in range(counts["members"])
+        ])
+        conn.execute(models.Project.__table__.insert(), [{
+            "project_id": project_id, "title": f"Project {project_id}",
+            "description": "Proyecto de benchmark", "status": models.ProjectStatus.ACTIVE,
+            "owner_id": first_user,
+        }])
+        conn.execute(models.Membership.__table__.insert(), [
+            {"user_id": first_user + i, "project_id": project_id,
+             "role": models.MembershipRole.MEMBER, "is_active": True}
+            for i in range(counts["members"])
+        ])
+        conn.execute(models.Task.__table__.insert(), [
+            {"title": f"Task {t}", "description": "Tarea de benchmark", "status": models.TaskStatus.TODO,
+             "due_date": now + timedelta(days=7), "project_id": project_id, "assigned_to": first_user}
+            for t in range(counts["tasks"])
+        ])
+        conn.execute(models.Comment.__table__.insert(), [
+            {"content": f"Comentario {c}", "project_id": project_id, "user_id": first_user,
+             "created_at": now - timedelta(seconds=c)}
+            for c in range(counts["comments"])
+        ])
+        conn.execute(models.File.__table__.insert(), [
+            {"file_name": f"file{f}.txt", "file_url": f"/files/{f}", "project_id": project_id,
+             "user_id": first_user}
+            for f in range(counts["files"])
+        ])
+    return counts
+
+def time_call(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+def legacy_load(project_id: int):
+    # La carga anterior: joinedload de todas las colecciones en un SELECT
+    with SessionLocal() as db:
+        db.query(models.Project).options(
+            joinedload(models.Project.owner),
+            joinedload(models.Project.members),
+            joinedload(models.Project.tasks),
+            joinedload(models.Project.comments),
+            joinedload(models.Project.files),
+        ).filter(models.Project.project_id == project_id).first()
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--legacy-max-rows", type=int, default=500_000,
+                        help="No medir el JOIN anterior por encima de estas filas")
+    parser.add_argument("--slack", type=float, default=2.0,
+                        help="Margen sobre el crecimiento lineal antes de fallar")
+    args = parser.parse_args()
+
+    common.reset_database()
+    client = TestClient(app)
+
+    print(f"{'escala':>7}{'hijos':>8}{'filas JOIN':>12}{'nuevo ms':>10}{'JOIN ms':>10}")
+    results = []
+    for index, scale in enumerate(args.scales, start=1):
+        counts = seed_project(index, scale)
+        client.headers.update(common.auth_headers(f"u{index * 1000}@example.com"))
+        children = sum(counts.values())
+        joined_rows = counts["tasks"] * counts["comments"] * counts["members"] * counts["files"]
+        new_ms = time_call(
+            lambda: client.get(f"/api/projects/{index}", params={"limit": MAX_PAGE_SIZE}).raise_for_status(),
+            args.repeat,
+        )
+        legacy_ms = None
+        if joined_rows <= args.legacy_max_rows:
+            legacy_ms = time_call(lambda: legacy_load(index), max(1, args.repeat // 4))
+        results.append((scale, children, new_ms))
+        legacy = f"{legacy_ms:>10.1f}" if legacy_ms is not None else f"{'-':>10}"
+        print(f"{scale:>7}{children:>8}{joined_rows:>12}{new_ms:>10.1f}{legacy}")
+
+    # Crecimiento lineal: la latencia no debe crecer más que los hijos (con margen)
+    base_scale, base_children, base_ms = results[0]
+    for scale, children, ms in results[1:]:
+        allowed = base_ms * (children / base_children) * args.slack
+        if ms > allowed:
+            print(f"FAIL: escala {scale} tarda {ms:.1f} ms (> {allowed:.1f} ms lineal)")
+            return 1
+    print("OK: la latencia del detalle crece de forma lineal con los hijos")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
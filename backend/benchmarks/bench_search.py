@@ -0,0 +1,104 @@
+# benchmarks/bench_search.py
+# Latencia de GET /api/search sobre un índice con 1M de documentos
+# sintéticos (vocabulario con distribución Zipf) repartidos en proyectos de
+# los que el usuario sólo es miembro de una parte.
+#
+#   cd backend && python -m benchmarks.bench_search --documents 1000000 --max-p95-ms 50
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from benchmarks import common
+
+common.use_local_database()
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import models  # noqa: E402
+from database import engine  # noqa: E402
+from main import app  # noqa: E402
+from utils import search  # noqa: E402
+
+SEED_CHUNK = 50_000
+SYLLABLES = ["ta", "re", "mi", "so", "lu", "ca", "ne", "do", "pi", "ro", "ve", "za", "fo", "gu", "le", "ba"]
+
+def vocabulary(size: int, rng) -> list:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def seed_documents(documents: int, projects: int, words: list, rng):
+    # Documentos directamente en el índice: es lo que recorre la búsqueda
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    table = search.backend_for(engine.dialect.name).table
+    kinds = list(search.KINDS.items())
+    with engine.begin() as conn:
+        for start in range(0, documents, SEED_CHUNK):
+            rows = []
+            for i in range(start, min(documents, start + SEED_CHUNK)):
+                kind, code = kinds[i % len(kinds)]
+                text = rng.choices(words, weights, k=14)
+                rows.append({"doc_id": i * 4 + code, "kind": kind, "object_id": i,
+                             "project_id": rng.randint(1, projects),
+                             "title": " ".join(text[:4]), "body": " ".join(text[4:])})
+            conn.execute(table.insert(), rows)
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--member-of", type=int, default=20, help="Proyectos del usuario")
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--max-p95-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    common.reset_database()
+    common.seed(users=1, projects=args.projects, tasks_per_project=0, comments_per_project=0,
+                members_per_project=0)
+    with engine.begin() as conn:
+        conn.execute(models.Membership.__table__.insert(), [
+            {"user_id": 1, "project_id": p, "role": models.MembershipRole.MEMBER, "is_active": True}
+            for p in rng.sample(range(1, args.projects + 1), args.member_of)
+        ])
+    words = vocabulary(args.vocabulary, rng)
+    print(f"Indexando {args.documents} documentos...")
+    start = time.perf_counter()
+    seed_documents(args.documents, args.projects, words, rng)
+    print(f"  {time.perf_counter() - start:.0f} s")
+
+    client = TestClient(app, headers=common.auth_headers("user1@example.com"))
+    # Por frecuencia del término (el vocabulario está ordenado por rango Zipf).
+    # Las ~100 palabras más frecuentes aparecen en más del 1% de los documentos:
+    # equivalen a palabras vacías y ordenar por relevancia cuesta lo que sus
+    # coincidencias, así que no entran en el objetivo
+    classes = {
+        "frecuente": words[100:500],
+        "intermedia": words[500:1500],
+        "rara": words[20_000:],
+        "dos términos": [f"{a} {b}" for a, b in zip(words[100:600], words[600:1100])],
+        "prefijo": [f"{word}*" for word in words[500:1500]],
+    }
+    failed = False
+    print(f"{'consulta':<16}{'p50 ms':>10}{'p95 ms':>10}{'resultados':>12}")
+    for name, pool in classes.items():
+        samples, hits = [], 0
+        for query in rng.choices(pool, k=args.queries):
+            start = time.perf_counter()
+            page = client.get("/api/search/", params={"q": query, "limit": 20}).raise_for_status().json()
+            samples.append((time.perf_counter() - start) * 1000)
+            hits += len(page["items"])
+        p95 = common.percentile(samples, 95)
+        print(f"{name:<16}{statistics.median(samples):>10.1f}{p95:>10.1f}{hits / args.queries:>12.1f}")
+        failed |= p95 > args.max_p95_ms
+    if failed:
+        print(f"FAIL: p95 por encima de {args.max_p95_ms} ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# benchmarks/bench_serialization.py
+# Compara, por esquema de listado, el camino anterior (objetos ORM o dicts
+# validados otra vez con response_model y volcados por pydantic) con el
+# rápido de utils/serialization.py (tuplas de columnas + orjson). Incluye la
+# consulta en ambos. Falla si el JSON difiere o si el camino rápido no gana.
+#
+#   cd backend && python -m benchmarks.bench_serialization --rows 5000
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import common
+
+common.use_local_database()
+# Páginas del tamaño pedido: el límite normal de la API es menor
+os.environ.setdefault("MAX_PAGE_SIZE", "100000")
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.orm import contains_eager  # noqa: E402
+
+import models  # noqa: E402
+import schemas  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from routes.comments import COMMENT_KEY, COMMENT_ROWS  # noqa: E402
+from routes.memberships import MEMBERSHIP_ROWS  # noqa: E402
+from routes.tasks import PROJECT_TASK_ROWS, USER_TASK_ROWS  # noqa: E402
+from routes.users import USER_ROWS  # noqa: E402
+from utils.pagination import keyset, make_page  # noqa: E402
+from utils.serialization import dumps, orjson  # noqa: E402
+
+def seed_rows(rows: int):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"user_id": i, "name": f"User {i}", "email": f"user{i}@example.com",
+             "password": "x", "role": models.UserRole.USER}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(models.Project.__table__.insert(), [{
+            "project_id": 1, "title": "Proyecto grande", "description": "Proyecto de benchmark",
+            "status": models.ProjectStatus.ACTIVE, "owner_id": 1,
+        }])
+        conn.execute(models.Membership.__table__.insert(), [
+            {"user_id": i, "project_id": 1, "role": models.MembershipRole.MEMBER, "is_active": i % 7 != 0}
+            for i in range(1, rows + 1)
+        ])
+        statuses = list(models.TaskStatus)
+        conn.execute(models.Task.__table__.insert(), [
+            {"title": f"Tarea número {t}", "description": "Tarea de benchmark con acentos: áéí",
+             "status": statuses[t % len(statuses)], "due_date": now + timedelta(minutes=t),
+             "project_id": 1, "assigned_to": 1}
+            for t in range(rows)
+        ])
+        conn.execute(models.Comment.__table__.insert(), [
+            {"content": f"Comentario {c}", "project_id": 1, "user_id": 1 + c % rows,
+             "created_at": now - timedelta(seconds=c)}
+            for c in range(rows)
+        ])
+
+def _validated(schema):
+    # Lo que hace FastAPI con response_model: validar y volcar con pydantic
+    adapter = TypeAdapter(schemas.Page[schema])
+    return lambda page: adapter.dump_json(adapter.validate_python(page, from_attributes=True))
+
+def cases(rows: int):
+    task_page = _validated(schemas.TaskResponse)
+    comment_page = _validated(schemas.CommentBase)
+    membership_page = _validated(schemas.MembershipBase)
+    user_page = _validated(schemas.UserResponse)
+
+    def legacy_project_tasks(db):
+        project = db.get(models.Project, 1)
+        tasks = db.scalars(keyset(
+            select(models.Task).where(models.Task.project_id == 1), [models.Task.task_id], None, rows
+        )).all()
+        return task_page(make_page(tasks, lambda t: (t.task_id,), rows, lambda task: {
+            "task_id": task.task_id, "title": task.title, "description": task.description,
+            "status": task.status, "due_date": task.due_date, "project_id": task.project_id,
+            "assigned_to": task.assigned_to, "project_title": project.title,
+            "project_status": project.status,
+        }))
+
+    def fast_project_tasks(db):
+        project = db.execute(
+            select(models.Project.title, models.Project.status).where(models.Project.project_id == 1)
+        ).first()
+        tasks = db.execute(keyset(
+            PROJECT_TASK_ROWS.select().where(models.Task.project_id == 1), [models.Task.task_id], None, rows
+        )).all()
+        return dumps(make_page(tasks, lambda t: (t.task_id,), rows, PROJECT_TASK_ROWS.transform(
+            project_title=project.title, project_status=project.status)))
+
+    def legacy_user_tasks(db):
+        tasks = db.scalars(keyset(
+            select(models.Task).where(models.Task.assigned_to == 1)
+            .join(models.Project, models.Task.project_id == models.Project.project_id)
+            .options(contains_eager(models.Task.project)),
+            [models.Task.task_id], None, rows
+        )).unique().all()
+        return task_page(make_page(tasks, lambda t: (t.task_id,), rows, lambda task: {
+            "task_id": task.task_id, "title": task.title, "description": task.description,
+            "status": task.status, "due_date": task.due_date, "project_id": task.project_id,
+            "assigned_to": task.assigned_to, "project_title": task.project.title,
+        }))
+
+    def fast_user_tasks(db):
+        tasks = db.execute(keyset(
+            USER_TASK_ROWS.select().where(models.Task.assigned_to == 1)
+            .join(models.Project, models.Task.project_id == models.Project.project_id),
+            [models.Task.task_id], None, rows
+        )).all()
+        return dumps(make_page(tasks, lambda t: (t.task_id,), rows, USER_TASK_ROWS.transform(project_status=None)))
+
+    def legacy_orm(model, key, page, descending=False):
+        def run(db):
+            items = db.scalars(keyset(select(model), key, None, rows, descending=descending)).all()
+            return page(make_page(items, lambda item: tuple(getattr(item, c.key) for c in key), rows))
+        return run
+
+    def fast_rows(serializer, key, descending=False):
+        def run(db):
+            items = db.execute(keyset(serializer.select(), key, None, rows, descending=descending)).all()
+            return dumps(make_page(items, lambda item: tuple(getattr(item, c.key) for c in key), rows,
+                                   serializer.transform()))
+        return run
+
+    membership_key = [models.Membership.membership_id]
+    user_key = [models.User.user_id]
+    return [
+        ("TaskResponse (proyecto)", legacy_project_tasks, fast_project_tasks),
+        ("TaskResponse (usuario)", legacy_user_tasks, fast_user_tasks),
+        ("CommentBase", legacy_orm(models.Comment, COMMENT_KEY, comment_page, descending=True),
+         fast_rows(COMMENT_ROWS, COMMENT_KEY, descending=True)),
+        ("MembershipBase", legacy_orm(models.Membership, membership_key, membership_page),
+         fast_rows(MEMBERSHIP_ROWS, membership_key)),
+        ("UserResponse", legacy_orm(models.User, user_key, user_page),
+         fast_rows(USER_ROWS, user_key)),
+    ]
+
+def time_call(fn, repeat: int):
+    samples, body = [], None
+    for _ in range(repeat):
+        # Sesión nueva en cada vuelta, como en una petición: sin identity map caliente
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            body = fn(db)
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, body
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--min-speedup", type=float, default=1.5,
+                        help="Mejora mínima exigida al camino rápido en cada esquema")
+    args = parser.parse_args()
+
+    common.reset_database()
+    seed_rows(args.rows)
+    print(f"{args.rows} filas por respuesta; encoder: {'orjson' if orjson else 'json (stdlib)'}")
+
+    failed = False
+    print(f"{'esquema':<26}{'actual ms':>11}{'rápido ms':>11}{'mejora':>9}{'KB':>8}  JSON")
+    for name, legacy, fast in cases(args.rows):
+        legacy_ms, expected = time_call(legacy, args.repeat)
+        fast_ms, body = time_call(fast, args.repeat)
+        same = json.loads(body) == json.loads(expected)
+        speedup = legacy_ms / fast_ms
+        print(f"{name:<26}{legacy_ms:>11.1f}{fast_ms:>11.1f}{speedup:>8.1f}x{len(body) / 1024:>8.0f}  "
+              f"{'idéntico' if body == expected else 'igual' if same else 'DISTINTO'}")
+        failed |= not same or speedup < args.min_speedup
+    if failed:
+        print("FAIL: salida distinta o mejora por debajo de --min-speedup")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# benchmarks/bench_workers.py
+# Escalado del lanzador de producción (python main.py, utils/server.py) con
+# la mezcla de peticiones de bench_load: el mismo servidor con 1, 2, 4... N
+# workers (por defecto hasta el número de CPUs). La carga sale de varios
+# procesos cliente para que el generador no sea el cuello de botella; aun así
+# comparten las CPUs con el servidor, así que la eficiencia esperable es menor
+# que 1 cuando workers + clientes superan las CPUs. Con --reload se envía
+# SIGHUP a mitad de la última ronda y falla si alguna petición da error.
+#
+#   cd backend && python -m benchmarks.bench_workers --workers 1 2 4 --clients 2
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+from benchmarks import common
+from benchmarks.bench_load import load_visitors, run_mix
+
+from utils.server import _default_workers
+
+@contextlib.contextmanager
+def launch(workers: int):
+    port = common.free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=common.BACKEND_DIR,
+        env={**os.environ, "PASSWORD_POOL_SIZE": "0", "SERVER_WORKERS": str(workers),
+             "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        common.wait_until_up(base_url)
+        yield base_url, proc
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+def _client(args):
+    base_url, visitors, concurrency, requests, seed = args
+    failures = {}
+    result = asyncio.run(run_mix(base_url, visitors, concurrency, requests, seed=seed, failures=failures))
+    return result["TOTAL"], failures
+
+def measure(pool, base_url: str, visitors, clients: int, concurrency: int, requests: int, seed: int,
+            failures: dict = None) -> dict:
+    # Cada cliente lleva una parte de la concurrencia y de las peticiones
+    results = []
+    for total, client_failures in pool.map(_client, [
+        (base_url, visitors, max(1, concurrency // clients), requests // clients, seed * clients + i)
+        for i in range(clients)
+    ]):
+        results.append(total)
+        if failures is not None:
+            for key, count in client_failures.items():
+                failures[key] = failures.get(key, 0) + count
+    return {
+        "requests": sum(r["requests"] for r in results),
+        "errors": sum(r["errors"] for r in results),
+        "rps": sum(r["rps"] for r in results),
+        "p50_ms": max(r["p50_ms"] for r in results),
+        "p95_ms": max(r["p95_ms"] for r in results),
+        "p99_ms": max(r["p99_ms"] for r in results),
+    }
+
+def main() -> int:
+    cpus = _default_workers()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, cpus} | {2 ** i for i in range(1, 8) if 2 ** i < cpus}))
+    parser.add_argument("--clients", type=int, default=max(1, cpus // 2), help="Procesos generadores de carga")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=4000, help="Peticiones medidas por ronda")
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument("--reload", action="store_true", help="SIGHUP durante la última ronda")
+    parser.add_argument("--min-efficiency", type=float, default=0.0,
+                        help="Falla si RPS(N) / (N * RPS(1)) queda por debajo (0: no comprueba)")
+    args = parser.parse_args()
+
+    common.reset_database()
+    common.seed(users=200, projects=50, tasks_per_project=200, comments_per_project=200, members_per_project=8)
+    visitors = load_visitors()
+    print(f"CPUs: {cpus}, procesos cliente: {args.clients}")
+
+    rows, failed, failures = [], [], {}
+    with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+        for workers in args.workers:
+            with launch(workers) as (base_url, proc):
+                measure(pool, base_url, visitors, args.clients, args.concurrency, args.warmup, seed=-1)
+                rows.append((f"{workers} workers", measure(
+                    pool, base_url, visitors, args.clients, args.concurrency, args.requests, seed=0, failures=failures)))
+                if args.reload and workers == args.workers[-1]:
+                    # Reinicio escalonado en plena carga: no debe fallar ninguna petición
+                    timer = threading.Timer(0.5, proc.send_signal, (signal.SIGHUP,))
+                    timer.start()
+                    result = measure(pool, base_url, visitors, args.clients, args.concurrency, args.requests,
+                                     seed=1, failures=failures)
+                    timer.join()
+                    rows.append((f"{workers} workers + SIGHUP", result))
+                    if result["errors"]:
+                        failed.append(f"SIGHUP: {result['errors']} errores")
+
+    common.print_table(f"Mezcla del frontend, c={args.concurrency}", rows)
+    base = rows[0][1]["rps"] / args.workers[0]
+    print(f"\n{'workers':<10}{'rps':>10}{'escalado':>10}{'eficiencia':>12}")
+    for workers, (_, result) in zip(args.workers, rows):
+        scaling = result["rps"] / rows[0][1]["rps"]
+        efficiency = result["rps"] / (workers * base)
+        print(f"{workers:<10}{result['rps']:>10.1f}{scaling:>9.2f}x{efficiency:>12.0%}")
+        if result["errors"]:
+            failed.append(f"{workers} workers: {result['errors']} errores")
+        if args.min_efficiency and efficiency < args.min_efficiency:
+            failed.append(f"{workers} workers: eficiencia {efficiency:.0%} < {args.min_efficiency:.0%}")
+
+    for (name, reason), count in sorted(failures.items()):
+        print(f"ERROR {name}: {reason} (x{count})")
+    for failure in failed:
+        print(f"FAIL {failure}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# benchmarks/common.py
+# Utilidades compartidas por los benchmarks: base de datos local, datos de
+# prueba, servidor uvicorn en un subproceso y generador de carga con httpx.
+import asyncio
+import contextlib
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BENCH_DB = os.path.join(BACKEND_DIR, "bench.db")
+
+def use_local_database(path: str = DEFAULT_BENCH_DB) -> str:
+    # Debe llamarse antes de importar database.py
+    url = os.environ.setdefault("DATABASE_URL", f"sqlite:///{path}")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    return url
+
+def reset_database():
+    # Esquema limpio aplicando las migraciones (incluye el índice de búsqueda)
+    from sqlalchemy import text
+    from database import engine
+    import migrations
+    import models
+    models.Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS search_documents"))
+        conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+    migrations.upgrade(engine)
+
+def seed(users: int = 50, projects: int = 20, tasks_per_project: int = 50,
+         comments_per_project: int = 100, members_per_project: int = 5):
+    # Inserta volúmenes realistas con inserts masivos (sin pasar por la API)
+    from database import engine
+    import models
+    from utils import counters
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    statuses = list(models.TaskStatus)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"user_id": i, "name": f"User {i}", "email": f"user{i}@example.com",
+             "password": "x", "role": models.UserRole.USER}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(models.Project.__table__.insert(), [
+            {"project_id": p, "title": f"Project {p}", "description": "Proyecto de benchmark",
+             "status": models.ProjectStatus.ACTIVE, "owner_id": rng.randint(1, users)}
+            for p in range(1, projects + 1)
+        ])
+        memberships, tasks, comments = [], [], []
+        for p in range(1, projects + 1):
+            for u in rng.sample(range(1, users + 1), min(members_per_project, users)):
+                memberships.append({"user_id": u, "project_id": p,
+                                    "role": models.MembershipRole.MEMBER, "is_active": True})
+            for t in range(tasks_per_project):
+                tasks.append({"title": f"Task {p}-{t}", "description": "Tarea de benchmark",
+                              "status": rng.choice(statuses),
+                              "due_date": now + timedelta(days=rng.randint(-30, 60)),
+                              "project_id": p, "assigned_to": rng.randint(1, users)})
+            for c in range(comments_per_project):
+                comments.append({"content": f"Comentario {c}", "project_id": p,
+                                 "user_id": rng.randint(1, users),
+                                 "created_at": now - timedelta(minutes=c)})
+        # Una lista vacía insertaría una fila con los valores por defecto
+        for table, rows in ((models.Membership.__table__, memberships),
+                            (models.Task.__table__, tasks),
+                            (models.Comment.__table__, comments)):
+            if rows:
+                conn.execute(table.insert(), rows)
+        # Los inserts masivos no pasan por los handlers: contadores recalculados
+        counters.repair(conn)
+
+def auth_headers(email: str) -> dict:
+    # Token firmado directamente, sin pasar por el login (bcrypt)
+    from utils.auth import create_access_token
+    return {"Authorization": f"Bearer {create_access_token({'sub': email, 'role': 'user'})}"}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@contextlib.contextmanager
+def serve(app_path: str, port: int = None, extra_args=(), env=None, with_process: bool = False,
+          poll_interval: float = 0.1):
+    # Arranca uvicorn en un subproceso y espera a que acepte conexiones;
+    # con with_process devuelve también el Popen (p. ej. para medir su RSS)
+    port = port or free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--port", str(port),
+         "--log-level", "warning", *extra_args],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **(env or {})},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(base_url, poll_interval)
+        yield (base_url, proc) if with_process else base_url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+def wait_until_up(base_url: str, poll_interval: float = 0.1, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(httpx.HTTPError):
+            httpx.get(base_url + "/", timeout=1)
+            return
+        time.sleep(poll_interval)
+
+def rss_bytes(pid: int) -> int:
+    # Memoria residente de un proceso (Linux, /proc)
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def cpu_seconds(pid: int) -> float:
+    # CPU consumida por un proceso, usuario + sistema (Linux, /proc)
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def percentile(samples, p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+async def run_load(base_url: str, paths, concurrency: int, total_requests: int,
+                   headers=None, method: str = "GET", data=None) -> dict:
+    # `concurrency` clientes lanzan peticiones en bucle hasta completar el total
+    latencies, errors = [], 0
+    remaining = total_requests
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60,
+                                 headers=headers) as client:
+        async def worker(worker_id: int):
+            nonlocal remaining, errors
+            rng = random.Random(worker_id)
+            while remaining > 0:
+                remaining -= 1
+                path = rng.choice(paths)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, data=data)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return summarize(latencies, errors, elapsed)
+
+def print_table(title: str, rows):
+    width = max([28] + [len(name) + 2 for name, _ in rows])
+    print(f"\n{title}")
+    print(f"{'caso':<{width}}{'req':>8}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in rows:
+        print(f"{name:<{width}}{r['requests']:>8}{r['errors']:>6}{r['rps']:>10.1f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
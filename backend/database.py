@@ -1,17 +1,129 @@
+import asyncio
+import contextlib
+import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from starlette.requests import HTTPConnection
+from utils.db_pool import pool_options_from_env, instrumented_pool_class
+from utils import replica
 
-SQLALCHEMY_DATABASE_URL = "mysql+pymysql://root:@localhost:3306/proyectofinal"
+SQLALCHEMY_DATABASE_URL = os.getenv(
+    "DATABASE_URL", "mysql+pymysql://root:@localhost:3306/proyectofinal"
+)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def to_async_url(url: str) -> str:
+    # Mismo servidor, pero con el driver asyncio correspondiente
+    if url.startswith("mysql+pymysql://") or url.startswith("mysql://"):
+        return "mysql+aiomysql://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(SQLALCHEMY_DATABASE_URL))
+
+def _engine_options(url: str, pool_base) -> dict:
+    # Tamaño, overflow, timeout, recycle, pre-ping y LIFO vienen de DB_POOL_*
+    options = pool_options_from_env(url)
+    if options:
+        options["poolclass"] = instrumented_pool_class(pool_base)
+    return options
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL, QueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor asíncrono: los routers de proyectos, tareas, comentarios y membresías
+# lo usan para no bloquear el threadpool de Starlette mientras esperan a MySQL
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool)
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# Réplica de lectura opcional: los GET leen de ella (utils/replica.py). Sin
+# REPLICA_DATABASE_URL todo va al primario
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+ASYNC_REPLICA_DATABASE_URL = os.getenv(
+    "ASYNC_REPLICA_DATABASE_URL", REPLICA_DATABASE_URL and to_async_url(REPLICA_DATABASE_URL)
+)
+replica_engine = async_replica_engine = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(REPLICA_DATABASE_URL, **_engine_options(REPLICA_DATABASE_URL, QueuePool))
+    async_replica_engine = create_async_engine(
+        ASYNC_REPLICA_DATABASE_URL, **_engine_options(ASYNC_REPLICA_DATABASE_URL, AsyncAdaptedQueuePool)
+    )
+    replica.router.configured = True
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+def pool_status() -> dict:
+    # Estado en vivo de ambos pools (conexiones en uso, overflow, esperas, fallos)
+    status = {}
+    pools = [("sync", engine.pool), ("async", async_engine.pool)]
+    if replica_engine is not None:
+        pools += [("replica_sync", replica_engine.pool), ("replica_async", async_replica_engine.pool)]
+    for name, pool in pools:
+        stats = getattr(pool, "stats", None)
+        status[name] = stats.snapshot(pool) if stats else {"status": pool.status()}
+    return status
+
+# Conexiones que se abren en cada pool al arrancar; con 0 el engine conecta
+# en la primera petición que lo necesita
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "0"))
+
+async def warm_up_pools(connections: int = None):
+    # Hasta `connections` conexiones por pool, sin pasar de su tamaño
+    connections = DB_POOL_WARMUP if connections is None else connections
+    if connections <= 0:
+        return
+
+    def count(pool) -> int:
+        return min(connections, pool.size() if hasattr(pool, "size") else 1)
+
+    def warm_sync(engine):
+        # Se abren todas a la vez para que el pool se quede con ellas
+        with contextlib.ExitStack() as stack:
+            for _ in range(count(engine.pool)):
+                stack.enter_context(engine.connect())
+
+    async def warm_async(engine):
+        async with contextlib.AsyncExitStack() as stack:
+            await asyncio.gather(*(
+                stack.enter_async_context(engine.connect()) for _ in range(count(engine.pool))
+            ))
+
+    warm = [asyncio.to_thread(warm_sync, engine), warm_async(async_engine)]
+    if replica_engine is not None:
+        warm += [asyncio.to_thread(warm_sync, replica_engine), warm_async(async_replica_engine)]
+    await asyncio.gather(*warm)
+
+def get_db(connection: HTTPConnection):
+    # Los GET pueden leer de la réplica; véase get_async_db
+    use_replica = replica.router.use_replica(connection)
+    db = SessionLocal(bind=replica_engine) if use_replica else SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        if connection.scope.get("method") not in replica.READ_METHODS:
+            replica.router.record_write(connection)
+
+async def get_async_db(connection: HTTPConnection):
+    # GET y HEAD leen de la réplica si está al día y el cliente no acaba de
+    # escribir; el resto de métodos va al primario y marca al cliente para
+    # que sus próximas lecturas también vayan al primario
+    use_replica = replica.router.use_replica(connection)
+    token = replica.mark_request(use_replica)
+    try:
+        async with (AsyncSessionLocal(bind=async_replica_engine) if use_replica else AsyncSessionLocal()) as db:
+            yield db
+    finally:
+        replica.unmark_request(token)
+        if connection.scope.get("method") not in replica.READ_METHODS:
+            replica.router.record_write(connection)
@@ -1,38 +1,111 @@
 # main.py
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine
-import models
-from routes import users, projects, tasks, comments, memberships, auth
-
-# Crear las tablas en la base de datos
-models.Base.metadata.create_all(bind=engine)
-
-# Inicializar FastAPI
-app = FastAPI(
-    title="Project Management API",
-    description="API para gestión de proyectos y tareas",
-    version="1.0.0"
-)
-
-# Configuración de CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # En producción, especifica los orígenes permitidos
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Incluir todos los routers
-app.include_router(users.router, prefix="/api/users", tags=["Users"])
-app.include_router(projects.router, prefix="/api/projects", tags=["Projects"])
-app.include_router(tasks.router, prefix="/api/tasks", tags=["Tasks"])
-app.include_router(comments.router, prefix="/api/comments", tags=["Comments"])
-app.include_router(memberships.router, prefix="/api/memberships", tags=["Memberships"])
-app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
-
-@app.get("/", tags=["Root"])
+from fastapi.responses import PlainTextResponse
+from database import async_engine, async_replica_engine, engine, replica_engine, pool_status, warm_up_pools
+import migrations
+from routes import users, projects, tasks, comments, memberships, auth, exports, search, events, files, activity
+from utils.auth import get_current_user, require_admin, token_cache
+from utils import passwords
+from utils.db_pool import _env_bool
+from utils.response_cache import response_cache
+from utils.permissions import membership_cache
+from utils.events import broker
+from utils.bus import bus
+from utils.activity import log as activity_log
+from utils import metrics, profiler, replica
+import schemas
+
+# Migraciones al arrancar: sólo si se piden. En producción se aplican antes
+# de desplegar con `python -m migrations upgrade`
+DB_MIGRATE_ON_STARTUP = _env_bool("DB_MIGRATE_ON_STARTUP", False)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_MIGRATE_ON_STARTUP:
+        await asyncio.to_thread(migrations.upgrade, engine)
+    # Calibra el coste de bcrypt y arranca su pool de procesos antes de servir
+    await asyncio.to_thread(passwords.start)
+    # Conexiones abiertas de antemano (DB_POOL_WARMUP); si no, en la primera petición
+    await warm_up_pools()
+    # Latido de la réplica de lectura (REPLICA_DATABASE_URL)
+    monitor = None
+    if async_replica_engine is not None:
+        monitor = asyncio.create_task(replica.monitor(async_engine, async_replica_engine))
+    # Volcado por lotes del registro de actividad (y de lo que quedó en disco)
+    activity_log.start()
+    yield
+    if monitor is not None:
+        monitor.cancel()
+    # Antes de cerrar los pools: lo que no se pueda insertar va a ACTIVITY_SPOOL_DIR
+    await activity_log.stop()
+    passwords.shutdown()
+    await async_engine.dispose()
+    engine.dispose()
+    if replica_engine is not None:
+        await async_replica_engine.dispose()
+        replica_engine.dispose()
+
+router = APIRouter(tags=["Root"])
+
+def create_app() -> FastAPI:
+    """Construye la aplicación sin tocar la base de datos.
+
+    Importar main o llamar a create_app() no abre conexiones: el engine
+    conecta en la primera petición (o al calentar los pools en el lifespan).
+    """
+    app = FastAPI(
+        title="Project Management API",
+        description="API para gestión de proyectos y tareas",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # Configuración de CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # En producción, especifica los orígenes permitidos
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Métricas de Prometheus (GET /metrics); el middleware va por fuera de CORS
+    # para medir la petición completa
+    engines = [engine, async_engine.sync_engine]
+    if replica_engine is not None:
+        engines += [replica_engine, async_replica_engine.sync_engine]
+    if metrics.METRICS_ENABLED:
+        for instrumented in engines:
+            metrics.instrument_engine(instrumented)
+        app.add_middleware(metrics.MetricsMiddleware)
+
+    # Log de sentencias lentas y detector de N+1 (PROFILER_*, PUT /profiler)
+    for instrumented in engines:
+        profiler.register_engine(instrumented)
+    app.add_middleware(profiler.ProfilerMiddleware)
+
+    # Incluir todos los routers; users y auth protegen sus rutas una a una
+    # porque el registro y el login son públicos, y events autentica cada
+    # conexión (también con ?access_token=, que SSE y WebSocket necesitan)
+    authenticated = [Depends(get_current_user)]
+    app.include_router(users.router, prefix="/api/users", tags=["Users"])
+    app.include_router(projects.router, prefix="/api/projects", tags=["Projects"], dependencies=authenticated)
+    app.include_router(tasks.router, prefix="/api/tasks", tags=["Tasks"], dependencies=authenticated)
+    app.include_router(comments.router, prefix="/api/comments", tags=["Comments"], dependencies=authenticated)
+    app.include_router(memberships.router, prefix="/api/memberships", tags=["Memberships"], dependencies=authenticated)
+    app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
+    app.include_router(exports.router, prefix="/api/exports", tags=["Exports"], dependencies=authenticated)
+    app.include_router(search.router, prefix="/api/search", tags=["Search"], dependencies=authenticated)
+    app.include_router(files.router, prefix="/api/files", tags=["Files"], dependencies=authenticated)
+    app.include_router(activity.router, prefix="/api/activity", tags=["Activity"], dependencies=authenticated)
+    app.include_router(events.router, prefix="/api/events", tags=["Events"])
+    app.include_router(router)
+    return app
+
+@router.get("/")
 async def read_root():
     return {
         "message": "Bienvenido a la API de Gestión de Proyectos",
@@ -41,6 +114,65 @@ async def read_root():
         "documentation": "/docs",
     }
 
+@router.get("/db/pool")
+async def read_pool_status():
+    # Contadores del pool para dimensionarlo con datos (DB_POOL_*)
+    return pool_status()
+
+@router.get("/db/replica")
+async def read_replica_status():
+    # Retraso de la réplica y a dónde han ido las lecturas en este proceso
+    return replica.router.stats()
+
+@router.get("/cache/stats")
+async def read_cache_stats():
+    # Aciertos/fallos y memoria de las cachés en memoria del proceso, y los
+    # mensajes intercambiados con los demás workers
+    return {
+        "auth": token_cache.stats(),
+        "responses": response_cache.stats(),
+        "memberships": membership_cache.stats(),
+        "bus": bus.stats(),
+    }
+
+@router.get("/events/stats")
+async def read_event_stats():
+    # Conexiones abiertas y eventos publicados en este proceso
+    return broker.stats()
+
+@router.get("/activity/stats")
+async def read_activity_stats():
+    # Filas en cola, volcadas y en disco del registro de actividad de este proceso
+    return activity_log.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    # Formato de texto de Prometheus; el threadpool y los pools se leen ahora
+    return PlainTextResponse(metrics.render(pool_status()), media_type="text/plain; version=0.0.4")
+
+@router.get("/profiler", dependencies=[Depends(require_admin)])
+async def read_profiler():
+    # Ajustes, sentencias lentas e informes recientes de peticiones muestreadas
+    return profiler.stats()
+
+@router.put("/profiler", dependencies=[Depends(require_admin)])
+async def update_profiler(profiler_settings: schemas.ProfilerSettings):
+    profiler.configure(**profiler_settings.dict(exclude_unset=True))
+    return profiler.stats()
+
+# Para `uvicorn main:app`; también vale `uvicorn --factory main:create_app`
+app = create_app()
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Producción: SERVER_WORKERS workers sobre un mismo socket, con reciclado
+    # y reinicio escalonado con SIGHUP (utils/server.py)
+    import os
+    import sys
+    from utils import server
+    if DB_MIGRATE_ON_STARTUP:
+        # Una sola vez, en el maestro: los workers arrancan a la vez y cada
+        # uno intentaría aplicar las mismas migraciones
+        migrations.upgrade(engine)
+        engine.dispose()
+        os.environ["DB_MIGRATE_ON_STARTUP"] = "false"
+    sys.exit(server.run("main:app"))
\ No newline at end of file
@@ -0,0 +1,63 @@
+# migrations/__init__.py
+# Migraciones versionadas del esquema. Cada módulo vNNNN_* define VERSION,
+# NAME y upgrade(conn); las aplicadas se registran en `schema_migrations`.
+# Cada migración declara sus tablas, columnas e índices tal como eran al
+# escribirla (no los modelos actuales): cada cambio posterior de models.py
+# necesita su migración, y `python -m migrations check`
+# falla si la base migrada no tiene alguna tabla, columna o índice de los modelos.
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select
+from sqlalchemy.sql import func
+
+from migrations import (
+    v0001_initial, v0002_hot_path_indexes, v0003_search_index, v0004_project_stats,
+    v0005_membership_project_index, v0006_replica_heartbeat, v0007_file_storage,
+    v0008_activity_log,
+)
+
+MIGRATIONS = [
+    v0001_initial,
+    v0002_hot_path_indexes,
+    v0003_search_index,
+    v0004_project_stats,
+    v0005_membership_project_index,
+    v0006_replica_heartbeat,
+    v0007_file_storage,
+    v0008_activity_log,
+]
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+def applied_versions(conn) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def pending(conn) -> list:
+    applied = applied_versions(conn)
+    return [m for m in MIGRATIONS if m.VERSION not in applied]
+
+def upgrade(engine, target: int = None) -> list:
+    """Aplica en orden las migraciones pendientes hasta `target` (o todas)."""
+    done = []
+    with engine.begin() as conn:
+        for migration in pending(conn):
+            if target is not None and migration.VERSION > target:
+                break
+            migration.upgrade(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=migration.VERSION, name=migration.NAME
+            ))
+            done.append(migration.VERSION)
+    return done
+
+def current_version(engine) -> int:
+    with engine.begin() as conn:
+        applied = applied_versions(conn)
+    return max(applied, default=0)
@@ -0,0 +1,54 @@
+# migrations/__main__.py
+#   python -m migrations upgrade [--target N]
+#   python -m migrations current
+#   python -m migrations check        # esquema frente a modelos y EXPLAIN de las consultas calientes
+#   python -m migrations repair-counters [--dry-run]
+import argparse
+import sys
+
+from database import engine
+import migrations
+from migrations import explain, schema
+from utils import counters
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m migrations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    upgrade = sub.add_parser("upgrade", help="Aplica las migraciones pendientes")
+    upgrade.add_argument("--target", type=int, default=None)
+    sub.add_parser("current", help="Muestra la versión aplicada")
+    sub.add_parser("check", help="Verifica que el esquema coincide con los modelos y que las consultas calientes usan su índice")
+    repair = sub.add_parser("repair-counters", help="Recalcula los contadores de project_stats e informa de la deriva")
+    repair.add_argument("--dry-run", action="store_true", help="Sólo informa, no corrige")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = migrations.upgrade(engine, target=args.target)
+        print(f"Applied: {applied or 'nothing to do'}")
+    elif args.command == "current":
+        print(migrations.current_version(engine))
+    elif args.command == "check":
+        with engine.connect() as conn:
+            missing = schema.drift(conn)
+        for name in missing:
+            print(f"FAIL schema: missing {name} (a model change without its migration?)")
+        failures = explain.check(engine)
+        for query, indexes in failures:
+            print(f"FAIL {query.name}: expected {query.index}, got {sorted(indexes) or 'full scan'}")
+        if missing or failures:
+            return 1
+        print(f"OK: schema matches the models, {len(explain.HOT_QUERIES)} hot queries use their indexes")
+    elif args.command == "repair-counters":
+        with engine.connect() as conn:
+            drift = counters.repair(conn, fix=not args.dry_run, commit_each_batch=True)
+        for entry in drift:
+            print(f"DRIFT project {entry.project_id} {entry.column}: stored {entry.stored}, actual {entry.actual}")
+        projects = len({entry.project_id for entry in drift})
+        action = "reported" if args.dry_run else "fixed"
+        print(f"{len(drift)} drifted counters in {projects} projects {action}")
+        if drift and args.dry_run:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
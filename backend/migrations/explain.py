@@ -0,0 +1,112 @@
+# migrations/explain.py
+# Comprueba con EXPLAIN que cada consulta caliente sigue usando su índice.
+# Se ejecuta con `python -m migrations check` y termina con código 1 si
+# alguna consulta deja de usarlo (pensado para CI).
+from collections import namedtuple
+from sqlalchemy import text
+
+HotQuery = namedtuple("HotQuery", "name sql params index")
+
+HOT_QUERIES = [
+    HotQuery(
+        "tasks_by_project_status",
+        "SELECT task_id, title, status FROM tasks "
+        "WHERE project_id = :project_id AND status = :status",
+        {"project_id": 1, "status": "TODO"},
+        "idx_tasks_project_status",
+    ),
+    HotQuery(
+        "tasks_by_assignee_due",
+        "SELECT task_id, title, due_date FROM tasks "
+        "WHERE assigned_to = :user_id ORDER BY due_date LIMIT 50",
+        {"user_id": 1},
+        "idx_tasks_assignee_due",
+    ),
+    HotQuery(
+        "comments_by_project_recent",
+        "SELECT comment_id, content, created_at FROM comments "
+        "WHERE project_id = :project_id ORDER BY created_at DESC, comment_id DESC LIMIT 50",
+        {"project_id": 1},
+        "idx_comments_project_created",
+    ),
+    HotQuery(
+        "comments_by_user_recent",
+        "SELECT comment_id, content, created_at FROM comments "
+        "WHERE user_id = :user_id ORDER BY created_at DESC, comment_id DESC LIMIT 50",
+        {"user_id": 1},
+        "idx_comments_user_created",
+    ),
+    HotQuery(
+        "projects_by_status",
+        "SELECT project_id, title FROM projects WHERE status = :status",
+        {"status": "ACTIVE"},
+        "idx_projects_status",
+    ),
+    HotQuery(
+        "membership_lookup",
+        "SELECT membership_id, role FROM memberships "
+        "WHERE user_id = :user_id AND project_id = :project_id",
+        {"user_id": 1, "project_id": 1},
+        "idx_user_project",
+    ),
+    HotQuery(
+        "project_owners",
+        "SELECT count(*) FROM memberships "
+        "WHERE project_id = :project_id AND role = :role",
+        {"project_id": 1, "role": "OWNER"},
+        "idx_memberships_project_role",
+    ),
+    HotQuery(
+        "files_by_project",
+        "SELECT file_id, file_name FROM files "
+        "WHERE project_id = :project_id AND file_id > :file_id ORDER BY file_id LIMIT 50",
+        {"project_id": 1, "file_id": 0},
+        "idx_files_project",
+    ),
+    HotQuery(
+        "files_by_content_hash",
+        "SELECT 1 FROM files WHERE content_hash = :content_hash LIMIT 1",
+        {"content_hash": "0" * 64},
+        "idx_files_content_hash",
+    ),
+    HotQuery(
+        "activity_by_project",
+        "SELECT activity_id, type FROM activities "
+        "WHERE project_id = :project_id ORDER BY activity_id DESC LIMIT 50",
+        {"project_id": 1},
+        "idx_activities_project",
+    ),
+    HotQuery(
+        "activity_by_user",
+        "SELECT activity_id, type FROM activities "
+        "WHERE user_id = :user_id ORDER BY activity_id DESC LIMIT 50",
+        {"user_id": 1},
+        "idx_activities_user",
+    ),
+]
+
+def used_indexes(conn, query: HotQuery) -> set:
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        # detail: "SEARCH tasks USING [COVERING ]INDEX idx_... (project_id=?)"
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + query.sql), query.params)
+        found = set()
+        for row in rows:
+            words = row.detail.split()
+            if "INDEX" in words:
+                found.add(words[words.index("INDEX") + 1])
+        return found
+    if dialect == "mysql":
+        rows = conn.execute(text("EXPLAIN " + query.sql), query.params).mappings()
+        return {row["key"] for row in rows if row["key"]}
+    raise NotImplementedError(f"EXPLAIN check not supported for {dialect}")
+
+def check(engine) -> list:
+    """Devuelve la lista de (consulta, índices usados) que NO usan su índice."""
+    failures = []
+    with engine.connect() as conn:
+        for query in HOT_QUERIES:
+            indexes = used_indexes(conn, query)
+            if query.index not in indexes:
+                failures.append((query, indexes))
+    return failures
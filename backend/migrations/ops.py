@@ -0,0 +1,19 @@
+# migrations/ops.py
+# Operaciones reutilizables por las migraciones.
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+def create_index_if_missing(conn, index):
+    # Idempotente: una base creada con create_all ya puede tener el índice
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(index.table.name)}
+    if index.name not in existing:
+        index.create(conn)
+
+def add_column_if_missing(conn, column):
+    # El DDL sale de la columna fijada en la migración; nullable, así que no
+    # toca las filas
+    table = column.table
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    if column.name not in existing:
+        ddl = CreateColumn(column).compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
@@ -0,0 +1,29 @@
+# migrations/schema.py
+# Compara la base migrada con los modelos: cada tabla, columna e índice de
+# models.py (y la tabla del latido de la réplica) debe existir. v0001 crea
+# el esquema inicial fijo, así que lo que se añada a un modelo sin su
+# migración aparece aquí. Lo ejecuta `python -m migrations check`.
+from sqlalchemy import inspect
+
+import models
+from utils.replica import heartbeat
+
+def _tables():
+    return [*models.Base.metadata.sorted_tables, heartbeat]
+
+def drift(conn) -> list:
+    """Devuelve lo que falta en la base respecto a los modelos, como texto."""
+    inspector = inspect(conn)
+    existing = set(inspector.get_table_names())
+    missing = []
+    for table in _tables():
+        if table.name not in existing:
+            missing.append(f"table {table.name}")
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [f"column {table.name}.{column.name}" for column in table.columns
+                    if column.name not in columns]
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing += [f"index {table.name}.{index.name}" for index in table.indexes
+                    if index.name not in indexes]
+    return missing
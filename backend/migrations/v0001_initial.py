@@ -0,0 +1,85 @@
+# migrations/v0001_initial.py
+# Esquema inicial: las tablas que main.py creaba con create_all antes de las
+# migraciones, fijadas aquí tal como eran. No se importan los modelos: lo que
+# se les añada después llega con su propia migración.
+from sqlalchemy import (
+    Boolean, Column, DateTime, Enum, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+)
+from sqlalchemy.sql import func
+
+VERSION = 1
+NAME = "initial"
+
+metadata = MetaData()
+
+# Los Enum de los modelos guardan el nombre del miembro
+USER_ROLE = Enum("ADMIN", "USER", "MODERATOR", name="userrole")
+PROJECT_STATUS = Enum("ACTIVE", "COMPLETED", "ON_HOLD", "CANCELLED", name="projectstatus")
+TASK_STATUS = Enum("TODO", "IN_PROGRESS", "DONE", "REVIEW", name="taskstatus")
+MEMBERSHIP_ROLE = Enum("OWNER", "MEMBER", "VIEWER", name="membershiprole")
+
+Table(
+    "users", metadata,
+    Column("user_id", Integer, primary_key=True, index=True),
+    Column("name", String(50), nullable=False),
+    Column("email", String(100), unique=True, nullable=False, index=True),
+    Column("password", String(255), nullable=False),
+    Column("role", USER_ROLE),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "projects", metadata,
+    Column("project_id", Integer, primary_key=True, index=True),
+    Column("title", String(100), nullable=False),
+    Column("description", Text, nullable=False),
+    Column("status", PROJECT_STATUS),
+    Column("owner_id", Integer, ForeignKey("users.user_id"), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "tasks", metadata,
+    Column("task_id", Integer, primary_key=True, index=True),
+    Column("title", String(100), nullable=False),
+    Column("description", Text, nullable=False),
+    Column("status", TASK_STATUS),
+    Column("due_date", DateTime(timezone=True), nullable=False),
+    Column("project_id", Integer, ForeignKey("projects.project_id"), nullable=False),
+    Column("assigned_to", Integer, ForeignKey("users.user_id"), nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "files", metadata,
+    Column("file_id", Integer, primary_key=True, index=True),
+    Column("file_name", String(255), nullable=False),
+    Column("file_url", String(500), nullable=False),
+    Column("project_id", Integer, ForeignKey("projects.project_id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.user_id"), nullable=False),
+    Column("uploaded_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "comments", metadata,
+    Column("comment_id", Integer, primary_key=True, index=True),
+    Column("content", Text, nullable=False),
+    Column("project_id", Integer, ForeignKey("projects.project_id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.user_id"), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+memberships = Table(
+    "memberships", metadata,
+    Column("membership_id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.user_id"), nullable=False),
+    Column("project_id", Integer, ForeignKey("projects.project_id"), nullable=False),
+    Column("role", MEMBERSHIP_ROLE),
+    Column("joined_at", DateTime(timezone=True), server_default=func.now()),
+    Column("is_active", Boolean),
+)
+Index("idx_user_project", memberships.c.user_id, memberships.c.project_id, unique=True)
+
+def upgrade(conn):
+    # checkfirst deja intactas las bases ya creadas por versiones anteriores
+    metadata.create_all(bind=conn, checkfirst=True)
@@ -0,0 +1,49 @@
+# migrations/v0002_hot_path_indexes.py
+# Índices compuestos para las consultas más frecuentes (ver migrations/explain.py).
+# Tablas e índices fijados aquí, no leídos de models.py: sólo las columnas
+# que usan los índices.
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, MetaData, Table
+
+from migrations.ops import create_index_if_missing
+
+VERSION = 2
+NAME = "hot_path_indexes"
+
+metadata = MetaData()
+
+tasks = Table(
+    "tasks", metadata,
+    Column("task_id", Integer, primary_key=True),
+    Column("status", Enum("TODO", "IN_PROGRESS", "DONE", "REVIEW", name="taskstatus")),
+    Column("due_date", DateTime(timezone=True), nullable=False),
+    Column("project_id", Integer, nullable=False),
+    Column("assigned_to", Integer, nullable=True),
+)
+
+comments = Table(
+    "comments", metadata,
+    Column("comment_id", Integer, primary_key=True),
+    Column("project_id", Integer, nullable=False),
+    Column("user_id", Integer, nullable=False),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+projects = Table(
+    "projects", metadata,
+    Column("project_id", Integer, primary_key=True),
+    Column("status", Enum("ACTIVE", "COMPLETED", "ON_HOLD", "CANCELLED", name="projectstatus")),
+)
+
+INDEXES = [
+    Index("idx_tasks_project_status", tasks.c.project_id, tasks.c.status),
+    Index("idx_tasks_assignee_due", tasks.c.assigned_to, tasks.c.due_date),
+    Index("idx_comments_project_created", comments.c.project_id,
+          comments.c.created_at.desc(), comments.c.comment_id.desc()),
+    Index("idx_comments_user_created", comments.c.user_id,
+          comments.c.created_at.desc(), comments.c.comment_id.desc()),
+    Index("idx_projects_status", projects.c.status),
+]
+
+def upgrade(conn):
+    for index in INDEXES:
+        create_index_if_missing(conn, index)
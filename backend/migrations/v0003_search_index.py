@@ -0,0 +1,88 @@
+# migrations/v0003_search_index.py
+# Índice de texto completo (FULLTEXT en MySQL, FTS5 en SQLite) con los datos existentes.
+# DDL y consultas de origen fijados aquí, no leídos de utils/search.py ni de
+# models.py: doc_id = object_id * 4 + tipo (1 tarea, 2 comentario, 3 proyecto).
+from sqlalchemy import (
+    BigInteger, Column, Index, Integer, MetaData, String, Table, Text, insert, literal, select, text,
+)
+
+VERSION = 3
+NAME = "search_index"
+
+metadata = MetaData()
+
+# MySQL: tabla normal con índice FULLTEXT
+mysql_documents = Table(
+    "search_documents", metadata,
+    Column("doc_id", BigInteger, primary_key=True, autoincrement=False),
+    Column("kind", String(10), nullable=False),
+    Column("object_id", Integer, nullable=False),
+    Column("project_id", Integer, nullable=False, index=True),
+    Column("title", String(255), nullable=False, default=""),
+    Column("body", Text, nullable=False),
+    Index("ft_search_documents", "title", "body", mysql_prefix="FULLTEXT"),
+    mysql_engine="InnoDB",
+)
+
+# SQLite: tabla virtual FTS5, el doc_id es el rowid
+fts5_documents = Table(
+    "search_documents", MetaData(),
+    Column("rowid", Integer, key="doc_id", primary_key=True),
+    Column("title", Text),
+    Column("body", Text),
+    Column("kind", Text),
+    Column("object_id", Integer),
+    Column("project_id", Integer),
+)
+
+FTS5_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents USING fts5("
+    "title, body, kind UNINDEXED, object_id UNINDEXED, project_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+COLUMNS = ["doc_id", "kind", "object_id", "project_id", "title", "body"]
+
+# Tablas de origen: sólo las columnas que se indexan
+tasks = Table(
+    "tasks", metadata,
+    Column("task_id", Integer, primary_key=True),
+    Column("title", String(100)),
+    Column("description", Text),
+    Column("project_id", Integer),
+)
+
+comments = Table(
+    "comments", metadata,
+    Column("comment_id", Integer, primary_key=True),
+    Column("content", Text),
+    Column("project_id", Integer),
+)
+
+projects = Table(
+    "projects", metadata,
+    Column("project_id", Integer, primary_key=True),
+    Column("title", String(100)),
+    Column("description", Text),
+)
+
+SOURCES = [
+    select(tasks.c.task_id * 4 + 1, literal("task"), tasks.c.task_id,
+           tasks.c.project_id, tasks.c.title, tasks.c.description),
+    select(comments.c.comment_id * 4 + 2, literal("comment"), comments.c.comment_id,
+           comments.c.project_id, literal(""), comments.c.content),
+    select(projects.c.project_id * 4 + 3, literal("project"), projects.c.project_id,
+           projects.c.project_id, projects.c.title, projects.c.description),
+]
+
+def upgrade(conn):
+    if conn.dialect.name == "mysql":
+        documents = mysql_documents
+        documents.create(conn, checkfirst=True)
+    elif conn.dialect.name == "sqlite":
+        documents = fts5_documents
+        conn.execute(text(FTS5_DDL))
+    else:
+        raise NotImplementedError(f"Full-text search not supported on {conn.dialect.name}")
+    for source in SOURCES:
+        conn.execute(insert(documents).from_select(COLUMNS, source))
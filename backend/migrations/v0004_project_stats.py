@@ -0,0 +1,70 @@
+# migrations/v0004_project_stats.py
+# Tabla project_stats con los contadores por proyecto, rellenada con el
+# recuento actual (utils/counters.py la mantiene a partir de aquí). Tablas y
+# recuento fijados aquí, no leídos de models.py ni de utils/counters.py.
+from sqlalchemy import (
+    Column, Enum, ForeignKey, Integer, MetaData, Table, delete, func, insert, or_, select,
+)
+
+VERSION = 4
+NAME = "project_stats"
+
+metadata = MetaData()
+
+projects = Table("projects", metadata, Column("project_id", Integer, primary_key=True))
+
+project_stats = Table(
+    "project_stats", metadata,
+    Column("project_id", Integer, ForeignKey("projects.project_id"), primary_key=True),
+    Column("todo_tasks", Integer, nullable=False, server_default="0"),
+    Column("in_progress_tasks", Integer, nullable=False, server_default="0"),
+    Column("review_tasks", Integer, nullable=False, server_default="0"),
+    Column("done_tasks", Integer, nullable=False, server_default="0"),
+    Column("member_count", Integer, nullable=False, server_default="0"),
+    Column("comment_count", Integer, nullable=False, server_default="0"),
+)
+
+# Tablas contadas: sólo las columnas del recuento
+tasks = Table(
+    "tasks", metadata,
+    Column("task_id", Integer, primary_key=True),
+    Column("status", Enum("TODO", "IN_PROGRESS", "DONE", "REVIEW", name="taskstatus")),
+    Column("project_id", Integer),
+)
+memberships = Table(
+    "memberships", metadata,
+    Column("membership_id", Integer, primary_key=True),
+    Column("project_id", Integer),
+)
+comments = Table(
+    "comments", metadata,
+    Column("comment_id", Integer, primary_key=True),
+    Column("project_id", Integer),
+)
+
+def _count(table, *conditions):
+    return (
+        select(func.count()).select_from(table)
+        .where(table.c.project_id == projects.c.project_id, *conditions)
+        .scalar_subquery()
+    )
+
+def _recount():
+    # Una tarea sin estado cuenta como TODO, el valor por defecto del modelo
+    return select(
+        projects.c.project_id,
+        _count(tasks, or_(tasks.c.status == "TODO", tasks.c.status.is_(None))),
+        _count(tasks, tasks.c.status == "IN_PROGRESS"),
+        _count(tasks, tasks.c.status == "REVIEW"),
+        _count(tasks, tasks.c.status == "DONE"),
+        _count(memberships),
+        _count(comments),
+    )
+
+def upgrade(conn):
+    project_stats.create(conn, checkfirst=True)
+    # Recuento completo: deja la tabla igual que counters.repair() entonces
+    conn.execute(delete(project_stats))
+    conn.execute(insert(project_stats).from_select(
+        [column.name for column in project_stats.columns], _recount()
+    ))
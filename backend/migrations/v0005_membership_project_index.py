@@ -0,0 +1,23 @@
+# migrations/v0005_membership_project_index.py
+# Índice por (project_id, role) en memberships: recuento de owners y miembros
+# de un proyecto sin recorrer la tabla (idx_user_project empieza por user_id).
+from sqlalchemy import Column, Enum, Index, Integer, MetaData, Table
+
+from migrations.ops import create_index_if_missing
+
+VERSION = 5
+NAME = "membership_project_index"
+
+metadata = MetaData()
+
+memberships = Table(
+    "memberships", metadata,
+    Column("membership_id", Integer, primary_key=True),
+    Column("project_id", Integer, nullable=False),
+    Column("role", Enum("OWNER", "MEMBER", "VIEWER", name="membershiprole")),
+)
+
+INDEX = Index("idx_memberships_project_role", memberships.c.project_id, memberships.c.role)
+
+def upgrade(conn):
+    create_index_if_missing(conn, INDEX)
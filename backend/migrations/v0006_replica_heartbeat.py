@@ -0,0 +1,18 @@
+# migrations/v0006_replica_heartbeat.py
+# Tabla replica_heartbeat con su única fila: mide el retraso de la réplica de
+# lectura (utils/replica.py).
+from sqlalchemy import BigInteger, Column, Integer, MetaData, Table, insert, select
+
+VERSION = 6
+NAME = "replica_heartbeat"
+
+heartbeat = Table(
+    "replica_heartbeat", MetaData(),
+    Column("heartbeat_id", Integer, primary_key=True, autoincrement=False),
+    Column("beat_ms", BigInteger, nullable=False, server_default="0"),
+)
+
+def upgrade(conn):
+    heartbeat.create(conn, checkfirst=True)
+    if conn.execute(select(heartbeat.c.heartbeat_id)).first() is None:
+        conn.execute(insert(heartbeat).values(heartbeat_id=1, beat_ms=0))
@@ -0,0 +1,49 @@
+# migrations/v0007_file_storage.py
+# Columnas del contenido subido en files (hash, tamaño, tipo), sus índices y
+# la tabla file_uploads de las subidas reanudables (utils/storage.py).
+from sqlalchemy import (
+    BigInteger, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table,
+)
+from sqlalchemy.sql import func
+
+from migrations.ops import add_column_if_missing, create_index_if_missing
+
+VERSION = 7
+NAME = "file_storage"
+
+metadata = MetaData()
+
+# Sólo para resolver las claves ajenas; no se crean
+Table("projects", metadata, Column("project_id", Integer, primary_key=True))
+Table("users", metadata, Column("user_id", Integer, primary_key=True))
+
+files = Table(
+    "files", metadata,
+    Column("file_id", Integer, primary_key=True),
+    Column("project_id", Integer, nullable=False),
+    Column("content_hash", String(64), nullable=True),
+    Column("size", BigInteger, nullable=True),
+    Column("content_type", String(255), nullable=True),
+)
+
+file_uploads = Table(
+    "file_uploads", metadata,
+    Column("upload_id", String(32), primary_key=True),
+    Column("project_id", Integer, ForeignKey("projects.project_id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.user_id"), nullable=False),
+    Column("file_name", String(255), nullable=False),
+    Column("content_type", String(255), nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+INDEXES = [
+    Index("idx_files_project", files.c.project_id, files.c.file_id),
+    Index("idx_files_content_hash", files.c.content_hash),
+]
+
+def upgrade(conn):
+    for column in (files.c.content_hash, files.c.size, files.c.content_type):
+        add_column_if_missing(conn, column)
+    for index in INDEXES:
+        create_index_if_missing(conn, index)
+    file_uploads.create(conn, checkfirst=True)
@@ -0,0 +1,26 @@
+# migrations/v0008_activity_log.py
+# Tabla activities del registro de actividad (utils/activity.py) con sus
+# índices por proyecto y por autor.
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, MetaData, String, Table
+
+VERSION = 8
+NAME = "activity_log"
+
+metadata = MetaData()
+
+activities = Table(
+    "activities", metadata,
+    Column("activity_id", Integer, primary_key=True),
+    Column("project_id", Integer, nullable=False),
+    Column("user_id", Integer, nullable=True),
+    Column("type", String(50), nullable=False),
+    Column("object_id", Integer, nullable=True),
+    Column("data", JSON, nullable=True),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+)
+Index("idx_activities_project", activities.c.project_id, activities.c.activity_id)
+Index("idx_activities_user", activities.c.user_id, activities.c.activity_id)
+
+def upgrade(conn):
+    # checkfirst crea la tabla con sus índices sólo si no existe
+    activities.create(conn, checkfirst=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Boolean, Text, Enum, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -74,6 +74,28 @@ class Project(Base):
         back_populates="member_of_projects",
         viewonly=True
     )
+    # Contadores desnormalizados (ver utils/counters.py)
+    stats = relationship("ProjectStats", back_populates="project", uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index('idx_projects_status', status),
+    )
+
+class ProjectStats(Base):
+    # Una fila por proyecto, actualizada en la misma transacción que cada
+    # escritura de tareas, comentarios y membresías. Las tareas vencidas no se
+    # guardan: dependen de la hora, no de las escrituras
+    __tablename__ = "project_stats"
+
+    project_id = Column(Integer, ForeignKey("projects.project_id"), primary_key=True)
+    todo_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    in_progress_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    review_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    done_tasks = Column(Integer, nullable=False, default=0, server_default="0")
+    member_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    project = relationship("Project", back_populates="stats")
 
 class Task(Base):
     __tablename__ = "tasks"
@@ -91,6 +113,12 @@ class Task(Base):
     project = relationship("Project", back_populates="tasks")
     assigned_user = relationship("User", back_populates="tasks")
 
+    # Índices compuestos para los filtros más frecuentes
+    __table_args__ = (
+        Index('idx_tasks_project_status', project_id, status),
+        Index('idx_tasks_assignee_due', assigned_to, due_date),
+    )
+
 class File(Base):
     __tablename__ = "files"
 
@@ -100,11 +128,34 @@ class File(Base):
     project_id = Column(Integer, ForeignKey("projects.project_id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Sólo en los archivos subidos (utils/storage.py); un enlace externo
+    # registrado con file_url los deja a NULL
+    content_hash = Column(String(64), nullable=True)
+    size = Column(BigInteger, nullable=True)
+    content_type = Column(String(255), nullable=True)
 
     # Relaciones
     project = relationship("Project", back_populates="files")
     user = relationship("User", back_populates="files")
 
+    # Listado por proyecto en orden de file_id; el hash localiza los archivos
+    # que comparten blob al borrar
+    __table_args__ = (
+        Index('idx_files_project', project_id, file_id),
+        Index('idx_files_content_hash', content_hash),
+    )
+
+class FileUpload(Base):
+    # Subida reanudable en curso: las partes están en disco hasta completarla
+    __tablename__ = "file_uploads"
+
+    upload_id = Column(String(32), primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.project_id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    file_name = Column(String(255), nullable=False)
+    content_type = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class Comment(Base):
     __tablename__ = "comments"
 
@@ -118,6 +169,12 @@ class Comment(Base):
     project = relationship("Project", back_populates="comments")
     user = relationship("User", back_populates="comments")
 
+    # Los listados recorren (created_at, comment_id) descendente por proyecto o usuario
+    __table_args__ = (
+        Index('idx_comments_project_created', project_id, created_at.desc(), comment_id.desc()),
+        Index('idx_comments_user_created', user_id, created_at.desc(), comment_id.desc()),
+    )
+
 class Membership(Base):
     __tablename__ = "memberships"
 
@@ -135,4 +192,25 @@ class Membership(Base):
     # Índices compuestos para optimización
     __table_args__ = (
         Index('idx_user_project', user_id, project_id, unique=True),
-    )
\ No newline at end of file
+        Index('idx_memberships_project_role', project_id, role),
+    )
+
+class Activity(Base):
+    # Registro de actividad, sólo de inserción: lo escribe por lotes
+    # utils/activity.py tras el commit de cada escritura. Sin claves ajenas:
+    # sobrevive al borrado del proyecto o del usuario y no frena las inserciones
+    __tablename__ = "activities"
+
+    activity_id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    type = Column(String(50), nullable=False)
+    object_id = Column(Integer, nullable=True)
+    data = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Los feeds recorren activity_id descendente por proyecto o por autor
+    __table_args__ = (
+        Index('idx_activities_project', project_id, activity_id),
+        Index('idx_activities_user', user_id, activity_id),
+    )
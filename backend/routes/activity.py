@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+import models
+import schemas
+from utils.auth import get_current_user
+from utils.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+from utils.serialization import RowSerializer, json_response
+from utils import permissions
+
+router = APIRouter()
+
+# Más reciente primero, por los índices (project_id, activity_id) y
+# (user_id, activity_id). La actividad llega a la tabla por lotes
+# (utils/activity.py): una escritura aparece como mucho ACTIVITY_FLUSH_MS después
+ACTIVITY_KEY = [models.Activity.activity_id]
+
+ACTIVITY_ROWS = RowSerializer(models.Activity, schemas.ActivityResponse)
+
+def _activity_key(row):
+    return (row.activity_id,)
+
+@router.get("/project/{project_id}", response_model=schemas.Page[schemas.ActivityResponse])
+async def get_project_activity(
+    project_id: int,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await permissions.require(
+        db, current_user.user_id, project_id, "read",
+        detail="User is not a member of this project"
+    )
+
+    activities = (await db.execute(keyset(
+        ACTIVITY_ROWS.select().where(models.Activity.project_id == project_id),
+        ACTIVITY_KEY, cursor, limit, descending=True
+    ))).all()
+
+    return json_response(make_page(activities, _activity_key, limit, ACTIVITY_ROWS.transform()))
+
+@router.get("/user/{user_id}", response_model=schemas.Page[schemas.ActivityResponse])
+async def get_user_activity(
+    user_id: int,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Lo que hizo el usuario, sólo en los proyectos de los que quien pregunta
+    # es miembro activo
+    visible = select(models.Membership.project_id).where(
+        models.Membership.user_id == current_user.user_id,
+        models.Membership.is_active.is_(True)
+    )
+    activities = (await db.execute(keyset(
+        ACTIVITY_ROWS.select().where(
+            models.Activity.user_id == user_id,
+            models.Activity.project_id.in_(visible)
+        ),
+        ACTIVITY_KEY, cursor, limit, descending=True
+    ))).all()
+
+    return json_response(make_page(activities, _activity_key, limit, ACTIVITY_ROWS.transform()))
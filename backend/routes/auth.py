@@ -1,31 +1,38 @@
 # routes/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from database import get_db
+from database import get_async_db
 import models
 import schemas
-from utils.auth import verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.auth import verify_password, create_access_token, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter()
 
 @router.post("/login", response_model=schemas.Token)
-def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     # Buscar usuario por email
-    user = db.query(models.User).filter(models.User.email == user_credentials.username).first()
+    user = await db.scalar(select(models.User).where(models.User.email == user_credentials.username))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales incorrectas"
         )
     
-    # Verificar contraseña
-    if not verify_password(user_credentials.password, user.password):
+    # Verificar contraseña (en el pool de bcrypt)
+    valid, new_hash = await verify_password(user_credentials.password, user.password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales incorrectas"
         )
+
+    # El hash se guardó con un coste menor que el calibrado: se actualiza
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
     
     # Crear token de acceso
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -39,4 +46,9 @@ def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session =
         "token_type": "bearer",
         "user_id": user.user_id,  # Cambiado de user.id a user.user_id
         "name": user.name
-    }
\ No newline at end of file
+    }
+
+@router.get("/validate", response_model=schemas.CurrentUser)
+async def validate(current_user: schemas.CurrentUser = Depends(get_current_user)):
+    # Usado por el frontend para comprobar que el token sigue siendo válido
+    return current_user
\ No newline at end of file
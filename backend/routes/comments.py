@@ -1,49 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 import models
 import schemas
 from datetime import datetime
+from utils.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+from utils.response_cache import cached_response, invalidate_project
+from utils.events import publish
+from utils.serialization import RowSerializer, json_response
+from utils.auth import get_current_user
+from utils import activity, counters, permissions, search
 
 router = APIRouter()
 
+# Los comentarios se recorren por (created_at, comment_id) descendente
+COMMENT_KEY = [models.Comment.created_at, models.Comment.comment_id]
+
+def _comment_key(comment):
+    return (comment.created_at, comment.comment_id)
+
+# Listados serializados desde tuplas; la clave keyset va detrás
+COMMENT_ROWS = RowSerializer(models.Comment, schemas.CommentBase, extra=COMMENT_KEY)
+
 @router.post("/", response_model=schemas.CommentBase)
-def create_comment(
+async def create_comment(
     comment: schemas.CommentCreate,
-    db: Session = Depends(get_db)
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Verificar si el proyecto existe
-    project = db.query(models.Project).filter(
-        models.Project.project_id == comment.project_id
-    ).first()
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-
-    # Verificar si el usuario existe
-    user = db.query(models.User).filter(
-        models.User.user_id == comment.user_id
-    ).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
-    # Verificar si el usuario es miembro del proyecto
-    membership = db.query(models.Membership).filter(
-        models.Membership.project_id == comment.project_id,
-        models.Membership.user_id == comment.user_id
-    ).first()
-    if not membership:
+    # Sólo se comenta en nombre propio: autor, permiso y registro de
+    # actividad son el mismo usuario
+    if comment.user_id != current_user.user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="User is not a member of this project"
+            detail="Cannot comment as another user"
         )
 
+    # Membresía activa con permiso para comentar: una consulta por el índice
+    # idx_user_project o ninguna si está en caché. 404 si falta el proyecto
+    # o el usuario, 403 si no es miembro
+    await permissions.require(
+        db, comment.user_id, comment.project_id, "comment",
+        detail="User is not a member of this project"
+    )
+
     # Crear nuevo comentario
     db_comment = models.Comment(
         content=comment.content,
@@ -51,37 +51,41 @@ def create_comment(
         user_id=comment.user_id
     )
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
+    await db.flush()
+    await search.reindex_ids(db, "comment", [db_comment.comment_id])
+    await counters.adjust(db, db_comment.project_id, {"comment_count": 1})
+    await db.commit()
+    await db.refresh(db_comment)
+    invalidate_project(db_comment.project_id)
+    publish(db_comment.project_id, "comment.created", db_comment.comment_id)
+    activity.record(db_comment.project_id, "comment.created", db_comment.comment_id, current_user.user_id)
     return db_comment
 
-@router.get("/", response_model=List[schemas.CommentBase])
-def get_comments(
-    skip: int = 0,
-    limit: int = 100,
+@router.get("/", response_model=schemas.Page[schemas.CommentBase])
+async def get_comments(
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     project_id: int = None,
     user_id: int = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(models.Comment)
-    
+    query = COMMENT_ROWS.select()
+
     if project_id:
-        query = query.filter(models.Comment.project_id == project_id)
+        query = query.where(models.Comment.project_id == project_id)
     if user_id:
-        query = query.filter(models.Comment.user_id == user_id)
-    
+        query = query.where(models.Comment.user_id == user_id)
+
     # Ordenar por fecha de creación (más recientes primero)
-    query = query.order_by(models.Comment.created_at.desc())
-    
-    comments = query.offset(skip).limit(limit).all()
-    return comments
+    query = keyset(query, COMMENT_KEY, cursor, limit, descending=True)
+
+    comments = (await db.execute(query)).all()
+    return json_response(make_page(comments, _comment_key, limit, COMMENT_ROWS.transform()))
 
 @router.get("/{comment_id}", response_model=schemas.CommentBase)
-def get_comment(comment_id: int, db: Session = Depends(get_db)):
-    comment = db.query(models.Comment).filter(
-        models.Comment.comment_id == comment_id
-    ).first()
-    
+async def get_comment(comment_id: int, db: AsyncSession = Depends(get_async_db)):
+    comment = await db.get(models.Comment, comment_id)
+
     if comment is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -90,15 +94,13 @@ def get_comment(comment_id: int, db: Session = Depends(get_db)):
     return comment
 
 @router.put("/{comment_id}", response_model=schemas.CommentBase)
-def update_comment(
+async def update_comment(
     comment_id: int,
     comment_update: schemas.CommentUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_comment = db.query(models.Comment).filter(
-        models.Comment.comment_id == comment_id
-    ).first()
-    
+    db_comment = await db.get(models.Comment, comment_id)
+
     if db_comment is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -115,73 +117,82 @@ def update_comment(
     update_data = comment_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_comment, key, value)
-    
-    db.commit()
-    db.refresh(db_comment)
+
+    await search.reindex_ids(db, "comment", [comment_id])
+    await db.commit()
+    await db.refresh(db_comment)
+    invalidate_project(db_comment.project_id)
+    publish(db_comment.project_id, "comment.updated", comment_id)
     return db_comment
 
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_comment(comment_id: int, db: Session = Depends(get_db)):
-    db_comment = db.query(models.Comment).filter(
-        models.Comment.comment_id == comment_id
-    ).first()
-    
+async def delete_comment(
+    comment_id: int,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_comment = await db.get(models.Comment, comment_id)
+
     if db_comment is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Comment not found"
         )
-    
-    db.delete(db_comment)
-    db.commit()
+
+    await db.delete(db_comment)
+    await search.remove(db, "comment", [comment_id])
+    await counters.adjust(db, db_comment.project_id, {"comment_count": -1})
+    await db.commit()
+    invalidate_project(db_comment.project_id)
+    publish(db_comment.project_id, "comment.deleted", comment_id)
+    activity.record(db_comment.project_id, "comment.deleted", comment_id, current_user.user_id)
     return None
 
-@router.get("/project/{project_id}/comments", response_model=List[schemas.CommentBase])
-def get_project_comments(
+@router.get("/project/{project_id}/comments", response_model=schemas.Page[schemas.CommentBase])
+@cached_response(schemas.Page[schemas.CommentBase])
+async def get_project_comments(
     project_id: int,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verificar si el proyecto existe
-    project = db.query(models.Project).filter(
-        models.Project.project_id == project_id
-    ).first()
+    project = await db.get(models.Project, project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
 
-    comments = db.query(models.Comment).filter(
-        models.Comment.project_id == project_id
-    ).order_by(
-        models.Comment.created_at.desc()
-    ).offset(skip).limit(limit).all()
-    
-    return comments
+    comments = (await db.execute(keyset(
+        COMMENT_ROWS.select().where(
+            models.Comment.project_id == project_id
+        ),
+        COMMENT_KEY, cursor, limit, descending=True
+    ))).all()
+
+    return json_response(make_page(comments, _comment_key, limit, COMMENT_ROWS.transform()))
 
-@router.get("/user/{user_id}/comments", response_model=List[schemas.CommentBase])
-def get_user_comments(
+@router.get("/user/{user_id}/comments", response_model=schemas.Page[schemas.CommentBase])
+async def get_user_comments(
     user_id: int,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verificar si el usuario existe
-    user = db.query(models.User).filter(
-        models.User.user_id == user_id
-    ).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    comments = db.query(models.Comment).filter(
-        models.Comment.user_id == user_id
-    ).order_by(
-        models.Comment.created_at.desc()
-    ).offset(skip).limit(limit).all()
-    
-    return comments
\ No newline at end of file
+    comments = (await db.execute(keyset(
+        COMMENT_ROWS.select().where(
+            models.Comment.user_id == user_id
+        ),
+        COMMENT_KEY, cursor, limit, descending=True
+    ))).all()
+
+    return json_response(make_page(comments, _comment_key, limit, COMMENT_ROWS.transform()))
@@ -0,0 +1,97 @@
+# routes/events.py
+# Suscripción a los cambios de un proyecto por Server-Sent Events o WebSocket.
+# EventSource y WebSocket no permiten cabeceras en el navegador, así que el
+# token también se acepta como ?access_token=. Estas conexiones duran horas:
+# no usan get_async_db, que retendría una conexión del pool todo ese tiempo.
+import json
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.requests import HTTPConnection
+from database import AsyncSessionLocal
+from utils.auth import user_for_token, _credentials_error
+from utils.events import broker
+from utils import permissions
+
+router = APIRouter()
+
+def _token(connection: HTTPConnection, access_token: Optional[str]) -> str:
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    if access_token:
+        return access_token
+    raise _credentials_error("Not authenticated")
+
+async def _authorize(connection: HTTPConnection, project_id: int, access_token: Optional[str]):
+    # Usuario autenticado y miembro activo del proyecto
+    token = _token(connection, access_token)
+    async with AsyncSessionLocal() as db:
+        user = await user_for_token(token, db)
+        allowed = await permissions.can(db, user.user_id, project_id, "read")
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this project"
+        )
+    return user
+
+def _sse(batch) -> bytes:
+    return "".join(
+        f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        for event in batch
+    ).encode()
+
+async def _event_stream(project_id: int, resume_from: Optional[int]):
+    # La suscripción nace y muere dentro del generador: si el cliente se va
+    # antes de que empiece el cuerpo (o nunca se itera) no queda registrada
+    subscription = broker.subscribe(project_id, resume_from)
+    try:
+        # El navegador reconecta a los 3 s enviando Last-Event-ID
+        yield b"retry: 3000\n\n"
+        while True:
+            batch = await subscription.next_batch()
+            yield _sse(batch) if batch else b": ping\n\n"
+    finally:
+        broker.unsubscribe(project_id, subscription)
+
+@router.get("/{project_id}")
+async def project_events_sse(
+    project_id: int,
+    request: Request,
+    access_token: str = None,
+    last_event_id: int = Query(None),
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+):
+    await _authorize(request, project_id, access_token)
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+    return StreamingResponse(
+        _event_stream(project_id, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/{project_id}/ws")
+async def project_events_ws(
+    websocket: WebSocket,
+    project_id: int,
+    access_token: str = None,
+    last_event_id: int = None,
+):
+    try:
+        await _authorize(websocket, project_id, access_token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = broker.subscribe(project_id, last_event_id)
+    try:
+        while True:
+            # Un mensaje por ráfaga: lista JSON de eventos ([] como latido)
+            await websocket.send_text(json.dumps(await subscription.next_batch()))
+    except (WebSocketDisconnect, OSError):
+        # Cliente desconectado: el envío falla y se libera la suscripción
+        pass
+    finally:
+        broker.unsubscribe(project_id, subscription)
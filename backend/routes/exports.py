@@ -0,0 +1,196 @@
+# routes/exports.py
+# Exportaciones en streaming de tareas, comentarios y membresías. Las filas
+# se leen con un cursor de servidor por lotes (yield_per) y se escriben según
+# llegan, así que la memoria no depende del número de filas. Con project_id
+# hace falta poder leer el proyecto; sin él (toda la tabla), ser admin.
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+from enum import Enum
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, Boolean, DateTime, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, AsyncSessionLocal
+import models
+import schemas
+from utils.auth import get_current_user, require_admin
+from utils import permissions
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet es opcional: pip install pyarrow
+    pyarrow = None
+
+router = APIRouter()
+
+# Filas por lote leídas del cursor (y por row group en Parquet)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+EXPORTS = {
+    "tasks": (
+        models.Task.task_id, models.Task.project_id, models.Task.title, models.Task.description,
+        models.Task.status, models.Task.due_date, models.Task.assigned_to, models.Task.created_at,
+    ),
+    "comments": (
+        models.Comment.comment_id, models.Comment.project_id, models.Comment.user_id,
+        models.Comment.content, models.Comment.created_at,
+    ),
+    "memberships": (
+        models.Membership.membership_id, models.Membership.project_id, models.Membership.user_id,
+        models.Membership.role, models.Membership.is_active, models.Membership.joined_at,
+    ),
+}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+def _json_value(value):
+    value = _plain(value)
+    return value.isoformat() if isinstance(value, datetime) else value
+
+async def _batches(entity: str, project_id, bind):
+    # Sesión propia: el generador sigue vivo después de que termine el handler.
+    # `bind` es el engine de la sesión de la petición (primario o réplica)
+    columns = EXPORTS[entity]
+    query = select(*columns).order_by(columns[0])
+    if project_id is not None:
+        query = query.where(columns[1] == project_id)
+    async with AsyncSessionLocal(bind=bind) as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for batch in result.partitions():
+            yield batch
+
+async def _ndjson(names, batches):
+    async for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(names, map(_json_value, row))), ensure_ascii=False) + "\n"
+            for row in batch
+        ).encode()
+
+async def _csv(names, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    async for batch in batches:
+        writer.writerows([[_json_value(value) for value in row] for row in batch])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+class _ChunkSink(io.RawIOBase):
+    # Fichero de sólo escritura que entrega lo escrito entre lote y lote
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def _arrow_schema(columns):
+    # Esquema fijo: inferirlo por lote fallaría con lotes de sólo NULL
+    def arrow_type(column):
+        if isinstance(column.type, Boolean):
+            return pyarrow.bool_()
+        if isinstance(column.type, Integer):
+            return pyarrow.int64()
+        if isinstance(column.type, DateTime):
+            return pyarrow.timestamp("us")
+        return pyarrow.string()
+    return pyarrow.schema([(column.key, arrow_type(column)) for column in columns])
+
+async def _parquet(columns, batches):
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    async for batch in batches:
+        values = list(zip(*[[_plain(value) for value in row] for row in batch]))
+        writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=field.type) for column, field in zip(values, schema)],
+            schema=schema
+        ))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+async def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31: cabecera y cola gzip
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@router.get("/{entity}")
+async def export(
+    entity: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    project_id: int = None,
+    gzip: bool = False,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if entity not in EXPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown export"
+        )
+    if format == "parquet" and pyarrow is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires pyarrow"
+        )
+    if project_id is None:
+        await require_admin(current_user)
+    else:
+        await permissions.require(
+            db, current_user.user_id, project_id, "read",
+            detail="User is not a member of this project"
+        )
+
+    columns = EXPORTS[entity]
+    batches = _batches(entity, project_id, db.bind)
+    if format == "parquet":
+        body = _parquet(columns, batches)
+    else:
+        names = [column.key for column in columns]
+        body = (_ndjson if format == "ndjson" else _csv)(names, batches)
+    filename = f"{entity}{'-' + str(project_id) if project_id is not None else ''}.{format}"
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        body = _gzip(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
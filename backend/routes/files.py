@@ -0,0 +1,355 @@
+import asyncio
+import os
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status
+from fastapi import responses
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+import models
+import schemas
+from utils.auth import get_current_user
+from utils.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+from utils.response_cache import cached_response, invalidate_project
+from utils.events import publish
+from utils.serialization import RowSerializer, json_response
+from utils import permissions, storage
+
+router = APIRouter()
+
+# Mismo orden que la página de archivos del detalle de proyecto, así que su
+# files_cursor puede continuarse aquí
+FILE_KEY = [models.File.file_id]
+
+FILE_ROWS = RowSerializer(models.File, schemas.FileResponse)
+
+def _file_key(row):
+    return (row.file_id,)
+
+async def _get_file(db: AsyncSession, file_id: int) -> models.File:
+    db_file = await db.get(models.File, file_id)
+    if db_file is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    return db_file
+
+async def _get_upload(db: AsyncSession, upload_id: str, user_id: int) -> models.FileUpload:
+    # Una subida sólo la ve quien la empezó
+    upload = await db.get(models.FileUpload, upload_id)
+    if upload is None or upload.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    return upload
+
+async def _project_reader(
+    project_id: int,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Fuera de cached_response: se comprueba también cuando la página sale de caché
+    await permissions.require(
+        db, current_user.user_id, project_id, "read",
+        detail="User is not a member of this project"
+    )
+
+async def _save(db: AsyncSession, stored: storage.Stored, upload_id: str = None, **fields) -> models.File:
+    # Fila y, tras el commit, blob; si algo falla antes, el archivo recibido se borra
+    try:
+        if upload_id is not None:
+            # Una subida se completa una sola vez aunque llegue dos veces
+            deleted = await db.execute(
+                delete(models.FileUpload).where(models.FileUpload.upload_id == upload_id)
+            )
+            if deleted.rowcount == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Upload not found"
+                )
+        db_file = models.File(
+            file_url="",
+            content_hash=stored.content_hash,
+            size=stored.size,
+            **fields
+        )
+        db.add(db_file)
+        await db.flush()
+        db_file.file_url = f"/api/files/{db_file.file_id}/content"
+        await db.commit()
+    except BaseException:
+        storage.discard(stored)
+        raise
+    storage.commit_blob(stored)
+    await db.refresh(db_file)
+    invalidate_project(db_file.project_id)
+    publish(db_file.project_id, "file.created", db_file.file_id)
+    return db_file
+
+@router.post("/", response_model=schemas.FileResponse)
+async def create_file(
+    file: schemas.FileCreate,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Enlace externo: sólo se guarda file_url. Como en las subidas, el archivo
+    # es de quien hace la petición; el user_id del cuerpo se ignora
+    await permissions.require(
+        db, current_user.user_id, file.project_id, "write",
+        detail="User is not a member of this project"
+    )
+
+    db_file = models.File(**{**file.dict(), "user_id": current_user.user_id})
+    db.add(db_file)
+    await db.commit()
+    await db.refresh(db_file)
+    invalidate_project(db_file.project_id)
+    publish(db_file.project_id, "file.created", db_file.file_id)
+    return db_file
+
+@router.post("/upload", response_model=schemas.FileResponse)
+async def upload_file(
+    request: Request,
+    project_id: int,
+    file_name: str = Query(..., max_length=255),
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # El cuerpo es el contenido tal cual (no multipart/form-data), con su
+    # Content-Type; se escribe a disco según llega
+    await permissions.require(
+        db, current_user.user_id, project_id, "write",
+        detail="User is not a member of this project"
+    )
+    storage.check_length(request)
+
+    # Sin conexión retenida mientras llega el cuerpo; la sesión vuelve a
+    # pedir una al guardar
+    await db.close()
+    stored = await storage.receive(request)
+    return await _save(
+        db, stored,
+        file_name=file_name,
+        project_id=project_id,
+        user_id=current_user.user_id,
+        content_type=request.headers.get("content-type", "application/octet-stream")
+    )
+
+@router.post("/uploads", response_model=schemas.FileUploadResponse)
+async def create_upload(
+    upload: schemas.FileUploadCreate,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await permissions.require(
+        db, current_user.user_id, upload.project_id, "write",
+        detail="User is not a member of this project"
+    )
+
+    # De paso, las subidas abandonadas (FILES_UPLOAD_TTL_HOURS)
+    stale = storage.stale_uploads()
+    if stale:
+        await db.execute(delete(models.FileUpload).where(models.FileUpload.upload_id.in_(stale)))
+
+    upload_id = storage.new_upload()
+    db.add(models.FileUpload(upload_id=upload_id, user_id=current_user.user_id, **upload.dict()))
+    await db.commit()
+    for stale_id in stale:
+        await asyncio.to_thread(storage.remove_upload, stale_id)
+    return {"upload_id": upload_id, **upload.dict(), "parts": []}
+
+@router.get("/uploads/{upload_id}", response_model=schemas.FileUploadResponse)
+async def get_upload(
+    upload_id: str,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Para reanudar: qué partes han llegado completas
+    upload = await _get_upload(db, upload_id, current_user.user_id)
+    parts = await asyncio.to_thread(storage.list_parts, upload_id)
+    return {
+        "upload_id": upload.upload_id,
+        "project_id": upload.project_id,
+        "file_name": upload.file_name,
+        "content_type": upload.content_type,
+        "parts": [{"part_number": number, "size": size} for number, size in parts],
+    }
+
+@router.put("/uploads/{upload_id}/parts/{part_number}", response_model=schemas.FilePart)
+async def upload_part(
+    request: Request,
+    upload_id: str,
+    part_number: int = Path(..., ge=1, le=storage.FILES_MAX_PARTS),
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await _get_upload(db, upload_id, current_user.user_id)
+    storage.check_length(request)
+
+    await db.close()
+    size = await storage.receive_part(request, upload_id, part_number)
+    return {"part_number": part_number, "size": size}
+
+@router.post("/uploads/{upload_id}/complete", response_model=schemas.FileResponse)
+async def complete_upload(
+    upload_id: str,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    upload = await _get_upload(db, upload_id, current_user.user_id)
+    parts = await asyncio.to_thread(storage.list_parts, upload_id)
+
+    # Las partes se numeran desde 1 sin huecos
+    numbers = [number for number, _ in parts]
+    if not numbers:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload has no parts"
+        )
+    if numbers[-1] != len(numbers):
+        missing = next(n for n, number in enumerate(numbers, start=1) if n != number)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Missing part {missing}"
+        )
+    if sum(size for _, size in parts) > storage.FILES_MAX_BYTES:
+        raise storage.too_large()
+
+    # Unir varios GB lleva su tiempo: tampoco aquí se retiene la conexión
+    await db.close()
+    stored = await asyncio.to_thread(storage.assemble, upload_id, numbers)
+    db_file = await _save(
+        db, stored, upload_id=upload_id,
+        file_name=upload.file_name,
+        project_id=upload.project_id,
+        user_id=upload.user_id,
+        content_type=upload.content_type or "application/octet-stream"
+    )
+    await asyncio.to_thread(storage.remove_upload, upload_id)
+    return db_file
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: str,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    upload = await _get_upload(db, upload_id, current_user.user_id)
+    await db.delete(upload)
+    await db.commit()
+    await asyncio.to_thread(storage.remove_upload, upload_id)
+    return None
+
+@router.get("/project/{project_id}/files", response_model=schemas.Page[schemas.FileResponse],
+            dependencies=[Depends(_project_reader)])
+@cached_response(schemas.Page[schemas.FileResponse])
+async def get_project_files(
+    project_id: int,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
+    files = (await db.execute(keyset(
+        FILE_ROWS.select().where(models.File.project_id == project_id),
+        FILE_KEY, cursor, limit
+    ))).all()
+
+    return json_response(make_page(files, _file_key, limit, FILE_ROWS.transform()))
+
+@router.get("/{file_id}", response_model=schemas.FileResponse)
+async def get_file(
+    file_id: int,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_file = await _get_file(db, file_id)
+    await permissions.require(
+        db, current_user.user_id, db_file.project_id, "read",
+        detail="User is not a member of this project"
+    )
+    return db_file
+
+def _content_disposition(file_name: str) -> str:
+    # Como FileResponse: RFC 5987 si el nombre no es ASCII
+    quoted = quote(file_name)
+    if quoted != file_name:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{file_name}"'
+
+@router.api_route("/{file_id}/content", methods=["GET", "HEAD"])
+async def download_file(
+    request: Request,
+    file_id: int,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_file = await _get_file(db, file_id)
+    await permissions.require(
+        db, current_user.user_id, db_file.project_id, "read",
+        detail="User is not a member of this project"
+    )
+    # Una descarga larga no retiene la conexión
+    await db.close()
+
+    if db_file.content_hash is None:
+        # Enlace externo registrado con POST /
+        return responses.RedirectResponse(db_file.file_url)
+
+    # El contenido de un archivo no cambia: el hash es su ETag
+    etag = f'"{db_file.content_hash}"'
+    headers = {"etag": etag, "cache-control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if storage.FILES_X_ACCEL_REDIRECT:
+        # nginx envía el blob con sendfile y resuelve él los Range
+        return Response(headers={
+            **headers,
+            "x-accel-redirect": storage.accel_path(db_file.content_hash),
+            "content-type": db_file.content_type or "application/octet-stream",
+            "content-disposition": _content_disposition(db_file.file_name),
+        })
+
+    path = storage.blob_path(db_file.content_hash)
+    try:
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File content not found"
+        )
+    # Range (también varios e If-Range) y HEAD los resuelve FileResponse; con
+    # un servidor que anuncie http.response.pathsend el envío es sin copia
+    response = responses.FileResponse(
+        path,
+        stat_result=stat_result,
+        media_type=db_file.content_type,
+        filename=db_file.file_name,
+        headers=headers,
+    )
+    response.chunk_size = storage.FILES_CHUNK_SIZE
+    return response
+
+@router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_file(
+    file_id: int,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_file = await _get_file(db, file_id)
+    await permissions.require(
+        db, current_user.user_id, db_file.project_id, "write",
+        detail="User is not a member of this project"
+    )
+
+    await db.delete(db_file)
+    await db.commit()
+    invalidate_project(db_file.project_id)
+    publish(db_file.project_id, "file.deleted", file_id)
+    # El blob sólo se borra si ningún otro archivo tiene el mismo contenido
+    await storage.release(db, [db_file.content_hash])
+    return None
@@ -1,21 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from collections import Counter
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import bindparam, select, func, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from typing import List
-from database import get_db
+from database import get_async_db
 import models
 import schemas
+from utils.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+from utils.response_cache import cached_response, invalidate_project
+from utils.events import publish
+from utils.serialization import RowSerializer, json_response
+from utils.bulk import check_bulk_size, existing_ids
+from utils.auth import get_current_user
+from utils import activity, counters, permissions
 
 router = APIRouter()
 
+# Listados serializados desde tuplas; la clave keyset va detrás
+MEMBERSHIP_ROWS = RowSerializer(
+    models.Membership, schemas.MembershipBase, extra=[models.Membership.membership_id]
+)
+
+async def _membership_with_owners(db: AsyncSession, membership_id: int):
+    # La membresía y el número de owners de su proyecto en una sola consulta
+    # (subconsulta correlacionada sobre idx_memberships_project_role)
+    owner = aliased(models.Membership)
+    owner_count = select(func.count()).select_from(owner).where(
+        owner.project_id == models.Membership.project_id,
+        owner.role == models.MembershipRole.OWNER
+    ).scalar_subquery()
+    row = (await db.execute(
+        select(models.Membership, owner_count)
+        .where(models.Membership.membership_id == membership_id)
+    )).first()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Membership not found"
+        )
+    return row
+
 @router.post("/", response_model=schemas.MembershipBase)
-def create_membership(
-    membership: schemas.MembershipCreate, 
-    db: Session = Depends(get_db)
+async def create_membership(
+    membership: schemas.MembershipCreate,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verificar si el usuario existe
-    user = db.query(models.User).filter(
-        models.User.user_id == membership.user_id
-    ).first()
+    user = await db.get(models.User, membership.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -23,9 +57,7 @@ def create_membership(
         )
 
     # Verificar si el proyecto existe
-    project = db.query(models.Project).filter(
-        models.Project.project_id == membership.project_id
-    ).first()
+    project = await db.get(models.Project, membership.project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -33,10 +65,12 @@ def create_membership(
         )
 
     # Verificar si ya existe la membresía
-    existing_membership = db.query(models.Membership).filter(
-        models.Membership.user_id == membership.user_id,
-        models.Membership.project_id == membership.project_id
-    ).first()
+    existing_membership = await db.scalar(
+        select(models.Membership).where(
+            models.Membership.user_id == membership.user_id,
+            models.Membership.project_id == membership.project_id
+        )
+    )
     if existing_membership:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -50,34 +84,165 @@ def create_membership(
         role=membership.role
     )
     db.add(db_membership)
-    db.commit()
-    db.refresh(db_membership)
+    await counters.adjust(db, db_membership.project_id, {"member_count": 1})
+    await db.commit()
+    await db.refresh(db_membership)
+    invalidate_project(db_membership.project_id)
+    permissions.invalidate_project(db_membership.project_id)
+    publish(db_membership.project_id, "membership.created", db_membership.membership_id)
+    activity.record(db_membership.project_id, "membership.created", db_membership.membership_id,
+                    current_user.user_id, {"user_id": db_membership.user_id, "role": db_membership.role})
     return db_membership
 
-@router.get("/", response_model=List[schemas.MembershipBase])
-def get_memberships(
-    skip: int = 0, 
-    limit: int = 100,
+def _membership_insert(dialect: str):
+    # INSERT que delega los duplicados en el índice único idx_user_project
+    table = models.Membership.__table__
+    if dialect == "mysql":
+        return mysql.insert(table).prefix_with("IGNORE")
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        return stmt.on_conflict_do_nothing(
+            index_elements=[table.c.user_id, table.c.project_id]
+        ).returning(table.c.user_id, table.c.project_id)
+    raise HTTPException(
+        status_code=status.HTTP_501_NOT_IMPLEMENTED,
+        detail=f"Bulk import not supported on {dialect}"
+    )
+
+async def _insert_new_memberships(db: AsyncSession, rows: list) -> set:
+    # Las (user_id, project_id) que ha insertado esta sentencia: sólo ésas
+    # suman a member_count. Leer antes cuáles existen no sirve, porque dos
+    # importaciones concurrentes verían la misma fila como nueva
+    dialect = db.get_bind().dialect.name
+    stmt = _membership_insert(dialect)
+    if dialect != "mysql":
+        # RETURNING sólo devuelve las filas insertadas
+        return set((await db.execute(stmt, rows)).all())
+    # MySQL no tiene RETURNING: una sentencia por fila, rowcount 0 si ya existía
+    inserted = set()
+    for row in rows:
+        if (await db.execute(stmt, row)).rowcount:
+            inserted.add((row["user_id"], row["project_id"]))
+    return inserted
+
+_table = models.Membership.__table__
+# executemany: rol y estado de las membresías que ya existían
+_UPDATE_BY_KEY = update(_table).where(
+    _table.c.user_id == bindparam("b_user_id"),
+    _table.c.project_id == bindparam("b_project_id"),
+).values(role=bindparam("b_role"), is_active=bindparam("b_is_active"))
+
+@router.post("/bulk", response_model=schemas.MembershipBulkResult)
+async def create_memberships_bulk(
+    memberships: List[schemas.MembershipCreate],
+    on_conflict: str = Query("ignore", pattern="^(ignore|update)$"),
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # on_conflict=ignore conserva las membresías existentes;
+    # on_conflict=update les aplica el rol y el estado enviados
+    check_bulk_size(memberships)
+    users = await existing_ids(db, models.User.user_id, (m.user_id for m in memberships))
+    projects = await existing_ids(db, models.Project.project_id, (m.project_id for m in memberships))
+    # Sólo en los proyectos que quien llama puede administrar (owner activo)
+    access = await permissions.resolve_many(db, current_user.user_id, projects)
+
+    rows, errors, seen = {}, [], set()
+    for index, membership in enumerate(memberships):
+        key = (membership.user_id, membership.project_id)
+        if membership.user_id not in users:
+            errors.append(schemas.BulkItemError(index=index, detail="User not found"))
+        elif membership.project_id not in projects:
+            errors.append(schemas.BulkItemError(index=index, detail="Project not found"))
+        elif not permissions.allows(access[membership.project_id], "manage"):
+            errors.append(schemas.BulkItemError(index=index, detail="Not allowed to manage this project"))
+        elif key in seen:
+            errors.append(schemas.BulkItemError(index=index, detail="Duplicate membership in request"))
+        else:
+            seen.add(key)
+            rows[index] = membership.dict()
+
+    # Regla del último owner sobre el conjunto: sólo un upsert puede quitar
+    # el rol de owner. Un proyecto no puede quedarse sin owners tras el lote.
+    if on_conflict == "update" and rows:
+        project_ids = {row["project_id"] for row in rows.values()}
+        owners = {}
+        for user_id, project_id in await db.execute(
+            select(models.Membership.user_id, models.Membership.project_id).where(
+                models.Membership.project_id.in_(project_ids),
+                models.Membership.role == models.MembershipRole.OWNER
+            )
+        ):
+            owners.setdefault(project_id, set()).add(user_id)
+
+        remaining = {project_id: set(users_) for project_id, users_ in owners.items()}
+        for row in rows.values():
+            project_owners = remaining.setdefault(row["project_id"], set())
+            if row["role"] == models.MembershipRole.OWNER:
+                project_owners.add(row["user_id"])
+            else:
+                project_owners.discard(row["user_id"])
+
+        orphaned = {project_id for project_id, users_ in remaining.items() if owners.get(project_id) and not users_}
+        for index, row in list(rows.items()):
+            if row["project_id"] in orphaned and row["user_id"] in owners[row["project_id"]]:
+                errors.append(schemas.BulkItemError(index=index, detail="Cannot remove the last owner of the project"))
+                del rows[index]
+        errors.sort(key=lambda error: error.index)
+
+    if rows:
+        inserted = await _insert_new_memberships(db, list(rows.values()))
+        updated = []
+        if on_conflict == "update":
+            updated = [row for row in rows.values() if (row["user_id"], row["project_id"]) not in inserted]
+            if updated:
+                await db.execute(_UPDATE_BY_KEY, [
+                    {"b_user_id": row["user_id"], "b_project_id": row["project_id"],
+                     "b_role": row["role"], "b_is_active": row["is_active"]}
+                    for row in updated
+                ])
+        added = Counter(project_id for _, project_id in inserted)
+        await counters.adjust_many(db, {project_id: {"member_count": n} for project_id, n in added.items()})
+        await db.commit()
+        for project_id in {row["project_id"] for row in rows.values()}:
+            invalidate_project(project_id)
+            permissions.invalidate_project(project_id)
+            # Sin ids de las filas insertadas: el cliente recarga los miembros
+            publish(project_id, "memberships.changed")
+        for row in rows.values():
+            if (row["user_id"], row["project_id"]) in inserted:
+                activity.record(row["project_id"], "membership.created", None, current_user.user_id,
+                                {"user_id": row["user_id"], "role": row["role"]})
+        for row in updated:
+            activity.record(row["project_id"], "membership.updated", None, current_user.user_id,
+                            {"user_id": row["user_id"], "to": row["role"], "is_active": row["is_active"]})
+
+    return {"count": len(rows), "errors": errors}
+
+@router.get("/", response_model=schemas.Page[schemas.MembershipBase])
+async def get_memberships(
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     project_id: int = None,
     user_id: int = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(models.Membership)
-    
+    query = MEMBERSHIP_ROWS.select()
+
     if project_id:
-        query = query.filter(models.Membership.project_id == project_id)
+        query = query.where(models.Membership.project_id == project_id)
     if user_id:
-        query = query.filter(models.Membership.user_id == user_id)
-    
-    memberships = query.offset(skip).limit(limit).all()
-    return memberships
+        query = query.where(models.Membership.user_id == user_id)
+
+    memberships = (await db.execute(
+        keyset(query, [models.Membership.membership_id], cursor, limit)
+    )).all()
+    return json_response(make_page(memberships, lambda m: (m.membership_id,), limit, MEMBERSHIP_ROWS.transform()))
 
 @router.get("/{membership_id}", response_model=schemas.MembershipBase)
-def get_membership(membership_id: int, db: Session = Depends(get_db)):
-    membership = db.query(models.Membership).filter(
-        models.Membership.membership_id == membership_id
-    ).first()
-    
+async def get_membership(membership_id: int, db: AsyncSession = Depends(get_async_db)):
+    membership = await db.get(models.Membership, membership_id)
+
     if membership is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -86,100 +251,109 @@ def get_membership(membership_id: int, db: Session = Depends(get_db)):
     return membership
 
 @router.put("/{membership_id}", response_model=schemas.MembershipBase)
-def update_membership(
+async def update_membership(
     membership_id: int,
     membership_update: schemas.MembershipUpdate,
-    db: Session = Depends(get_db)
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_membership = db.query(models.Membership).filter(
-        models.Membership.membership_id == membership_id
-    ).first()
-    
-    if db_membership is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Membership not found"
-        )
+    db_membership, owner_count = await _membership_with_owners(db, membership_id)
 
     # Verificar si es el último owner antes de cambiar el rol
     if db_membership.role == "owner" and membership_update.role != "owner":
-        owner_count = db.query(models.Membership).filter(
-            models.Membership.project_id == db_membership.project_id,
-            models.Membership.role == "owner"
-        ).count()
         if owner_count <= 1:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Cannot remove the last owner of the project"
             )
 
+    previous = (db_membership.role, db_membership.is_active)
     update_data = membership_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_membership, key, value)
-    
-    db.commit()
-    db.refresh(db_membership)
+
+    await db.commit()
+    await db.refresh(db_membership)
+    invalidate_project(db_membership.project_id)
+    permissions.invalidate_project(db_membership.project_id)
+    publish(db_membership.project_id, "membership.updated", membership_id)
+    if (db_membership.role, db_membership.is_active) != previous:
+        activity.record(db_membership.project_id, "membership.updated", membership_id, current_user.user_id, {
+            "user_id": db_membership.user_id, "from": previous[0], "to": db_membership.role,
+            "is_active": db_membership.is_active,
+        })
     return db_membership
 
 @router.delete("/{membership_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_membership(membership_id: int, db: Session = Depends(get_db)):
-    db_membership = db.query(models.Membership).filter(
-        models.Membership.membership_id == membership_id
-    ).first()
-    
-    if db_membership is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Membership not found"
-        )
+async def delete_membership(
+    membership_id: int,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_membership, owner_count = await _membership_with_owners(db, membership_id)
 
     # Verificar si es el último owner
-# En la misma función delete_membership, corregir esta línea:
     if db_membership.role == "owner":
-        owner_count = db.query(models.Membership).filter(  # Cambiar MembershipBase por Membership
-            models.Membership.project_id == db_membership.project_id,
-            models.Membership.role == "owner"
-        ).count()
         if owner_count <= 1:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Cannot remove the last owner of the project"
             )
 
-    db.delete(db_membership)
-    db.commit()
+    await db.delete(db_membership)
+    await counters.adjust(db, db_membership.project_id, {"member_count": -1})
+    await db.commit()
+    invalidate_project(db_membership.project_id)
+    permissions.invalidate_project(db_membership.project_id)
+    publish(db_membership.project_id, "membership.deleted", membership_id)
+    activity.record(db_membership.project_id, "membership.deleted", membership_id, current_user.user_id,
+                    {"user_id": db_membership.user_id})
     return None
 
-@router.get("/user/{user_id}/memberships", response_model=List[schemas.MembershipBase])
-def get_user_memberships(user_id: int, db: Session = Depends(get_db)):
+@router.get("/user/{user_id}/memberships", response_model=schemas.Page[schemas.MembershipBase])
+async def get_user_memberships(
+    user_id: int,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
     # Verificar si el usuario existe
-    user = db.query(models.User).filter(models.User.user_id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    memberships = db.query(models.Membership).filter(
-        models.Membership.user_id == user_id
-    ).all()
-    return memberships
+    memberships = (await db.execute(keyset(
+        MEMBERSHIP_ROWS.select().where(
+            models.Membership.user_id == user_id
+        ),
+        [models.Membership.membership_id], cursor, limit
+    ))).all()
+    return json_response(make_page(memberships, lambda m: (m.membership_id,), limit, MEMBERSHIP_ROWS.transform()))
 
 
-@router.get("/project/{project_id}/memberships", response_model=List[schemas.MembershipBase])
-def get_project_memberships(project_id: int, db: Session = Depends(get_db)):
+@router.get("/project/{project_id}/memberships", response_model=schemas.Page[schemas.MembershipBase])
+@cached_response(schemas.Page[schemas.MembershipBase])
+async def get_project_memberships(
+    project_id: int,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
     # Verificar si el proyecto existe
-    project = db.query(models.Project).filter(
-        models.Project.project_id == project_id
-    ).first()
+    project = await db.get(models.Project, project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
 
-    # Corregir aquí: cambiar models.MembershipBase por models.Membership
-    memberships = db.query(models.Membership).filter(
-        models.Membership.project_id == project_id
-    ).all()
-    return memberships
\ No newline at end of file
+    memberships = (await db.execute(keyset(
+        MEMBERSHIP_ROWS.select().where(
+            models.Membership.project_id == project_id
+        ),
+        [models.Membership.membership_id], cursor, limit
+    ))).all()
+    return json_response(make_page(memberships, lambda m: (m.membership_id,), limit, MEMBERSHIP_ROWS.transform()))
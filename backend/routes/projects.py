@@ -1,22 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List
-from database import get_db
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import delete, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from database import get_async_db
 import models
 import schemas
 from datetime import datetime
-from fastapi.security import OAuth2PasswordBearer
-from utils.auth import verify_token
+from utils.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+from utils.response_cache import cached_response, invalidate_project
+from utils.events import publish
+from utils.auth import get_current_user
+from utils import activity, counters, permissions, search, storage
 
 router = APIRouter()
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+# Tope por colección hija en el detalle de un proyecto
+DETAIL_PAGE_SIZE = 50
+
+# ProjectResponse serializa tasks y members; en async no hay carga perezosa,
+# así que se cargan siempre con selectinload
+PROJECT_RESPONSE_OPTIONS = (
+    selectinload(models.Project.tasks),
+    selectinload(models.Project.members),
+)
+
+async def _project_stats(db: AsyncSession, project_ids) -> dict:
+    # Contadores mantenidos en project_stats; las vencidas dependen de la hora
+    # y se cuentan en la misma consulta sobre idx_tasks_project_status
+    stats = {project_id: schemas.ProjectStats(tasks_by_status={}) for project_id in project_ids}
+    if not project_ids:
+        return stats
+
+    overdue = select(func.count()).where(
+        models.Task.project_id == models.ProjectStats.project_id,
+        models.Task.status != models.TaskStatus.DONE,
+        models.Task.due_date < func.now(),
+    ).scalar_subquery()
+    rows = await db.execute(
+        select(models.ProjectStats, overdue.label("overdue"))
+        .where(models.ProjectStats.project_id.in_(project_ids))
+    )
+    for row, overdue_tasks in rows:
+        by_status = {
+            task_status.value: getattr(row, column)
+            for task_status, column in counters.STATUS_COLUMNS.items()
+        }
+        task_count = sum(by_status.values())
+        stats[row.project_id] = schemas.ProjectStats(
+            task_count=task_count,
+            tasks_by_status={name: total for name, total in by_status.items() if total},
+            open_tasks=task_count - row.done_tasks,
+            done_tasks=row.done_tasks,
+            overdue_tasks=overdue_tasks,
+            member_count=row.member_count,
+            comment_count=row.comment_count,
+        )
+    return stats
+
+async def _summary_page(db: AsyncSession, query, cursor, limit, include_children: bool) -> dict:
+    if include_children:
+        query = query.options(*PROJECT_RESPONSE_OPTIONS)
+    result = await db.execute(keyset(query, [models.Project.project_id], cursor, limit))
+    page = make_page(result.scalars().all(), lambda p: (p.project_id,), limit)
+
+    stats = await _project_stats(db, [project.project_id for project in page["items"]])
+    page["items"] = [
+        schemas.ProjectSummary.model_validate({
+            "project_id": project.project_id,
+            "title": project.title,
+            "description": project.description,
+            "status": project.status,
+            "owner_id": project.owner_id,
+            "created_at": project.created_at,
+            "stats": stats[project.project_id],
+            "tasks": project.tasks if include_children else None,
+            "members": project.members if include_children else None,
+        }, from_attributes=True)
+        for project in page["items"]
+    ]
+    return page
+
+async def _load_project(db: AsyncSession, project_id: int):
+    result = await db.execute(
+        select(models.Project)
+        .options(*PROJECT_RESPONSE_OPTIONS)
+        .where(models.Project.project_id == project_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
 
 @router.post("/", response_model=schemas.ProjectResponse)
-def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)):
+async def create_project(project: schemas.ProjectCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         # Verificar si el usuario (owner) existe
-        owner = db.query(models.User).filter(models.User.user_id == project.owner_id).first()
+        owner = await db.get(models.User, project.owner_id)
         if not owner:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -31,7 +109,7 @@ def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)
             owner_id=project.owner_id
         )
         db.add(db_project)
-        db.flush()  # Esto genera el project_id sin hacer commit
+        await db.flush()  # Esto genera el project_id sin hacer commit
 
         # Crear membresía para el owner
         db_membership = models.Membership(
@@ -41,68 +119,103 @@ def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)
             is_active=True
         )
         db.add(db_membership)
-        
+        db.add(models.ProjectStats(project_id=db_project.project_id, member_count=1))
+        await search.reindex_ids(db, "project", [db_project.project_id])
+
         # Ahora sí hacemos commit de todo
-        db.commit()
-        db.refresh(db_project)
-        
-        return db_project
+        await db.commit()
+        # Una consulta previa al alta pudo cachear "no es miembro"
+        permissions.invalidate_project(db_project.project_id)
+
+        return await _load_project(db, db_project.project_id)
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
-@router.get("/", response_model=List[schemas.ProjectResponse])
-def get_projects(
-    skip: int = 0, 
-    limit: int = 100,
+@router.get("/", response_model=schemas.Page[schemas.ProjectSummary])
+async def get_projects(
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     status: str = None,
-    token: str = Depends(oauth2_scheme),  # Añadir esta línea
-    db: Session = Depends(get_db)
+    include_children: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Verificar el token
-    verify_token(token)
-    
-    query = db.query(models.Project)
+    query = select(models.Project)
     if status:
-        query = query.filter(models.Project.status == status)
-    
-    projects = query.offset(skip).limit(limit).all()
-    return projects
+        query = query.where(models.Project.status == status)
+
+    return await _summary_page(db, query, cursor, limit, include_children)
 
 @router.get("/{project_id}", response_model=schemas.ProjectWithDetails)
-def get_project(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(models.Project).options(
-        joinedload(models.Project.owner),
-        joinedload(models.Project.members),
-        joinedload(models.Project.tasks),
-        joinedload(models.Project.comments),
-        joinedload(models.Project.files)
-    ).filter(
-        models.Project.project_id == project_id
-    ).first()
-    
+@cached_response(schemas.ProjectWithDetails)
+async def get_project(
+    project_id: int,
+    limit: int = DETAIL_PAGE_SIZE,
+    tasks_cursor: str = None,
+    comments_cursor: str = None,
+    files_cursor: str = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Una consulta por colección en lugar de un único JOIN de todas: el JOIN
+    # devuelve tareas x comentarios x miembros x archivos filas
+    project = await db.scalar(
+        select(models.Project).options(
+            joinedload(models.Project.owner),
+            selectinload(models.Project.members)
+        ).where(
+            models.Project.project_id == project_id
+        )
+    )
+
     if project is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
-    
-    return project
+
+    # Los cursores usan las mismas claves que los listados de tareas y
+    # comentarios, así que pueden continuarse también desde esos endpoints
+    tasks = (await db.scalars(keyset(
+        select(models.Task).where(models.Task.project_id == project_id),
+        [models.Task.task_id], tasks_cursor, limit
+    ))).all()
+    comments = (await db.scalars(keyset(
+        select(models.Comment).where(models.Comment.project_id == project_id),
+        [models.Comment.created_at, models.Comment.comment_id], comments_cursor, limit,
+        descending=True
+    ))).all()
+    files = (await db.scalars(keyset(
+        select(models.File).where(models.File.project_id == project_id),
+        [models.File.file_id], files_cursor, limit
+    ))).all()
+
+    return {
+        "project_id": project.project_id,
+        "title": project.title,
+        "description": project.description,
+        "status": project.status,
+        "owner_id": project.owner_id,
+        "created_at": project.created_at,
+        "owner": project.owner,
+        "members": project.members,
+        "stats": (await _project_stats(db, [project_id]))[project_id],
+        "tasks": make_page(tasks, lambda t: (t.task_id,), limit),
+        "comments": make_page(comments, lambda c: (c.created_at, c.comment_id), limit),
+        "files": make_page(files, lambda f: (f.file_id,), limit),
+    }
 
 @router.put("/{project_id}", response_model=schemas.ProjectResponse)
-def update_project(
+async def update_project(
     project_id: int,
     project_update: schemas.ProjectUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_project = db.query(models.Project).filter(
-        models.Project.project_id == project_id
-    ).first()
-    
+    db_project = await db.get(models.Project, project_id)
+
     if db_project is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -112,35 +225,58 @@ def update_project(
     update_data = project_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_project, key, value)
-    
-    db.commit()
-    db.refresh(db_project)
-    return db_project
+
+    await search.reindex_ids(db, "project", [project_id])
+    await db.commit()
+    invalidate_project(project_id)
+    publish(project_id, "project.updated", project_id)
+    return await _load_project(db, project_id)
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_project(project_id: int, db: Session = Depends(get_db)):
-    db_project = db.query(models.Project).filter(
-        models.Project.project_id == project_id
-    ).first()
-    
+async def delete_project(project_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_project = await db.get(models.Project, project_id)
+
     if db_project is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
-    
-    db.delete(db_project)
-    db.commit()
+
+    # Los archivos se borran en cascada; sus blobs y las subidas a medias se
+    # liberan tras el commit
+    hashes = (await db.scalars(
+        select(models.File.content_hash).distinct().where(
+            models.File.project_id == project_id,
+            models.File.content_hash.isnot(None)
+        )
+    )).all()
+    upload_ids = (await db.scalars(
+        select(models.FileUpload.upload_id).where(models.FileUpload.project_id == project_id)
+    )).all()
+    await db.execute(delete(models.FileUpload).where(models.FileUpload.project_id == project_id))
+
+    await db.delete(db_project)
+    await search.remove_project(db, project_id)
+    await db.commit()
+    invalidate_project(project_id)
+    permissions.invalidate_project(project_id)
+    publish(project_id, "project.deleted", project_id)
+    await storage.release(db, hashes)
+    for upload_id in upload_ids:
+        await asyncio.to_thread(storage.remove_upload, upload_id)
     return None
 
-@router.get("/user/{user_id}/projects", response_model=List[schemas.ProjectResponse])
-def get_user_projects(
+@router.get("/user/{user_id}/projects", response_model=schemas.Page[schemas.ProjectSummary])
+async def get_user_projects(
     user_id: int,
-    status: str = None,
-    db: Session = Depends(get_db)
+    project_status: str = Query(None, alias="status"),  # no tapar fastapi.status
+    include_children: bool = False,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verificar si el usuario existe
-    user = db.query(models.User).filter(models.User.user_id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -148,27 +284,25 @@ def get_user_projects(
         )
 
     # Obtener proyectos donde el usuario es miembro
-    query = db.query(models.Project).join(
+    query = select(models.Project).join(
         models.Membership,
         models.Project.project_id == models.Membership.project_id
-    ).filter(models.Membership.user_id == user_id)
+    ).where(models.Membership.user_id == user_id)
 
-    if status:
-        query = query.filter(models.Project.status == status)
+    if project_status:
+        query = query.where(models.Project.status == project_status)
 
-    projects = query.all()
-    return projects
+    return await _summary_page(db, query, cursor, limit, include_children)
 
 @router.post("/{project_id}/members", response_model=schemas.MembershipBase)
-def add_project_member(
+async def add_project_member(
     project_id: int,
     member: schemas.MembershipCreate,
-    db: Session = Depends(get_db)
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verificar si el proyecto existe
-    project = db.query(models.Project).filter(
-        models.Project.project_id == project_id
-    ).first()
+    project = await db.get(models.Project, project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -176,9 +310,7 @@ def add_project_member(
         )
 
     # Verificar si el usuario existe
-    user = db.query(models.User).filter(
-        models.User.user_id == member.user_id
-    ).first()
+    user = await db.get(models.User, member.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -186,10 +318,12 @@ def add_project_member(
         )
 
     # Verificar si ya es miembro
-    existing_membership = db.query(models.Membership).filter(
-        models.Membership.project_id == project_id,
-        models.Membership.user_id == member.user_id
-    ).first()
+    existing_membership = await db.scalar(
+        select(models.Membership).where(
+            models.Membership.project_id == project_id,
+            models.Membership.user_id == member.user_id
+        )
+    )
     if existing_membership:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -203,35 +337,12 @@ def add_project_member(
         role=member.role
     )
     db.add(db_membership)
-    db.commit()
-    db.refresh(db_membership)
-    return db_membership
-
-@router.get("/user/{user_id}/projects", response_model=List[schemas.ProjectResponse])
-def get_user_projects(
-    user_id: int,
-    status: str = None,
-    db: Session = Depends(get_db)
-):
-    query = db.query(models.Project).join(
-        models.Membership,
-        models.Project.project_id == models.Membership.project_id
-    ).filter(
-        models.Membership.user_id == user_id
-    ).options(
-        joinedload(models.Project.tasks),
-        joinedload(models.Project.members)
-    )
-
-    if status:
-        query = query.filter(models.Project.status == status)
-
-    projects = query.all()
-    
-    # Debug: imprimir información
-    for project in projects:
-        print(f"Project {project.project_id}:")
-        print(f"- Number of tasks: {len(project.tasks)}")
-        print(f"- Number of members: {len(project.members)}")
-
-    return projects
\ No newline at end of file
+    await counters.adjust(db, project_id, {"member_count": 1})
+    await db.commit()
+    await db.refresh(db_membership)
+    invalidate_project(project_id)
+    permissions.invalidate_project(project_id)
+    publish(project_id, "membership.created", db_membership.membership_id)
+    activity.record(project_id, "membership.created", db_membership.membership_id, current_user.user_id,
+                    {"user_id": db_membership.user_id, "role": db_membership.role})
+    return db_membership
\ No newline at end of file
@@ -0,0 +1,32 @@
+# routes/search.py
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from database import get_async_db
+import schemas
+from utils import search
+from utils.auth import get_current_user
+from utils.pagination import DEFAULT_PAGE_SIZE
+
+router = APIRouter()
+
+@router.get("/", response_model=schemas.Page[schemas.SearchResult])
+async def search_documents(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: List[schemas.SearchKind] = Query(None),
+    project_id: int = None,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Resultados ordenados por relevancia, sólo de proyectos del usuario
+    return await search.search(
+        db,
+        current_user.user_id,
+        q,
+        kinds=[k.value for k in kind] if kind else None,
+        project_id=project_id,
+        cursor=cursor,
+        limit=limit,
+    )
@@ -1,32 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from collections import Counter
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
 from typing import List
-from database import get_db
+from database import get_async_db
 import models
 import schemas
 from datetime import datetime
+from utils.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+from utils.response_cache import cached_response, invalidate_project
+from utils.events import publish
+from utils.serialization import RowSerializer, json_response
+from utils.auth import get_current_user
+from utils.bulk import check_bulk_size, existing_ids
+from utils import activity, counters, search
 
 router = APIRouter()
 
+# Columnas que no admiten NULL en una actualización masiva
+NOT_NULL_FIELDS = ("title", "description", "status", "due_date")
+
+# Listados serializados desde tuplas (utils/serialization.py)
+PROJECT_TASK_ROWS = RowSerializer(models.Task, schemas.TaskResponse, project_title=None, project_status=None)
+USER_TASK_ROWS = RowSerializer(
+    models.Task, schemas.TaskResponse, project_title=models.Project.title, project_status=None
+)
+
 @router.post("/", response_model=schemas.TaskBase)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
+async def create_task(
+    task: schemas.TaskCreate,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     # Verificar si el proyecto existe
-    project = db.query(models.Project).filter(models.Project.project_id == task.project_id).first()
+    project = await db.get(models.Project, task.project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
-    
+
     # Verificar si el usuario asignado existe
     if task.assigned_to:
-        current_user = db.query(models.User).filter(models.User.user_id == task.assigned_to).first()
-        if not current_user:
+        assignee = await db.get(models.User, task.assigned_to)
+        if not assignee:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Assigned user not found"
             )
-        
+
         # Crear nueva tarea
         db_task = models.Task(
             title=task.title,
@@ -36,30 +59,159 @@ def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
             project_id=task.project_id,
             assigned_to=task.assigned_to  # Usar directamente el ID proporcionado
         )
-        
+
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
-        
+        await db.flush()
+        await search.reindex_ids(db, "task", [db_task.task_id])
+        await counters.adjust(db, db_task.project_id, counters.task_delta(added=db_task.status))
+        await db.commit()
+        await db.refresh(db_task)
+        invalidate_project(db_task.project_id)
+        publish(db_task.project_id, "task.created", db_task.task_id)
+        activity.record(db_task.project_id, "task.created", db_task.task_id, current_user.user_id,
+                        {"title": db_task.title})
+
         return db_task  # Asegurarse de que siempre devuelva la tarea creada
-    
+
     # Si no hay assigned_to, lanzar una excepción
     raise HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST,
         detail="assigned_to is required"
     )
 
+@router.post("/bulk", response_model=schemas.TaskBulkResult)
+async def create_tasks_bulk(
+    tasks: List[schemas.TaskCreate],
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    check_bulk_size(tasks)
+    projects = await existing_ids(db, models.Project.project_id, (t.project_id for t in tasks))
+    users = await existing_ids(db, models.User.user_id, (t.assigned_to for t in tasks))
+
+    rows, errors = [], []
+    for index, task in enumerate(tasks):
+        if task.project_id not in projects:
+            errors.append(schemas.BulkItemError(index=index, detail="Project not found"))
+        elif not task.assigned_to:
+            errors.append(schemas.BulkItemError(index=index, detail="assigned_to is required"))
+        elif task.assigned_to not in users:
+            errors.append(schemas.BulkItemError(index=index, detail="Assigned user not found"))
+        else:
+            rows.append(task.dict())
+
+    task_ids = []
+    if rows:
+        deltas = {}
+        for row in rows:
+            deltas.setdefault(row["project_id"], Counter()).update(counters.task_delta(added=row["status"]))
+        await counters.adjust_many(db, deltas)
+        # executemany en una sola transacción; los ids sólo se devuelven si
+        # la base de datos admite RETURNING en inserciones masivas
+        if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+            result = await db.execute(
+                insert(models.Task).returning(models.Task.task_id, sort_by_parameter_order=True),
+                rows
+            )
+            task_ids = list(result.scalars())
+            await search.reindex_ids(db, "task", task_ids)
+        else:
+            await db.execute(insert(models.Task), rows)
+            task_ids = None
+            # Sin ids: upsert del índice para las tareas de los proyectos afectados
+            await search.reindex(db, "task", models.Task.project_id.in_({row["project_id"] for row in rows}))
+        await db.commit()
+        for project_id in {row["project_id"] for row in rows}:
+            invalidate_project(project_id)
+            if task_ids is None:
+                # Sin ids: el cliente recarga las tareas del proyecto
+                publish(project_id, "tasks.changed")
+        for row, task_id in zip(rows, task_ids or ()):
+            publish(row["project_id"], "task.created", task_id)
+        for row, task_id in zip(rows, task_ids or [None] * len(rows)):
+            activity.record(row["project_id"], "task.created", task_id, current_user.user_id,
+                            {"title": row["title"]})
+
+    return {"count": len(rows), "task_ids": task_ids, "errors": errors}
+
+@router.patch("/bulk", response_model=schemas.TaskBulkResult)
+async def update_tasks_bulk(
+    tasks: List[schemas.TaskBulkUpdate],
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    check_bulk_size(tasks)
+    ids = {t.task_id for t in tasks}
+    # FOR UPDATE: el estado anterior del que sale el delta de los contadores no
+    # puede cambiar hasta el commit. En orden de task_id, sin interbloqueos
+    # entre lotes concurrentes
+    current = (await db.execute(
+        select(models.Task.task_id, models.Task.project_id, models.Task.status)
+        .where(models.Task.task_id.in_(ids))
+        .order_by(models.Task.task_id)
+        .with_for_update()
+    )).all() if ids else []
+    task_projects = {task_id: project_id for task_id, project_id, _ in current}
+    task_statuses = {task_id: task_status for task_id, _, task_status in current}
+    users = await existing_ids(db, models.User.user_id, (t.assigned_to for t in tasks))
+
+    rows, errors, seen = [], [], set()
+    for index, task in enumerate(tasks):
+        data = task.dict(exclude_unset=True)
+        null_field = next((f for f in NOT_NULL_FIELDS if f in data and data[f] is None), None)
+        if task.task_id not in task_projects:
+            errors.append(schemas.BulkItemError(index=index, detail="Task not found"))
+        elif task.task_id in seen:
+            errors.append(schemas.BulkItemError(index=index, detail="Duplicate task_id"))
+        elif len(data) == 1:
+            errors.append(schemas.BulkItemError(index=index, detail="No fields to update"))
+        elif null_field:
+            errors.append(schemas.BulkItemError(index=index, detail=f"{null_field} cannot be null"))
+        elif task.assigned_to and task.assigned_to not in users:
+            errors.append(schemas.BulkItemError(index=index, detail="Assigned user not found"))
+        else:
+            seen.add(task.task_id)
+            rows.append(data)
+
+    if rows:
+        # UPDATE por clave primaria con executemany (agrupado por columnas)
+        await db.execute(update(models.Task), rows)
+        deltas = {}
+        for row in rows:
+            if "status" in row:
+                deltas.setdefault(task_projects[row["task_id"]], Counter()).update(
+                    counters.task_delta(removed=task_statuses[row["task_id"]], added=row["status"])
+                )
+        await counters.adjust_many(db, deltas)
+        await search.reindex_ids(db, "task", [
+            row["task_id"] for row in rows if "title" in row or "description" in row
+        ])
+        await db.commit()
+        for project_id in {task_projects[row["task_id"]] for row in rows}:
+            invalidate_project(project_id)
+        for row in rows:
+            publish(task_projects[row["task_id"]], "task.updated", row["task_id"])
+            if "status" in row and row["status"] != task_statuses[row["task_id"]]:
+                activity.record(task_projects[row["task_id"]], "task.status_changed", row["task_id"],
+                                current_user.user_id, {"from": task_statuses[row["task_id"]], "to": row["status"]})
+
+    return {"count": len(rows), "task_ids": [row["task_id"] for row in rows], "errors": errors}
+
 # En routes/tasks.py, modifica el endpoint get_task:
 
 @router.get("/{task_id}", response_model=schemas.TaskResponse)  # Cambiar a TaskResponse
-def get_task(task_id: int, db: Session = Depends(get_db)):
+async def get_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
     # Obtener la tarea con información del proyecto usando join
-    task = db.query(models.Task).join(
-        models.Project,
-        models.Task.project_id == models.Project.project_id
-    ).filter(
-        models.Task.task_id == task_id
-    ).first()
+    task = await db.scalar(
+        select(models.Task).join(
+            models.Project,
+            models.Task.project_id == models.Project.project_id
+        ).options(
+            contains_eager(models.Task.project)
+        ).where(
+            models.Task.task_id == task_id
+        )
+    )
 
     if task is None:
         raise HTTPException(
@@ -83,12 +235,15 @@ def get_task(task_id: int, db: Session = Depends(get_db)):
     return task_response
 
 @router.put("/{task_id}", response_model=schemas.TaskBase)
-def update_task(
+async def update_task(
     task_id: int,
     task_update: schemas.TaskUpdate,
-    db: Session = Depends(get_db)
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_task = db.query(models.Task).filter(models.Task.task_id == task_id).first()
+    # Fila bloqueada: dos cambios de estado concurrentes no pueden leer el
+    # mismo estado anterior y aplicar dos veces el delta de los contadores
+    db_task = await db.get(models.Task, task_id, with_for_update=True)
     if db_task is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -97,99 +252,103 @@ def update_task(
 
     # Verificar usuario asignado si se está actualizando
     if task_update.assigned_to:
-        user = db.query(models.User).filter(models.User.user_id == task_update.assigned_to).first()
+        user = await db.get(models.User, task_update.assigned_to)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Assigned user not found"
             )
 
+    previous_status = db_task.status
     update_data = task_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_task, key, value)
-    
-    db.commit()
-    db.refresh(db_task)
+
+    await search.reindex_ids(db, "task", [task_id])
+    # Sólo cambia algo si el estado pasa de una columna de contador a otra
+    await counters.adjust(db, db_task.project_id, counters.task_delta(removed=previous_status, added=db_task.status))
+    await db.commit()
+    await db.refresh(db_task)
+    invalidate_project(db_task.project_id)
+    publish(db_task.project_id, "task.updated", task_id)
+    if db_task.status != previous_status:
+        activity.record(db_task.project_id, "task.status_changed", task_id, current_user.user_id,
+                        {"from": previous_status, "to": db_task.status})
     return db_task
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_task(task_id: int, db: Session = Depends(get_db)):
-    db_task = db.query(models.Task).filter(models.Task.task_id == task_id).first()
+async def delete_task(
+    task_id: int,
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Bloqueada como en update_task: el estado que se descuenta es el vigente
+    db_task = await db.get(models.Task, task_id, with_for_update=True)
     if db_task is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
-    
-    db.delete(db_task)
-    db.commit()
+
+    await db.delete(db_task)
+    await search.remove(db, "task", [task_id])
+    await counters.adjust(db, db_task.project_id, counters.task_delta(removed=db_task.status))
+    await db.commit()
+    invalidate_project(db_task.project_id)
+    publish(db_task.project_id, "task.deleted", task_id)
+    activity.record(db_task.project_id, "task.deleted", task_id, current_user.user_id,
+                    {"title": db_task.title})
     return None
 
-@router.get("/project/{project_id}/tasks", response_model=List[schemas.TaskResponse])
-def get_project_tasks(
+@router.get("/project/{project_id}/tasks", response_model=schemas.Page[schemas.TaskResponse])
+@cached_response(schemas.Page[schemas.TaskResponse])
+async def get_project_tasks(
     project_id: int,
-    status: str = None,
-    db: Session = Depends(get_db)
+    task_status: str = Query(None, alias="status"),  # no tapar fastapi.status
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verificar si el proyecto existe
-    project = db.query(models.Project).filter(models.Project.project_id == project_id).first()
+    project = (await db.execute(
+        select(models.Project.title, models.Project.status)
+        .where(models.Project.project_id == project_id)
+    )).first()
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
 
-    query = db.query(models.Task).filter(models.Task.project_id == project_id)
-    
-    if status:
-        query = query.filter(models.Task.status == status)
-    
-    tasks = query.all()
-    
-    # Formatear la respuesta con toda la información necesaria
-    task_responses = []
-    for task in tasks:
-        task_response = {
-            "task_id": task.task_id,
-            "title": task.title,
-            "description": task.description,
-            "status": task.status,
-            "due_date": task.due_date,
-            "project_id": task.project_id,
-            "assigned_to": task.assigned_to,
-            "project_title": project.title,
-            "project_status": project.status
-        }
-        task_responses.append(task_response)
-    
-    return task_responses
-
-@router.get("/user/{user_id}/tasks", response_model=List[schemas.TaskResponse])
-def get_user_tasks(
+    query = PROJECT_TASK_ROWS.select().where(models.Task.project_id == project_id)
+
+    if task_status:
+        query = query.where(models.Task.status == task_status)
+
+    tasks = (await db.execute(keyset(query, [models.Task.task_id], cursor, limit))).all()
+
+    # Los datos del proyecto son los mismos en todas las filas
+    return json_response(make_page(
+        tasks, lambda t: (t.task_id,), limit,
+        PROJECT_TASK_ROWS.transform(project_title=project.title, project_status=project.status)
+    ))
+
+@router.get("/user/{user_id}/tasks", response_model=schemas.Page[schemas.TaskResponse])
+async def get_user_tasks(
     user_id: int,
-    db: Session = Depends(get_db)
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Obtener las tareas con la información del proyecto
-    tasks = db.query(models.Task).filter(
+    # Obtener las tareas con el título del proyecto
+    query = USER_TASK_ROWS.select().where(
         models.Task.assigned_to == user_id
     ).join(
         models.Project,
         models.Task.project_id == models.Project.project_id
-    ).all()
-
-    # Formatear la respuesta manualmente para incluir todos los campos requeridos
-    task_responses = []
-    for task in tasks:
-        task_response = {
-            "task_id": task.task_id,
-            "title": task.title,
-            "description": task.description,
-            "status": task.status,
-            "due_date": task.due_date,
-            "project_id": task.project_id,
-            "assigned_to": task.assigned_to,
-            "project_title": task.project.title if task.project else None
-        }
-        task_responses.append(task_response)
-
-    return task_responses
\ No newline at end of file
+    )
+    tasks = (await db.execute(keyset(query, [models.Task.task_id], cursor, limit))).all()
+
+    return json_response(make_page(
+        tasks, lambda t: (t.task_id,), limit, USER_TASK_ROWS.transform(project_status=None)
+    ))
@@ -1,17 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from database import get_db, get_async_db
 import models
 import schemas
-from utils.auth import get_password_hash
+from utils.auth import get_password_hash, get_current_user, invalidate_user
+from utils.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+from utils.response_cache import invalidate_all
+from utils import permissions
+from utils.serialization import RowSerializer, json_response
 
 router = APIRouter()
 
+# Listado serializado desde tuplas (utils/serialization.py)
+USER_ROWS = RowSerializer(models.User, schemas.UserResponse)
+
 @router.post("/", response_model=schemas.UserResponse)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Verificar si el email ya existe
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+    db_user = await db.scalar(select(models.User).where(models.User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -19,7 +27,7 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # Crear nuevo usuario
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     db_user = models.User(
         name=user.name,
         email=user.email,
@@ -27,16 +35,17 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-@router.get("/", response_model=List[schemas.UserResponse])
-def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+# Todas las rutas salvo el registro requieren un usuario autenticado
+@router.get("/", response_model=schemas.Page[schemas.UserResponse], dependencies=[Depends(get_current_user)])
+def get_users(cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, db: Session = Depends(get_db)):
+    users = db.execute(keyset(USER_ROWS.select(), [models.User.user_id], cursor, limit)).all()
+    return json_response(make_page(users, lambda u: (u.user_id,), limit, USER_ROWS.transform()))
 
-@router.get("/{user_id}", response_model=schemas.UserResponse)
+@router.get("/{user_id}", response_model=schemas.UserResponse, dependencies=[Depends(get_current_user)])
 def get_user(user_id: int, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.user_id == user_id).first()
     if user is None:
@@ -46,7 +55,7 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
         )
     return user
 
-@router.put("/{user_id}", response_model=schemas.UserResponse)
+@router.put("/{user_id}", response_model=schemas.UserResponse, dependencies=[Depends(get_current_user)])
 def update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
@@ -64,9 +73,12 @@ def update_user(
     
     db.commit()
     db.refresh(db_user)
+    invalidate_user(user_id)
+    # Nombre y email aparecen en los detalles de proyecto cacheados
+    invalidate_all()
     return db_user
 
-@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(get_current_user)])
 def delete_user(user_id: int, db: Session = Depends(get_db)):
     db_user = db.query(models.User).filter(models.User.user_id == user_id).first()
     if db_user is None:
@@ -77,4 +89,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     
     db.delete(db_user)
     db.commit()
+    invalidate_user(user_id)
+    permissions.invalidate_user(user_id)
+    invalidate_all()
     return None
\ No newline at end of file
@@ -1,7 +1,7 @@
 from ast import pattern
 from pydantic import Field
 from pydantic import BaseModel, EmailStr, validator
-from typing import List, Optional
+from typing import List, Optional, Generic, TypeVar, Dict
 from datetime import datetime
 from enum import Enum
 from typing import Annotated
@@ -30,6 +30,17 @@ class MembershipRole(str, Enum):
     VIEWER = "viewer"
 
 
+### Pagination Schemas ###
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor opaco para pedir la página siguiente; null si no hay más"
+    )
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -39,6 +50,13 @@ class TokenData(BaseModel):
     email: str | None = None
     role: str | None = None
 
+# Usuario autenticado: lo mínimo que necesitan las rutas, cacheado por token
+class CurrentUser(BaseModel):
+    user_id: int
+    email: str
+    name: str
+    role: str
+
 ### User Schemas ###
 # Schema para crear usuario (entrada)
 class UserRole(str, Enum):
@@ -153,6 +171,26 @@ class TaskResponse(TaskBase):
     class Config:
         from_attributes = True
 
+# Actualización masiva: sólo se modifican los campos enviados
+class TaskBulkUpdate(BaseModel):
+    task_id: int
+    title: Optional[str] = Field(None, min_length=3, max_length=100)
+    description: Optional[str] = Field(None, min_length=10, max_length=500)
+    status: Optional[TaskStatus] = None
+    due_date: Optional[datetime] = None
+    assigned_to: Optional[int] = None
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+class TaskBulkResult(BaseModel):
+    count: int
+    # Ids en el orden de los elementos correctos; None si la base de datos
+    # no devuelve ids en inserciones masivas (MySQL)
+    task_ids: Optional[List[int]] = None
+    errors: List[BulkItemError] = []
+
 ### Project Schemas ###
 class ProjectBase(BaseModel):
     title: str = Field(..., min_length=3, max_length=100)
@@ -177,12 +215,39 @@ class ProjectResponse(ProjectBase):
     class Config:
         from_attributes = True
 
-class ProjectWithDetails(ProjectResponse):
+class ProjectStats(BaseModel):
+    task_count: int = 0
+    tasks_by_status: Dict[str, int] = {}
+    open_tasks: int = 0
+    done_tasks: int = 0
+    overdue_tasks: int = 0
+    member_count: int = 0
+    comment_count: int = 0
+
+# Listado ligero: contadores agregados en lugar de las listas completas
+class ProjectSummary(ProjectBase):
+    project_id: int
+    owner_id: int
+    created_at: datetime
+    stats: ProjectStats = ProjectStats()
+    # Sólo se rellenan con include_children=true
+    tasks: Optional[List["TaskBase"]] = None
+    members: Optional[List["UserBase"]] = None
+
+    class Config:
+        from_attributes = True
+
+# Detalle: cada colección hija llega limitada y con su propio cursor
+class ProjectWithDetails(ProjectBase):
+    project_id: int
+    owner_id: int
+    created_at: datetime
     owner: UserResponse
     members: List[UserResponse]
-    tasks: List["TaskResponse"]
-    comments: List["CommentResponse"]
-    files: List["FileResponse"]
+    stats: ProjectStats = ProjectStats()
+    tasks: Page["TaskResponse"]
+    comments: Page["CommentResponse"]
+    files: Page["FileResponse"]
 
     class Config:
         from_attributes = True
@@ -202,10 +267,32 @@ class FileResponse(FileBase):
     project_id: int
     user_id: int
     uploaded_at: datetime
+    # Sólo en los archivos subidos; None en los enlaces externos
+    content_hash: Optional[str] = Field(None, description="SHA-256 del contenido")
+    size: Optional[int] = Field(None, description="Tamaño en bytes")
+    content_type: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+# Subidas reanudables: se crea la subida, se envían las partes (en cualquier
+# orden, reenviables) y se completa
+class FileUploadCreate(BaseModel):
+    project_id: int
+    file_name: str = Field(..., max_length=255, description="Nombre del archivo")
+    content_type: Optional[str] = Field(None, max_length=255)
+
+class FilePart(BaseModel):
+    part_number: int
+    size: int
+
+class FileUploadResponse(BaseModel):
+    upload_id: str
+    project_id: int
+    file_name: str
+    content_type: Optional[str] = None
+    parts: List[FilePart] = []
+
 ### Comment Schemas ###
 class CommentBase(BaseModel):
     content: str = Field(..., min_length=1, max_length=1000, description="Contenido del comentario")
@@ -277,6 +364,11 @@ class Membership(MembershipBase):
     class Config:
         from_attributes = True
 
+class MembershipBulkResult(BaseModel):
+    # Filas escritas (insertadas, actualizadas o ya existentes con "ignore")
+    count: int
+    errors: List[BulkItemError] = []
+
 class MembershipResponse(MembershipBase):
     membership_id: int
     user_id: int
@@ -288,6 +380,39 @@ class MembershipResponse(MembershipBase):
         from_attributes = True
 
 
+### Search Schemas ###
+class SearchKind(str, Enum):
+    TASK = "task"
+    COMMENT = "comment"
+    PROJECT = "project"
+
+class SearchResult(BaseModel):
+    kind: SearchKind
+    object_id: int
+    project_id: int
+    title: str
+    snippet: str
+    score: float
+
+### Profiler Schemas ###
+# PUT /profiler: sólo se cambian los campos enviados
+class ProfilerSettings(BaseModel):
+    enabled: Optional[bool] = None
+    sample_rate: Optional[float] = Field(None, ge=0, le=1, description="Fracción de peticiones con informe")
+    slow_ms: Optional[float] = Field(None, ge=0, description="Umbral del log de sentencias lentas")
+    n_plus_one: Optional[int] = Field(None, ge=2, description="Repeticiones de una forma que señalan un N+1")
+
+### Activity Schemas ###
+# Feed de actividad: `data` depende del tipo (p. ej. {"from", "to"} en task.status_changed)
+class ActivityResponse(BaseModel):
+    activity_id: int
+    project_id: int
+    user_id: Optional[int] = None
+    type: str
+    object_id: Optional[int] = None
+    data: Optional[Dict] = None
+    created_at: datetime
+
 # Referencias forward para evitar referencias circulares
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -0,0 +1,237 @@
+# utils/activity.py
+# Registro de actividad (feed por proyecto y por usuario) sin coste en la
+# latencia de las escrituras: los handlers llaman a record() tras el commit,
+# que sólo encola la fila en memoria, y una tarea del lifespan la inserta en
+# la tabla activities por lotes (varias filas por sentencia) al llegar a
+# ACTIVITY_BATCH_SIZE filas o cada ACTIVITY_FLUSH_MS.
+#
+# Si la base de datos falla, las filas siguen en la cola; al pasar de
+# ACTIVITY_MAX_PENDING, o si al parar no se pueden insertar, se añaden a un
+# archivo NDJSON por proceso en ACTIVITY_SPOOL_DIR que se inserta al volver la
+# base de datos o en el siguiente arranque (también el de un worker muerto).
+# Un proceso que muere sin parar pierde lo que tuviera en cola: como mucho
+# ACTIVITY_FLUSH_MS de actividad.
+import asyncio
+import itertools
+import json
+import logging
+import os
+import secrets
+import shutil
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+import models
+from database import async_engine
+from utils.db_pool import _env_bool
+
+ACTIVITY_ENABLED = _env_bool("ACTIVITY_ENABLED", True)
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", "500"))
+ACTIVITY_FLUSH_MS = float(os.getenv("ACTIVITY_FLUSH_MS", "1000"))
+ACTIVITY_MAX_PENDING = int(os.getenv("ACTIVITY_MAX_PENDING", "100000"))
+ACTIVITY_SPOOL_DIR = os.path.abspath(os.getenv("ACTIVITY_SPOOL_DIR", "activity_spool"))
+# Tiempo para la última inserción al parar; después, al archivo
+ACTIVITY_SHUTDOWN_TIMEOUT = float(os.getenv("ACTIVITY_SHUTDOWN_TIMEOUT", "5"))
+
+logger = logging.getLogger("activity")
+
+def _value(value):
+    # Enums (estado, rol) como su valor, para el JSON de `data`
+    return getattr(value, "value", value)
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class ActivityLog:
+    def __init__(self):
+        self.pending = []
+        self.counters = {"recorded": 0, "flushed": 0, "batches": 0, "failures": 0,
+                         "spooled": 0, "replayed": 0}
+        self._wakeup = None
+        self._task = None
+        self._closing = False
+        # Hay filas de este proceso en el archivo: reintentar al recuperarse
+        self._spooled = False
+
+    def record(self, project_id: int, type: str, object_id: int = None, user_id: int = None,
+               data: dict = None):
+        if not ACTIVITY_ENABLED:
+            return
+        self.pending.append({
+            "project_id": project_id,
+            "user_id": user_id,
+            "type": type,
+            "object_id": object_id,
+            "data": {key: _value(value) for key, value in data.items()} if data else None,
+            "created_at": datetime.now(timezone.utc),
+        })
+        self.counters["recorded"] += 1
+        if len(self.pending) >= ACTIVITY_MAX_PENDING:
+            # Base de datos caída (o sin tarea de volcado): a disco
+            self.spool()
+        elif len(self.pending) >= ACTIVITY_BATCH_SIZE and self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        # Desde el lifespan
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = self._wakeup = None
+        try:
+            done = await asyncio.wait_for(self.flush(), ACTIVITY_SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            done = False
+        if not done:
+            self.spool()
+
+    async def _run(self):
+        await self.replay()
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), ACTIVITY_FLUSH_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._closing:
+                break
+            if await self.flush() and self._spooled:
+                await self.replay()
+
+    async def _insert(self, rows: list):
+        # executemany: los drivers de MySQL lo envían como un único INSERT de
+        # varias filas; SQLite lo repite en una sola transacción
+        async with async_engine.begin() as conn:
+            await conn.execute(insert(models.Activity), rows)
+
+    async def flush(self) -> bool:
+        """Inserta la cola por lotes; False si la base de datos falla.
+
+        Un lote fallido (o cancelado) vuelve al principio de la cola.
+        """
+        while self.pending:
+            batch = self.pending[:ACTIVITY_BATCH_SIZE]
+            del self.pending[:len(batch)]
+            try:
+                await self._insert(batch)
+            except BaseException as exc:
+                self.pending[:0] = batch
+                if not isinstance(exc, Exception):
+                    raise
+                self.counters["failures"] += 1
+                logger.warning("Activity flush failed, %d rows pending: %s",
+                               len(self.pending), str(exc).partition("\n")[0])
+                return False
+            self.counters["flushed"] += len(batch)
+            self.counters["batches"] += 1
+        return True
+
+    def _spool_path(self, pid: int = None) -> str:
+        return os.path.join(ACTIVITY_SPOOL_DIR, f"activity-{pid or os.getpid()}.ndjson")
+
+    def _write_rows(self, spool, rows):
+        for row in rows:
+            spool.write(json.dumps({**row, "created_at": row["created_at"].isoformat()}) + "\n")
+        spool.flush()
+        os.fsync(spool.fileno())
+
+    def spool(self):
+        # Añade la cola al archivo de este proceso y la vacía
+        if not self.pending:
+            return
+        os.makedirs(ACTIVITY_SPOOL_DIR, exist_ok=True)
+        with open(self._spool_path(), "a", encoding="utf-8") as spool:
+            self._write_rows(spool, self.pending)
+        logger.warning("Spooled %d activity rows to %s", len(self.pending), self._spool_path())
+        self.counters["spooled"] += len(self.pending)
+        self.pending.clear()
+        self._spooled = True
+
+    def _claimable(self) -> list:
+        # Archivos de este proceso o de procesos que ya no existen (otro
+        # worker vivo sigue escribiendo en el suyo). Se reclaman renombrándolos,
+        # así que dos procesos no insertan el mismo archivo
+        try:
+            names = os.listdir(ACTIVITY_SPOOL_DIR)
+        except FileNotFoundError:
+            return []
+        claimed = []
+        for name in names:
+            # activity-<pid>.ndjson, o activity-<pid>.<pid que lo reclamó>.<token>.claimed
+            parts = name.split(".")
+            if not parts[0].startswith("activity-"):
+                continue
+            if len(parts) == 2 and parts[1] == "ndjson":
+                owner = parts[0][len("activity-"):]
+            elif len(parts) == 4 and parts[3] == "claimed":
+                owner = parts[1]
+            else:
+                continue
+            if not owner.isdigit() or (int(owner) != os.getpid() and _pid_alive(int(owner))):
+                continue
+            path = os.path.join(ACTIVITY_SPOOL_DIR, name)
+            target = os.path.join(ACTIVITY_SPOOL_DIR, f"{parts[0]}.{os.getpid()}.{secrets.token_hex(4)}.claimed")
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue
+            claimed.append(target)
+        return claimed
+
+    async def replay(self):
+        # Inserta los archivos pendientes por lotes, leyéndolos en streaming;
+        # si falla, cada archivo se queda sólo con lo que falta por insertar
+        self._spooled = False
+        for path in self._claimable():
+            replayed = 0
+            with open(path, encoding="utf-8") as spool:
+                while lines := list(itertools.islice(spool, ACTIVITY_BATCH_SIZE)):
+                    rows = [json.loads(line) for line in lines]
+                    for row in rows:
+                        row["created_at"] = datetime.fromisoformat(row["created_at"])
+                    try:
+                        await self._insert(rows)
+                    except Exception as exc:
+                        with open(path + ".tmp", "w", encoding="utf-8") as rest:
+                            rest.writelines(lines)
+                            shutil.copyfileobj(spool, rest)
+                        os.replace(path + ".tmp", path)
+                        logger.warning("Activity spool replay failed for %s: %s",
+                                       path, str(exc).partition("\n")[0])
+                        self._spooled = True
+                        break
+                    replayed += len(rows)
+                else:
+                    os.unlink(path)
+            self.counters["replayed"] += replayed
+            if replayed:
+                logger.info("Replayed %d activity rows from %s", replayed, path)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": ACTIVITY_ENABLED,
+            "pending": len(self.pending),
+            "batch_size": ACTIVITY_BATCH_SIZE,
+            "flush_ms": ACTIVITY_FLUSH_MS,
+            **self.counters,
+        }
+
+log = ActivityLog()
+
+def record(project_id: int, type: str, object_id: int = None, user_id: int = None, data: dict = None):
+    """Encola una fila del registro; llamar tras el commit de la escritura."""
+    log.record(project_id, type, object_id, user_id, data)
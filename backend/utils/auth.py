@@ -1,22 +1,40 @@
 # utils/auth.py
-from passlib.context import CryptContext
+import os
+import time
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
-from fastapi import HTTPException, status
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+import models
+import schemas
+from utils.cache import TTLCache
+from utils import passwords
+from utils.bus import shared
 
 # Configuración de JWT
 SECRET_KEY = "tu_clave_secreta_aqui"  # Deberías mover esto a variables de entorno
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Caché de tokens ya verificados: firma del JWT -> (token, claims, usuario).
+# Cada entrada caduca con el token (o antes, con TOKEN_CACHE_TTL)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt se ejecuta en el pool de procesos de utils/passwords.py
+async def get_password_hash(password: str) -> str:
+    return await passwords.hash_password(password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    # (válida, nuevo hash si hay que actualizar el coste guardado)
+    return await passwords.verify_and_update(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -34,8 +52,58 @@ def verify_token(token: str):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        raise _credentials_error()
+
+def _credentials_error(detail: str = "Token inválido"):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> schemas.CurrentUser:
+    # Sesión propia del primario, cerrada antes del handler: un usuario recién
+    # registrado puede no estar aún en la réplica (y lo leído se cachea por
+    # token), y la petición no retiene dos conexiones a la vez. Con el token
+    # en caché no llega a pedir conexión
+    async with AsyncSessionLocal() as db:
+        return await user_for_token(token, db)
+
+async def require_admin(
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+) -> schemas.CurrentUser:
+    if current_user.role != models.UserRole.ADMIN.value:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
+
+async def user_for_token(token: str, db: AsyncSession) -> schemas.CurrentUser:
+    # También para conexiones largas (SSE/WebSocket), que no usan la dependencia
+    signature = token.rsplit(".", 1)[-1]
+    cached = token_cache.get(signature)
+    # Se compara el token completo: la firma sola no basta como identidad
+    if cached is not None and cached[0] == token:
+        return cached[2]
+
+    claims = verify_token(token)
+    user = (await db.execute(
+        select(models.User.user_id, models.User.email, models.User.name, models.User.role)
+        .where(models.User.email == claims.get("sub"))
+    )).first()
+    if user is None:
+        raise _credentials_error("User not found")
+
+    current_user = schemas.CurrentUser(
+        user_id=user.user_id,
+        email=user.email,
+        name=user.name,
+        role=user.role.value if user.role else models.UserRole.USER.value,
+    )
+    ttl = min(token_cache.ttl, claims.get("exp", 0) - time.time())
+    token_cache.set(signature, (token, claims, current_user), ttl=ttl,
+                    tags=(f"user:{current_user.user_id}",))
+    return current_user
+
+@shared
+def invalidate_user(user_id: int):
+    # Llamar tras modificar o eliminar un usuario
+    token_cache.invalidate_tag(f"user:{user_id}")
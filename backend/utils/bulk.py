@@ -0,0 +1,23 @@
+# utils/bulk.py
+# Utilidades comunes a las rutas de operaciones masivas
+import os
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Máximo de elementos por petición masiva
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "5000"))
+
+def check_bulk_size(items):
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many items (max {BULK_MAX_ITEMS})"
+        )
+
+async def existing_ids(db: AsyncSession, column, ids) -> set:
+    # Una sola consulta IN para validar todas las referencias de un lote
+    ids = {value for value in ids if value is not None}
+    if not ids:
+        return set()
+    return set((await db.scalars(select(column).where(column.in_(ids)))).all())
@@ -0,0 +1,163 @@
+# utils/bus.py
+# Reenvío entre los workers de python main.py (utils/server.py) de lo que
+# cada proceso guarda en memoria: invalidaciones de las cachés de respuestas,
+# permisos y tokens, eventos de los proyectos y escrituras recientes para la
+# réplica. Cada worker envía el mensaje al maestro por su pipe y el maestro
+# lo reparte a los demás, que lo aplican en su bucle de eventos y confirman.
+#
+# Una petición de escritura no envía su respuesta hasta que los demás workers
+# han aplicado lo que envió (WaitForPeers): la siguiente lectura, la atienda
+# quien la atienda, ya no ve la caché anterior. Si un worker no confirma en
+# SERVER_BUS_TIMEOUT segundos la respuesta sale igualmente; el TTL de cada
+# caché sigue acotando el resto.
+#
+# Fuera del lanzador (uvicorn main:app, tests) no hay canal: send() no hace
+# nada y todo queda en el proceso, como antes.
+import asyncio
+import functools
+import logging
+import math
+import os
+import threading
+
+SERVER_BUS_TIMEOUT = float(os.getenv("SERVER_BUS_TIMEOUT", "2"))
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+logger = logging.getLogger("bus")
+
+# nombre -> función que aplica el mensaje en este proceso
+_handlers = {}
+
+class Bus:
+    def __init__(self):
+        self.channel = None
+        self.loop = None
+        self.thread = None
+        self.seq = 0
+        self.unacked = set()
+        self.waiters = []
+        self.counters = {"sent": 0, "received": 0, "timeouts": 0}
+
+    def attach(self, channel):
+        # Desde el bucle de eventos del worker, antes del lifespan: lo que
+        # llegue mientras arranca se aplica en cuanto el bucle queda libre
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.thread = threading.get_ident()
+        self.loop.add_reader(channel.fileno(), self._receive)
+
+    def send(self, name: str, args: tuple):
+        if self.channel is None:
+            return
+        if threading.get_ident() != self.thread:
+            # Handlers síncronos (threadpool): el pipe sólo se usa desde el bucle
+            self.loop.call_soon_threadsafe(self._send, name, args)
+        else:
+            self._send(name, args)
+
+    def _send(self, name: str, args: tuple):
+        self.seq += 1
+        try:
+            self.channel.send(("bus", self.seq, name, args))
+        except OSError:
+            # Maestro caído: no hay a quién avisar
+            return
+        self.unacked.add(self.seq)
+        self.counters["sent"] += 1
+
+    def _receive(self):
+        try:
+            while self.channel.poll():
+                message = self.channel.recv()
+                if message[0] == "bus":
+                    _, origin, seq, name, args = message
+                    self._apply(name, args)
+                    if origin:
+                        self.channel.send(("ack", origin, seq))
+                elif message[0] == "acked":
+                    self.unacked.discard(message[1])
+                    self._wake()
+        except (EOFError, OSError):
+            # Sin maestro: el worker se para solo (WorkerServer.on_tick)
+            self.loop.remove_reader(self.channel.fileno())
+
+    def _apply(self, name: str, args: tuple):
+        self.counters["received"] += 1
+        try:
+            _handlers[name](*args)
+        except Exception:
+            logger.exception("Failed to apply %s from another worker", name)
+
+    def _wake(self):
+        oldest = min(self.unacked, default=math.inf)
+        for waiter in list(self.waiters):
+            target, future = waiter
+            if oldest > target:
+                self.waiters.remove(waiter)
+                if not future.done():
+                    future.set_result(None)
+
+    async def flush(self):
+        """Espera a que los demás workers hayan aplicado todo lo enviado hasta ahora."""
+        if not self.unacked:
+            return
+        waiter = (self.seq, self.loop.create_future())
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), SERVER_BUS_TIMEOUT)
+        except asyncio.TimeoutError:
+            # Se deja de esperar por esos mensajes: las escrituras siguientes
+            # sólo esperan por los suyos
+            self.unacked = {seq for seq in self.unacked if seq > waiter[0]}
+            self.counters["timeouts"] += 1
+            logger.warning("Other workers did not confirm message %d in %.1f s", waiter[0], SERVER_BUS_TIMEOUT)
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+    def stats(self) -> dict:
+        return {"worker": os.getpid(), "attached": self.channel is not None, "pending": len(self.unacked),
+                **self.counters}
+
+bus = Bus()
+
+def handler(name: str):
+    """Registra la función que aplica el mensaje `name` llegado de otro worker."""
+    def decorator(fn):
+        _handlers[name] = fn
+        return fn
+    return decorator
+
+def send(name: str, *args):
+    bus.send(name, args)
+
+def shared(fn):
+    """La función se aplica aquí y, con los mismos argumentos, en los demás workers."""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    _handlers[name] = fn
+
+    @functools.wraps(fn)
+    def wrapper(*args):
+        result = fn(*args)
+        bus.send(name, args)
+        return result
+    return wrapper
+
+class WaitForPeers:
+    """Retiene la respuesta de una escritura hasta que los demás workers han
+    aplicado lo que envió (invalidaciones, eventos)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or bus.channel is None:
+            return await self.app(scope, receive, send)
+
+        async def send_after_peers(message):
+            if message["type"] == "http.response.start":
+                await bus.flush()
+            await send(message)
+
+        await self.app(scope, receive, send_after_peers)
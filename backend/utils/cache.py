@@ -0,0 +1,104 @@
+# utils/cache.py
+# Caché en memoria de proceso con TTL, expulsión LRU por tamaño y etiquetas
+# para invalidar grupos de entradas (por ejemplo, todo lo de un usuario).
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, sizeof=None, maxbytes: int = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        # sizeof(value) -> bytes aproximados, para las métricas de memoria
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags, size)
+        self._tags = {}  # tag -> set(keys)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[1] <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl: float = None, tags=()):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        size = self._sizeof(value) if self._sizeof else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tuple(tags), size)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._entries and (len(self._entries) > self.maxsize
+                                     or (self.maxbytes is not None and self._bytes > self.maxbytes)):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_tag(self, tag) -> int:
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, _, tags, size = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "bytes": self._bytes,
+                "maxbytes": self.maxbytes,
+            }
@@ -0,0 +1,142 @@
+# utils/counters.py
+# Contadores por proyecto (tabla project_stats) mantenidos por las escrituras.
+# Cada cambio es un UPDATE relativo (col = col + n) dentro de la transacción
+# de la escritura: los incrementos concurrentes no se pisan y un rollback los
+# deshace. Un delta que depende del estado anterior (el de una tarea) sólo es
+# correcto si la fila se leyó bloqueada (FOR UPDATE) en la misma transacción.
+# repair() los recalcula por lotes y devuelve la deriva encontrada.
+import os
+from collections import Counter, namedtuple
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+
+import models
+
+STATUS_COLUMNS = {
+    models.TaskStatus.TODO: "todo_tasks",
+    models.TaskStatus.IN_PROGRESS: "in_progress_tasks",
+    models.TaskStatus.REVIEW: "review_tasks",
+    models.TaskStatus.DONE: "done_tasks",
+}
+COLUMNS = (*STATUS_COLUMNS.values(), "member_count", "comment_count")
+
+# Proyectos recalculados por transacción en repair()
+REPAIR_BATCH_SIZE = int(os.getenv("COUNTERS_REPAIR_BATCH_SIZE", "1000"))
+
+Drift = namedtuple("Drift", "project_id column stored actual")
+
+_stats = models.ProjectStats.__table__
+
+# executemany: una fila de parámetros por proyecto
+_ADJUST_MANY = update(_stats).where(
+    _stats.c.project_id == bindparam("b_project_id")
+).values({column: _stats.c[column] + bindparam(f"b_{column}") for column in COLUMNS})
+
+_OVERWRITE_MANY = update(_stats).where(
+    _stats.c.project_id == bindparam("b_project_id")
+).values({column: bindparam(f"b_{column}") for column in COLUMNS})
+
+def status_column(status) -> str:
+    # Una tarea sin estado cuenta como TODO, el valor por defecto del modelo
+    return STATUS_COLUMNS[models.TaskStatus(status or models.TaskStatus.TODO)]
+
+def task_delta(removed=None, added=None) -> Counter:
+    """Delta de una transición de estado: alta (added), baja (removed) o cambio."""
+    delta = Counter()
+    if removed is not None:
+        delta[status_column(removed)] -= 1
+    if added is not None:
+        delta[status_column(added)] += 1
+    return delta
+
+async def adjust(db, project_id: int, delta: dict):
+    values = {column: _stats.c[column] + n for column, n in delta.items() if n}
+    if values:
+        await db.execute(update(_stats).where(_stats.c.project_id == project_id).values(values))
+
+async def adjust_many(db, deltas: dict):
+    # {project_id: delta} de las escrituras masivas en un solo executemany
+    rows = [
+        {"b_project_id": project_id, **{f"b_{column}": delta.get(column, 0) for column in COLUMNS}}
+        for project_id, delta in deltas.items() if any(delta.values())
+    ]
+    if rows:
+        await db.execute(_ADJUST_MANY, rows)
+
+# --- Reparación ---
+
+def _actual(conn, project_ids) -> dict:
+    # Recuento real con una consulta agrupada por tabla
+    actual = {project_id: Counter() for project_id in project_ids}
+    for project_id, status, total in conn.execute(
+        select(models.Task.project_id, models.Task.status, func.count())
+        .where(models.Task.project_id.in_(project_ids))
+        .group_by(models.Task.project_id, models.Task.status)
+    ):
+        actual[project_id][status_column(status)] += total
+    for model, column in ((models.Membership, "member_count"), (models.Comment, "comment_count")):
+        for project_id, total in conn.execute(
+            select(model.project_id, func.count())
+            .where(model.project_id.in_(project_ids))
+            .group_by(model.project_id)
+        ):
+            actual[project_id][column] = total
+    return actual
+
+def _repair_batch(conn, project_ids, fix: bool) -> list:
+    # Se bloquean las filas de contadores antes de contar: una escritura
+    # concurrente espera y aplica su delta sobre el valor ya corregido
+    stored = {row.project_id: row for row in conn.execute(
+        select(_stats).where(_stats.c.project_id.in_(project_ids)).with_for_update()
+    )}
+    actual = _actual(conn, project_ids)
+
+    drift, missing, changed = [], [], []
+    for project_id in project_ids:
+        row = stored.get(project_id)
+        counts = actual[project_id]
+        differences = [
+            Drift(project_id, column, getattr(row, column) if row is not None else None, counts[column])
+            for column in COLUMNS
+            if row is None or getattr(row, column) != counts[column]
+        ]
+        if row is None:
+            missing.append({"project_id": project_id, **{column: counts[column] for column in COLUMNS}})
+        elif differences:
+            changed.append({"b_project_id": project_id, **{f"b_{column}": counts[column] for column in COLUMNS}})
+        drift.extend(differences)
+
+    if fix:
+        if missing:
+            conn.execute(insert(_stats), missing)
+        if changed:
+            conn.execute(_OVERWRITE_MANY, changed)
+    return drift
+
+def repair(conn, fix: bool = True, batch_size: int = REPAIR_BATCH_SIZE, commit_each_batch: bool = False) -> list:
+    """Recalcula los contadores de todos los proyectos y devuelve la deriva.
+
+    Con fix=False sólo informa. commit_each_batch confirma cada lote por
+    separado para no bloquear todas las filas a la vez (conexión sin begin()).
+    """
+    drift, last_id = [], 0
+    while True:
+        project_ids = conn.execute(
+            select(models.Project.project_id)
+            .where(models.Project.project_id > last_id)
+            .order_by(models.Project.project_id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not project_ids:
+            break
+        last_id = project_ids[-1]
+        drift.extend(_repair_batch(conn, project_ids, fix))
+        if commit_each_batch:
+            conn.commit()
+
+    if fix:
+        # Contadores de proyectos que ya no existen
+        conn.execute(delete(_stats).where(_stats.c.project_id.not_in(select(models.Project.project_id))))
+        if commit_each_batch:
+            conn.commit()
+    return drift
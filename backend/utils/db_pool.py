@@ -0,0 +1,105 @@
+# utils/db_pool.py
+import os
+import threading
+import time
+from sqlalchemy.pool import QueuePool
+
+# Límites (en segundos) del histograma de espera al pedir una conexión
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def pool_options_from_env(url: str) -> dict:
+    """Opciones de pool para create_engine leídas de variables de entorno."""
+    # SQLite en memoria usa un pool de una sola conexión sin estos parámetros
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith("sqlite:")):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # MySQL cierra conexiones inactivas (wait_timeout); reciclar antes evita
+        # el "MySQL server has gone away"
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "pool_use_lifo": _env_bool("DB_POOL_USE_LIFO", False),
+    }
+
+class PoolStats:
+    """Contadores acumulados de un pool: esperas, checkouts y fallos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_seconds_total = 0.0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def observe_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def snapshot(self, pool=None) -> dict:
+        with self._lock:
+            # Histograma acumulado, como en Prometheus (le = "menor o igual que")
+            histogram, running = {}, 0
+            for bound, count in zip(WAIT_BUCKETS + ("inf",), self.wait_buckets):
+                running += count
+                histogram[f"le_{bound}"] = running
+            data = {
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_histogram": histogram,
+            }
+        if pool is not None and isinstance(pool, QueuePool):
+            data.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            })
+        return data
+
+def instrumented_pool_class(base=QueuePool):
+    """Crea una subclase del pool que mide la espera de cada checkout.
+
+    Las estadísticas viven en la clase para sobrevivir a pool.recreate().
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except Exception:
+            self.stats.record_failure()
+            raise
+        self.stats.observe_wait(time.perf_counter() - start)
+        return connection
+
+    return type(
+        f"Instrumented{base.__name__}",
+        (base,),
+        {"stats": PoolStats(), "_do_get": _do_get},
+    )
@@ -0,0 +1,188 @@
+# utils/events.py
+# Canal de eventos por proyecto (SSE y WebSocket) alimentado por los handlers
+# de escritura, para que los clientes no tengan que sondear la API.
+#
+# Los eventos son compactos: {"id", "type", "object_id"}; el cliente vuelve a
+# pedir sólo lo que cambió. Cada conexión acumula sus eventos pendientes por
+# objeto, así que una ráfaga de escrituras sobre la misma tarea se entrega
+# como un único evento. Un histórico común y acotado permite reanudar desde el
+# último id recibido; si ya no alcanza, se envía "reset" y el cliente recarga.
+# Cada worker tiene su canal; con el lanzador de utils/server.py los eventos
+# se reenvían a los demás workers con su mismo id (utils/bus.py), así que una
+# conexión recibe todas las escrituras de su proyecto y puede reanudar en
+# cualquier worker.
+import asyncio
+import bisect
+import os
+import time
+from collections import deque
+
+from utils import bus
+
+# Eventos recientes (de todos los proyectos) disponibles para reanudar
+EVENTS_REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", "10000"))
+# Ventana en la que se agrupan las ráfagas antes de enviar
+EVENTS_COALESCE_MS = float(os.getenv("EVENTS_COALESCE_MS", "50"))
+# Comentario/mensaje vacío periódico: mantiene vivos los proxies y detecta
+# las conexiones cerradas
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+# Objetos distintos pendientes por conexión; al superarlo se envía "reset"
+EVENTS_MAX_PENDING = int(os.getenv("EVENTS_MAX_PENDING", "256"))
+
+RESET = "reset"
+
+def _event_id(event: dict) -> int:
+    return event["id"]
+
+def _history_id(item: tuple) -> int:
+    return item[1]["id"]
+
+class Subscription:
+    # Una por conexión: sólo los pendientes y un futuro en el que esperar. Los
+    # temporizadores (agrupación y latido) son del broker, no de cada conexión:
+    # con miles de conexiones, un temporizador y una tarea por conexión en cada
+    # reparto disparan recolecciones completas del GC
+    __slots__ = ("pending", "waiter")
+
+    def __init__(self):
+        self.pending = {}
+        self.waiter = None
+
+    def push(self, event: dict):
+        if RESET in self.pending:
+            # El cliente recargará todo: sólo avanza el id desde el que reanudar
+            self.pending[RESET]["id"] = event["id"]
+            return
+        if len(self.pending) >= EVENTS_MAX_PENDING:
+            # Demasiados cambios sin entregar: el cliente tendrá que recargar
+            self.pending = {RESET: {"id": event["id"], "type": RESET, "object_id": None}}
+            return
+        entity = event["type"].split(".", 1)[0]
+        key = (entity, event["object_id"])
+        previous = self.pending.pop(key, None)
+        # created + updated sigue siendo un alta para quien no la ha visto
+        if previous and previous["type"].endswith(".created") and event["type"].endswith(".updated"):
+            event = {**event, "type": previous["type"]}
+        self.pending[key] = event
+
+    def wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def next_batch(self) -> list:
+        # Eventos agrupados, en orden de id; lista vacía en cada latido
+        if not self.pending:
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+        # Los reenviados desde otro worker pueden llegar después de ids mayores
+        batch = sorted(self.pending.values(), key=_event_id)
+        self.pending = {}
+        return batch
+
+class EventBroker:
+    def __init__(self, replay_size: int = EVENTS_REPLAY_SIZE):
+        # Ids en microsegundos desde la época: siguen creciendo tras reiniciar
+        # el proceso, así que un id de antes del reinicio cae bajo `floor`
+        self.last_id = time.time_ns() // 1000
+        # Los ids <= floor ya no están en el histórico
+        self.floor = self.last_id
+        # (project_id, evento) ordenados por id, aunque lleguen desordenados
+        self.history = deque(maxlen=replay_size)
+        self.channels = {}
+        self.published = 0
+        # Proyectos con un reparto ya programado y bucle con el latido en marcha
+        self._scheduled = set()
+        self._heartbeat_loop = None
+
+    def publish(self, project_id: int, type: str, object_id: int = None, event_id: int = None) -> int:
+        # Llamar desde el bucle de eventos, tras el commit de la escritura.
+        # event_id: el asignado por el worker que atendió la escritura
+        if event_id is None:
+            self.last_id = max(self.last_id + 1, time.time_ns() // 1000)
+            event_id = self.last_id
+        else:
+            self.last_id = max(self.last_id, event_id)
+        event = {"id": event_id, "type": type, "object_id": object_id}
+        self._remember(project_id, event)
+        self.published += 1
+        subscribers = self.channels.get(project_id)
+        if subscribers:
+            for subscription in subscribers:
+                subscription.push(event)
+            # Un solo temporizador por proyecto agrupa la ráfaga
+            if project_id not in self._scheduled:
+                self._scheduled.add(project_id)
+                asyncio.get_running_loop().call_later(EVENTS_COALESCE_MS / 1000, self._flush, project_id)
+        return event_id
+
+    def _remember(self, project_id: int, event: dict):
+        # Un evento de otro worker puede traer un id menor que los ya guardados:
+        # se inserta en su sitio y, lleno el histórico, sale el de menor id
+        if len(self.history) == self.history.maxlen:
+            if event["id"] <= _history_id(self.history[0]):
+                self.floor = max(self.floor, event["id"])
+                return
+            self.floor = max(self.floor, _history_id(self.history.popleft()))
+        if not self.history or _history_id(self.history[-1]) <= event["id"]:
+            self.history.append((project_id, event))
+        else:
+            bisect.insort(self.history, (project_id, event), key=_history_id)
+
+    def _flush(self, project_id: int):
+        self._scheduled.discard(project_id)
+        for subscription in self.channels.get(project_id, ()):
+            if subscription.pending:
+                subscription.wake()
+
+    def _beat(self):
+        # Despierta todas las conexiones: las que no tienen eventos envían un latido
+        for subscribers in self.channels.values():
+            for subscription in subscribers:
+                subscription.wake()
+        asyncio.get_running_loop().call_later(EVENTS_HEARTBEAT_SECONDS, self._beat)
+
+    def subscribe(self, project_id: int, last_event_id: int = None) -> Subscription:
+        # Registro y reenvío sin await en medio: no se pierde ningún evento
+        loop = asyncio.get_running_loop()
+        if self._heartbeat_loop is not loop:
+            self._heartbeat_loop = loop
+            loop.call_later(EVENTS_HEARTBEAT_SECONDS, self._beat)
+        subscription = Subscription()
+        self.channels.setdefault(project_id, set()).add(subscription)
+        if last_event_id is not None:
+            if last_event_id < self.floor or last_event_id > self.last_id:
+                subscription.push({"id": self.last_id, "type": RESET, "object_id": None})
+            else:
+                for event_project, event in self.history:
+                    if event_project == project_id and event["id"] > last_event_id:
+                        subscription.push(event)
+        return subscription
+
+    def unsubscribe(self, project_id: int, subscription: Subscription):
+        subscribers = self.channels.get(project_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.channels[project_id]
+
+    def stats(self) -> dict:
+        return {
+            "connections": sum(len(subscribers) for subscribers in self.channels.values()),
+            "projects": len(self.channels),
+            "published": self.published,
+            "history": len(self.history),
+            "last_id": self.last_id,
+        }
+
+broker = EventBroker()
+
+def publish(project_id: int, type: str, object_id: int = None):
+    event_id = broker.publish(project_id, type, object_id)
+    bus.send("events.publish", project_id, type, object_id, event_id)
+
+@bus.handler("events.publish")
+def _publish_from_peer(project_id: int, type: str, object_id: int, event_id: int):
+    broker.publish(project_id, type, object_id, event_id)
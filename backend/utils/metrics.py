@@ -0,0 +1,228 @@
+# utils/metrics.py
+# Métricas de la API en el formato de texto de Prometheus (GET /metrics), sin
+# dependencias: un middleware ASGI mide cada petición por plantilla de ruta
+# (latencia, tamaño de respuesta, peticiones en curso) y los eventos del
+# engine cuentan las sentencias SQL y el tiempo de base de datos de la
+# petición en curso. La cola del threadpool y los pools de conexiones se leen
+# al exportar. Las métricas son del proceso, como las cachés.
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+import anyio.to_thread
+from sqlalchemy import event
+
+from utils.db_pool import _env_bool
+
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Ruta de las peticiones que no casan con ninguna (404): una sola serie
+UNMATCHED = "<unmatched>"
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels):
+        # En un Counter, para copiar un total que se lleva en otro sitio
+        self.values[labels] = value
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _labels(self.labels, labels), value
+
+class Gauge(Counter):
+    kind = "gauge"
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [cuenta por cubo (+Inf al final), suma]
+
+    def observe(self, value: float, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        # Primer cubo con límite >= valor (le = "menor o igual que")
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self):
+        names = self.labels + ("le",)
+        for labels, (counts, total) in self.series.items():
+            running = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                running += count
+                yield f"{self.name}_bucket", _labels(names, labels + (bound,)), running
+            yield f"{self.name}_sum", _labels(self.labels, labels), total
+            yield f"{self.name}_count", _labels(self.labels, labels), running
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {value}" for name, labels, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+ROUTE = ("method", "route")
+requests_total = registry.add(Counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ROUTE + ("status",)))
+requests_in_flight = registry.add(Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso (incluye streams SSE abiertos)"))
+request_duration = registry.add(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", LATENCY_BUCKETS, ROUTE))
+response_size = registry.add(Histogram(
+    "http_response_size_bytes", "Bytes del cuerpo de las respuestas HTTP", SIZE_BUCKETS, ROUTE))
+request_statements = registry.add(Histogram(
+    "db_statements_per_request", "Sentencias SQL ejecutadas por petición", STATEMENT_BUCKETS, ROUTE))
+request_db_time = registry.add(Histogram(
+    "db_time_per_request_seconds", "Tiempo total en la base de datos por petición", DB_TIME_BUCKETS, ROUTE))
+statements_total = registry.add(Counter(
+    "db_statements_total", "Sentencias SQL ejecutadas (dentro o fuera de una petición)"))
+# Se rellenan al exportar
+threadpool = registry.add(Gauge(
+    "threadpool_threads", "Hilos del threadpool de Starlette (busy, limit) y tareas en cola (waiting)",
+    ("state",)))
+db_pool = registry.add(Gauge(
+    "db_pool_connections", "Conexiones de cada pool por estado", ("pool", "state")))
+db_pool_checkouts = registry.add(Counter(
+    "db_pool_checkouts_total", "Checkouts acumulados de cada pool", ("pool",)))
+db_pool_wait = registry.add(Counter(
+    "db_pool_wait_seconds_total", "Espera acumulada al pedir una conexión", ("pool",)))
+db_pool_failures = registry.add(Counter(
+    "db_pool_checkout_failures_total", "Checkouts que agotaron DB_POOL_TIMEOUT", ("pool",)))
+
+requests_in_flight.set(0)
+
+# [sentencias, segundos] de la petición en curso. El middleware crea la lista
+# y los eventos del engine la actualizan: el contexto llega a los hilos del
+# threadpool y a los greenlets del engine asíncrono
+_request_sql = ContextVar("request_sql", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # En el contexto de ejecución y no en conn.info, que es más lento de leer
+    context._metrics_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    statements_total.inc()
+    sql = _request_sql.get()
+    if sql is not None:
+        sql[0] += 1
+        sql[1] += elapsed
+
+def instrument_engine(engine):
+    # Para el engine asíncrono se pasa async_engine.sync_engine
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# id(ruta) -> plantilla completa, p. ej. "/api/tasks/{task_id}"
+_templates = {}
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED
+    template = _templates.get(id(route))
+    if template is None:
+        # Según la versión de FastAPI, la ruta de un router incluido guarda su
+        # path sin el prefijo del include: se busca la cola de la URL que
+        # casa con la ruta y lo que queda delante es el prefijo (fijo para
+        # cada ruta, así que se calcula una vez)
+        path, regex = scope["path"], getattr(route, "path_regex", None)
+        template = route.path
+        for i in (i for i in range(len(path) - 1, -1, -1) if path[i] == "/"):
+            if regex is not None and regex.match(path[i:]):
+                template = path[:i] + route.path
+                break
+        _templates[id(route)] = template
+    return template
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: sin BaseHTTPMiddleware ni tareas extra por petición."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status, size = 500, 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        sql = [0, 0.0]
+        token = _request_sql.set(sql)
+        requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight.inc(amount=-1)
+            _request_sql.reset(token)
+            # Por plantilla de ruta, no por URL: cardinalidad acotada
+            labels = (scope["method"], route_template(scope))
+            requests_total.inc(*labels, str(status))
+            request_duration.observe(elapsed, *labels)
+            response_size.observe(size, *labels)
+            request_statements.observe(sql[0], *labels)
+            request_db_time.observe(sql[1], *labels)
+
+def render(pools: dict) -> str:
+    # Llamar desde el bucle de eventos: el limitador del threadpool es de anyio
+    limiter = anyio.to_thread.current_default_thread_limiter().statistics()
+    threadpool.set(limiter.borrowed_tokens, "busy")
+    threadpool.set(limiter.total_tokens, "limit")
+    threadpool.set(limiter.tasks_waiting, "waiting")
+
+    # `pools` es database.pool_status()
+    for name, stats in pools.items():
+        for state in ("checked_out", "checked_in", "overflow", "size"):
+            if state in stats:
+                db_pool.set(stats[state], name, state)
+        if "checkouts" in stats:
+            db_pool_checkouts.set(stats["checkouts"], name)
+            db_pool_wait.set(stats["wait_seconds_total"], name)
+            db_pool_failures.set(stats["checkout_failures"], name)
+    return registry.render()
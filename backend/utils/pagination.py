@@ -0,0 +1,81 @@
+# utils/pagination.py
+# Paginación por cursor (keyset): cada página continúa a partir de la clave
+# de la última fila devuelta, de modo que la base de datos hace un range scan
+# sobre el índice en lugar de recorrer y descartar `skip` filas.
+import base64
+import json
+import os
+from datetime import datetime
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, type_coerce
+from sqlalchemy.types import NullType
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+def page_size(limit: int) -> int:
+    # Límite duro en el servidor, sin importar lo que pida el cliente
+    return max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+def encode_cursor(values) -> str:
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (ValueError, TypeError, KeyError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+def _bind(value):
+    # Las fechas viajan tal cual al driver: así se comparan con el mismo
+    # formato con que el servidor las guardó (en SQLite, CURRENT_TIMESTAMP
+    # no lleva microsegundos y el tipo DateTime de SQLAlchemy sí los añade)
+    if isinstance(value, datetime):
+        return type_coerce(value, NullType())
+    return value
+
+def _after(columns, values, descending: bool):
+    # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y), expandido para que
+    # MySQL lo resuelva como rango sobre el índice compuesto
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == _bind(values[j]) for j in range(i)]
+        value = _bind(values[i])
+        step = column < value if descending else column > value
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+def keyset(query, columns, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, descending: bool = False):
+    """Aplica filtro, orden y límite de keyset a un select() o Query.
+
+    Se pide una fila de más para saber si existe una página siguiente.
+    """
+    if cursor:
+        query = query.where(_after(columns, decode_cursor(cursor, len(columns)), descending))
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return query.order_by(*order).limit(page_size(limit) + 1)
+
+def make_page(rows, key, limit: int = DEFAULT_PAGE_SIZE, transform=None) -> dict:
+    # `key` devuelve la tupla de la clave keyset de una fila
+    size = page_size(limit)
+    items = list(rows[:size])
+    next_cursor = encode_cursor(key(items[-1])) if len(rows) > size else None
+    if transform is not None:
+        items = [transform(item) for item in items]
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,104 @@
+# utils/passwords.py
+# Hash y verificación bcrypt en un pool de procesos dedicado y limitado, para
+# que el login no ocupe los hilos del servidor y use varios núcleos a la vez.
+# Este módulo se importa también en los procesos hijos: no debe importar la
+# base de datos ni la aplicación.
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.hash import bcrypt
+
+# Tamaño del pool; 0 ejecuta bcrypt en el threadpool del servidor (sin procesos)
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+# Duración objetivo de un hash; la calibración elige el coste que más se acerca
+BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "16"))
+# Fija el coste y omite la calibración
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS")
+
+_CALIBRATION_ROUNDS = 8
+
+_executor: Optional[ProcessPoolExecutor] = None
+_rounds: Optional[int] = None
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.using(rounds=rounds).hash(password)
+
+def _verify(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    # Devuelve (válida, nuevo hash si el coste guardado es menor que el actual)
+    if not bcrypt.verify(password, hashed):
+        return False, None
+    if stored_rounds(hashed) < rounds:
+        return True, _hash(password, rounds)
+    return True, None
+
+def stored_rounds(hashed: str) -> int:
+    # $2b$12$<salt+hash>
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+def calibrate(target_ms: float = BCRYPT_TARGET_MS, samples: int = 3) -> int:
+    # Cada ronda adicional duplica el coste: se mide un coste bajo y se extrapola
+    elapsed = min(_timed_hash(_CALIBRATION_ROUNDS) for _ in range(samples))
+    rounds = _CALIBRATION_ROUNDS + round(math.log2(max(target_ms / 1000 / elapsed, 1e-9)))
+    return max(BCRYPT_MIN_ROUNDS, min(BCRYPT_MAX_ROUNDS, rounds))
+
+def _timed_hash(rounds: int) -> float:
+    start = time.perf_counter()
+    _hash("calibration-password", rounds)
+    return time.perf_counter() - start
+
+def start(pool_size: int = None) -> int:
+    # Calibra el coste y arranca los procesos; se llama al iniciar la aplicación
+    global _executor, _rounds
+    if _rounds is None:
+        _rounds = int(BCRYPT_ROUNDS) if BCRYPT_ROUNDS else calibrate()
+    pool_size = PASSWORD_POOL_SIZE if pool_size is None else pool_size
+    if _executor is None and pool_size > 0:
+        # spawn: los hijos no heredan hilos ni conexiones del servidor
+        _executor = ProcessPoolExecutor(
+            max_workers=pool_size,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        # Arranca los procesos ahora y no en el primer login
+        for future in [_executor.submit(stored_rounds, "") for _ in range(pool_size)]:
+            future.result()
+    return _rounds
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+def current_rounds() -> int:
+    if _rounds is None:
+        start()
+    return _rounds
+
+async def _run(fn, *args):
+    rounds = current_rounds()
+    if _executor is None:
+        return await asyncio.to_thread(fn, *args, rounds)
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args, rounds)
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+async def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await _run(_verify, password, hashed)
+
+def stats() -> dict:
+    return {
+        "pool_size": _executor._max_workers if _executor is not None else 0,
+        "rounds": _rounds,
+        "target_ms": BCRYPT_TARGET_MS,
+    }
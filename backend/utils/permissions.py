@@ -0,0 +1,147 @@
+# utils/permissions.py
+# "¿Puede el usuario U hacer X en el proyecto P?" con una sola consulta sobre
+# el índice único idx_user_project, cacheada por proceso como
+# (user_id, project_id) -> (rol, activo). Las escrituras de membresías
+# invalidan el proyecto tras el commit, también en los demás workers
+# (utils/bus.py); el TTL acota cuánto tarda en verse un cambio hecho fuera
+# del lanzador, como en la caché de respuestas.
+import os
+import time
+from collections import namedtuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import exists, select
+
+import models
+from utils import replica
+from utils.bus import shared
+from utils.cache import TTLCache
+
+MEMBERSHIP_CACHE_SIZE = int(os.getenv("MEMBERSHIP_CACHE_SIZE", "10000"))
+MEMBERSHIP_CACHE_TTL = float(os.getenv("MEMBERSHIP_CACHE_TTL", "60"))
+
+membership_cache = TTLCache(maxsize=MEMBERSHIP_CACHE_SIZE, ttl=MEMBERSHIP_CACHE_TTL)
+
+# role es None si el usuario no es miembro; también se cachea
+Access = namedtuple("Access", "role is_active")
+NO_ACCESS = Access(None, False)
+
+Role = models.MembershipRole
+
+# Roles que pueden realizar cada acción (siempre con la membresía activa)
+PERMISSIONS = {
+    "read": {Role.OWNER, Role.MEMBER, Role.VIEWER},
+    "comment": {Role.OWNER, Role.MEMBER, Role.VIEWER},
+    "write": {Role.OWNER, Role.MEMBER},
+    "manage": {Role.OWNER},
+}
+
+# Una consulta que empezó antes de invalidar no guarda su resultado, ni una
+# hecha en una réplica que aún no refleja la invalidación
+_generations = {}
+_epoch = 0
+_invalidated_at = {}
+_epoch_at = 0.0
+
+def _generation(project_id: int):
+    return _epoch, _generations.get(project_id, 0)
+
+def _fresh(project_id: int) -> bool:
+    return not replica.behind(max(_invalidated_at.get(project_id, 0.0), _epoch_at))
+
+def _tags(user_id: int, project_id: int):
+    return (f"project:{project_id}", f"user:{user_id}")
+
+async def resolve(db, user_id: int, project_id: int) -> Access:
+    key = (user_id, project_id)
+    access = membership_cache.get(key)
+    if access is None:
+        generation = _generation(project_id)
+        row = (await db.execute(
+            select(models.Membership.role, models.Membership.is_active).where(
+                models.Membership.user_id == user_id,
+                models.Membership.project_id == project_id,
+            )
+        )).first()
+        access = Access(row.role, bool(row.is_active)) if row is not None else NO_ACCESS
+        if _generation(project_id) == generation and _fresh(project_id):
+            membership_cache.set(key, access, tags=_tags(user_id, project_id))
+    return access
+
+async def resolve_many(db, user_id: int, project_ids) -> dict:
+    # Como resolve para varios proyectos (operaciones masivas): los que no
+    # están en caché, en una sola consulta sobre idx_user_project
+    accesses, missing = {}, []
+    for project_id in set(project_ids):
+        access = membership_cache.get((user_id, project_id))
+        if access is None:
+            missing.append(project_id)
+        else:
+            accesses[project_id] = access
+    if missing:
+        generations = {project_id: _generation(project_id) for project_id in missing}
+        rows = {row.project_id: row for row in await db.execute(
+            select(models.Membership.project_id, models.Membership.role, models.Membership.is_active).where(
+                models.Membership.user_id == user_id,
+                models.Membership.project_id.in_(missing),
+            )
+        )}
+        for project_id in missing:
+            row = rows.get(project_id)
+            access = Access(row.role, bool(row.is_active)) if row is not None else NO_ACCESS
+            if _generation(project_id) == generations[project_id] and _fresh(project_id):
+                membership_cache.set((user_id, project_id), access, tags=_tags(user_id, project_id))
+            accesses[project_id] = access
+    return accesses
+
+def allows(access: Access, action: str) -> bool:
+    return access.is_active and access.role in PERMISSIONS[action]
+
+async def can(db, user_id: int, project_id: int, action: str) -> bool:
+    return allows(await resolve(db, user_id, project_id), action)
+
+async def require(db, user_id: int, project_id: int, action: str,
+                  detail: str = "Not allowed in this project") -> Access:
+    """Devuelve el acceso o lanza 404 (proyecto/usuario) o 403.
+
+    En el caso habitual es una consulta como máximo (ninguna si está en caché):
+    una membresía implica que el proyecto y el usuario existen. Sólo al denegar
+    se comprueba con otra consulta qué falta, para conservar los 404.
+    """
+    access = await resolve(db, user_id, project_id)
+    if allows(access, action):
+        return access
+
+    project_exists, user_exists = (await db.execute(select(
+        exists().where(models.Project.project_id == project_id),
+        exists().where(models.User.user_id == user_id),
+    ))).one()
+    if not project_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    if not user_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=detail
+    )
+
+@shared
+def invalidate_project(project_id: int):
+    # Llamar tras el commit de cualquier escritura de membresías del proyecto
+    _generations[project_id] = _generations.get(project_id, 0) + 1
+    _invalidated_at[project_id] = time.time()
+    membership_cache.invalidate_tag(f"project:{project_id}")
+
+@shared
+def invalidate_user(user_id: int):
+    # Al eliminar un usuario: sus entradas están repartidas entre proyectos
+    global _epoch, _epoch_at
+    _epoch += 1
+    _epoch_at = time.time()
+    membership_cache.invalidate_tag(f"user:{user_id}")
@@ -0,0 +1,185 @@
+# utils/profiler.py
+# Perfilador de SQL con los eventos del engine, pensado para dejarlo activo en
+# producción. Registra las sentencias que superan PROFILER_SLOW_MS con la ruta
+# que las originó. En una muestra de las peticiones (PROFILER_SAMPLE_RATE)
+# agrupa además las sentencias por forma: la misma consulta repetida muchas
+# veces en una petición es la firma de un N+1 (una relación lazy recorrida en
+# un bucle). De cada petición muestreada queda un informe. Se ajusta en
+# caliente con PUT /profiler; desactivado, quita sus eventos de los engines.
+import logging
+import os
+import random
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from utils.db_pool import _env_bool
+from utils.metrics import route_template
+
+logger = logging.getLogger("profiler")
+
+class Settings:
+    def __init__(self):
+        self.enabled = _env_bool("PROFILER_ENABLED", True)
+        self.sample_rate = float(os.getenv("PROFILER_SAMPLE_RATE", "0.01"))
+        self.slow_ms = float(os.getenv("PROFILER_SLOW_MS", "100"))
+        # Repeticiones de una misma forma en una petición para señalar un N+1
+        self.n_plus_one = int(os.getenv("PROFILER_N_PLUS_ONE", "5"))
+
+    def dict(self) -> dict:
+        return dict(vars(self))
+
+settings = Settings()
+reports = deque(maxlen=int(os.getenv("PROFILER_REPORTS", "100")))
+slow_statements = deque(maxlen=reports.maxlen)
+counters = {"sampled": 0, "slow": 0, "n_plus_one": 0}
+
+_engines = []
+_attached = False
+
+# Listas de parámetros de un IN expandido o de un VALUES multifila: la forma
+# no depende de cuántos elementos lleven
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))+\s*\)")
+
+def shape(statement: str) -> str:
+    return _PARAM_LIST.sub("(...)", " ".join(statement.split()))
+
+class RequestProfile:
+    __slots__ = ("scope", "statements", "slow")
+
+    def __init__(self, scope, sampled: bool):
+        self.scope = scope
+        # Sólo en las muestreadas: sentencia -> [veces, segundos]
+        self.statements = {} if sampled else None
+        self.slow = []
+
+    def origin(self) -> str:
+        return f"{self.scope['method']} {route_template(self.scope)}"
+
+_current = ContextVar("profiler_request", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._profiler_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_profiler_start", None)
+    if start is None:  # eventos enganchados a mitad de la sentencia
+        return
+    elapsed = time.perf_counter() - start
+    profile = _current.get()
+    if elapsed * 1000 >= settings.slow_ms:
+        origin = profile.origin() if profile is not None else "-"
+        counters["slow"] += 1
+        entry = {"origin": origin, "ms": round(elapsed * 1000, 3), "statement": statement}
+        slow_statements.append(entry)
+        if profile is not None:
+            profile.slow.append(entry)
+        logger.warning("Slow statement (%.1f ms) in %s: %s", elapsed * 1000, origin, statement)
+    if profile is not None and profile.statements is not None:
+        entry = profile.statements.get(statement)
+        if entry is None:
+            profile.statements[statement] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+def _attach(attach: bool):
+    global _attached
+    if attach == _attached:
+        return
+    toggle = event.listen if attach else event.remove
+    for engine in _engines:
+        toggle(engine, "before_cursor_execute", _before_cursor_execute)
+        toggle(engine, "after_cursor_execute", _after_cursor_execute)
+    _attached = attach
+
+def register_engine(engine):
+    # Para el engine asíncrono se pasa async_engine.sync_engine
+    if engine in _engines:
+        return
+    if _attached:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _engines.append(engine)
+    _attach(settings.enabled)
+
+def configure(**changes):
+    # Cambios en caliente (PUT /profiler); None deja el valor actual
+    for name, value in changes.items():
+        if value is not None:
+            setattr(settings, name, value)
+    _attach(settings.enabled)
+
+def _report(profile: RequestProfile, status: int, elapsed: float):
+    by_shape = {}
+    for statement, (count, seconds) in profile.statements.items():
+        entry = by_shape.setdefault(shape(statement), [0, 0.0])
+        entry[0] += count
+        entry[1] += seconds
+    repeated = sorted(
+        ({"statement": statement, "count": count, "ms": round(seconds * 1000, 3)}
+         for statement, (count, seconds) in by_shape.items() if count >= settings.n_plus_one),
+        key=lambda entry: -entry["count"],
+    )
+    origin = profile.origin()
+    report = {
+        "origin": origin,
+        "status": status,
+        "ms": round(elapsed * 1000, 3),
+        "statements": sum(count for count, _ in by_shape.values()),
+        "db_ms": round(sum(seconds for _, seconds in by_shape.values()) * 1000, 3),
+        "slow": profile.slow,
+        "n_plus_one": repeated,
+    }
+    reports.append(report)
+    counters["sampled"] += 1
+    if repeated:
+        counters["n_plus_one"] += 1
+        for entry in repeated:
+            logger.warning("Possible N+1 in %s: %d x %s", origin, entry["count"], entry["statement"])
+    logger.info("%s %d in %.1f ms: %d statements, %.1f ms in the database",
+                origin, status, report["ms"], report["statements"], report["db_ms"])
+
+class ProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.enabled:
+            return await self.app(scope, receive, send)
+
+        sampled = random.random() < settings.sample_rate
+        profile = RequestProfile(scope, sampled)
+        token = _current.set(profile)
+        if not sampled:
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                _current.reset(token)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            _report(profile, status, time.perf_counter() - start)
+
+def stats() -> dict:
+    # Más recientes primero
+    return {
+        "settings": settings.dict(),
+        **counters,
+        "slow_statements": list(reversed(slow_statements)),
+        "reports": list(reversed(reports)),
+    }
@@ -0,0 +1,137 @@
+# utils/replica.py
+# Enrutado de lecturas a una réplica (REPLICA_DATABASE_URL). Los GET van a la
+# réplica y el resto al primario, salvo:
+# - lectura de lo propio: tras escribir, un cliente (su token) sigue leyendo
+#   del primario hasta que la réplica alcanza su escritura, como mucho
+#   REPLICA_STICKY_SECONDS
+# - retraso: si la réplica va más de REPLICA_MAX_LAG_SECONDS por detrás, o
+#   no responde, todo va al primario hasta que se recupere
+# El retraso se mide con un latido: una fila que se actualiza en el primario
+# y se lee en la réplica. Las cachés no guardan lo leído de una réplica que
+# aún no refleja su última invalidación (behind()).
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import BigInteger, Column, Integer, MetaData, Table, select, update
+
+from utils.cache import TTLCache
+from utils.bus import shared
+
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "2"))
+REPLICA_HEARTBEAT_SECONDS = float(os.getenv("REPLICA_HEARTBEAT_SECONDS", "0.5"))
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+heartbeat = Table(
+    "replica_heartbeat",
+    MetaData(),
+    Column("heartbeat_id", Integer, primary_key=True, autoincrement=False),
+    Column("beat_ms", BigInteger, nullable=False, server_default="0"),
+)
+
+# True mientras la petición en curso lee de la réplica
+_on_replica = ContextVar("on_replica", default=False)
+
+def client_key(connection) -> str:
+    # Firma del token (cabecera o ?access_token=); sin token, la IP
+    authorization = connection.headers.get("authorization", "")
+    token = authorization[7:] if authorization[:7].lower() == "bearer " else connection.query_params.get("access_token")
+    if token:
+        return token.rsplit(".", 1)[-1]
+    return connection.client.host if connection.client else ""
+
+class ReplicaRouter:
+    def __init__(self):
+        self.configured = False
+        # Instante del primario (time.time()) que la réplica ya refleja
+        self.replica_time = None
+        self.lag = None
+        self.error = None
+        # Cliente -> instante de su última escritura
+        self.writes = TTLCache(maxsize=100000, ttl=REPLICA_STICKY_SECONDS)
+        self.reads = {"replica": 0, "primary_sticky": 0, "primary_lag": 0}
+
+    def available(self) -> bool:
+        return self.lag is not None and self.lag <= REPLICA_MAX_LAG_SECONDS
+
+    def use_replica(self, connection) -> bool:
+        if not self.configured or connection.scope.get("method") not in READ_METHODS:
+            return False
+        written_at = self.writes.get(client_key(connection))
+        if written_at is not None and not self.caught_up(written_at):
+            self.reads["primary_sticky"] += 1
+            return False
+        if not self.available():
+            self.reads["primary_lag"] += 1
+            return False
+        self.reads["replica"] += 1
+        return True
+
+    def record_write(self, connection):
+        if self.configured:
+            remember_write(client_key(connection), time.time())
+
+    def caught_up(self, written_at: float) -> bool:
+        return self.replica_time is not None and self.replica_time > written_at
+
+    def observe(self, beat_ms: int):
+        self.replica_time = beat_ms / 1000
+        self.lag = max(time.time() - self.replica_time, 0.0)
+        self.error = None
+
+    def stats(self) -> dict:
+        return {
+            "configured": self.configured,
+            "available": self.configured and self.available(),
+            "lag_seconds": None if self.lag is None else round(self.lag, 3),
+            "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+            "sticky_seconds": REPLICA_STICKY_SECONDS,
+            "error": self.error,
+            "reads": dict(self.reads),
+            "sticky_clients": len(self.writes),
+        }
+
+router = ReplicaRouter()
+
+@shared
+def remember_write(client: str, written_at: float):
+    # También en los demás workers: la siguiente lectura del cliente puede
+    # llegar a cualquiera
+    if router.configured:
+        router.writes.set(client, written_at)
+
+def mark_request(use_replica: bool):
+    # Lo llama la dependencia de sesión; devuelve el token para unmark_request()
+    return _on_replica.set(use_replica)
+
+def unmark_request(token):
+    _on_replica.reset(token)
+
+def behind(written_at: float) -> bool:
+    """True si la petición lee de la réplica y ésta aún no refleja `written_at`.
+
+    Para las cachés: lo leído así no se guarda, porque podría ser anterior a
+    la escritura que invalidó la entrada.
+    """
+    return _on_replica.get() and not router.caught_up(written_at)
+
+async def monitor(primary, replica):
+    # Bucle del lifespan: late en el primario y lee el latido en la réplica
+    while True:
+        try:
+            async with primary.begin() as conn:
+                await conn.execute(update(heartbeat).values(beat_ms=int(time.time() * 1000)))
+            async with replica.connect() as conn:
+                beat_ms = (await conn.execute(select(heartbeat.c.beat_ms))).scalar()
+            router.observe(beat_ms or 0)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            # Réplica caída o sin la tabla: todo al primario. Del error, la
+            # primera línea (SQLAlchemy añade la sentencia y un enlace)
+            message = str(exc).partition("\n")[0]
+            router.lag, router.error = None, f"{type(exc).__name__}: {message}"
+        await asyncio.sleep(REPLICA_HEARTBEAT_SECONDS)
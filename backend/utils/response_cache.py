@@ -0,0 +1,91 @@
+# utils/response_cache.py
+# Caché de respuestas GET en memoria del proceso, por ruta y parámetros.
+# Cada entrada lleva la etiqueta de su proyecto y los handlers de escritura
+# la invalidan tras el commit. La caché es de cada proceso; con el lanzador
+# de utils/server.py las invalidaciones llegan también a los demás workers
+# (utils/bus.py).
+import functools
+import os
+import time
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from utils import replica
+from utils.bus import shared
+from utils.cache import TTLCache
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Se guarda el JSON ya serializado: su tamaño es la métrica de memoria
+response_cache = TTLCache(
+    maxsize=RESPONSE_CACHE_SIZE,
+    ttl=RESPONSE_CACHE_TTL,
+    sizeof=len,
+    maxbytes=RESPONSE_CACHE_MAX_BYTES,
+)
+
+# Contador de invalidaciones por etiqueta. Una lectura que empezó antes de
+# una escritura no guarda su resultado aunque termine después de invalidar.
+# Tampoco lo guarda si leyó de una réplica que aún no refleja la última
+# invalidación (de ahí los instantes).
+_generations = {}
+_epoch = 0
+_invalidated_at = {}
+_epoch_at = 0.0
+
+_PARAM_TYPES = (str, int, float, bool, type(None))
+
+def _generation(tag: str):
+    return _epoch, _generations.get(tag, 0)
+
+def _fresh(tag: str) -> bool:
+    return not replica.behind(max(_invalidated_at.get(tag, 0.0), _epoch_at))
+
+def project_tag(project_id: int) -> str:
+    return f"project:{project_id}"
+
+@shared
+def invalidate_project(project_id: int):
+    tag = project_tag(project_id)
+    _generations[tag] = _generations.get(tag, 0) + 1
+    _invalidated_at[tag] = time.time()
+    response_cache.invalidate_tag(tag)
+
+@shared
+def invalidate_all():
+    # Para escrituras que afectan a muchos proyectos (p. ej. datos de usuario)
+    global _epoch, _epoch_at
+    _epoch += 1
+    _epoch_at = time.time()
+    response_cache.clear()
+
+def cached_response(response_model, tag=project_tag, param: str = "project_id"):
+    # Decora un GET async: la clave son el endpoint y sus parámetros simples
+    # (ruta y query); la etiqueta se calcula con el parámetro `param`
+    adapter = TypeAdapter(response_model)
+
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            params = tuple(sorted(
+                (name, value) for name, value in kwargs.items() if isinstance(value, _PARAM_TYPES)
+            ))
+            key = (endpoint.__module__, endpoint.__name__, params)
+            body = response_cache.get(key)
+            if body is None:
+                entry_tag = tag(kwargs[param])
+                generation = _generation(entry_tag)
+                result = await endpoint(**kwargs)
+                if isinstance(result, Response):
+                    # Camino rápido (utils/serialization.py): ya es el JSON final
+                    body = result.body
+                else:
+                    body = adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+                if _generation(entry_tag) == generation and _fresh(entry_tag):
+                    response_cache.set(key, body, tags=(entry_tag,))
+            return Response(content=body, media_type="application/json")
+        return wrapper
+    return decorator
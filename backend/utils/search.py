@@ -0,0 +1,185 @@
+# utils/search.py
+# Búsqueda de texto completo sobre tareas, comentarios y proyectos.
+#
+# Un único índice `search_documents` con un documento por objeto. El doc_id
+# se deriva del objeto (object_id * 4 + tipo), así que indexar es un upsert
+# por id calculado en SQL a partir de las filas de origen, dentro de la
+# misma transacción que la escritura. Dos backends según el dialecto:
+#   - MySQL: tabla InnoDB con índice FULLTEXT(title, body)
+#   - SQLite: tabla virtual FTS5 (rowid = doc_id), para desarrollo y pruebas
+# La tabla se crea y se rellena en la migración v0003
+import re
+
+from sqlalchemy import (BigInteger, Column, Index, Integer, MetaData, String, Table, Text,
+                        delete, func, insert, literal, literal_column, select)
+from sqlalchemy.dialects import mysql
+
+import models
+from utils.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+
+KINDS = {"task": 1, "comment": 2, "project": 3}
+
+COLUMNS = ["doc_id", "kind", "object_id", "project_id", "title", "body"]
+
+_metadata = MetaData()
+
+# MySQL: tabla normal con índice FULLTEXT
+mysql_documents = Table(
+    "search_documents",
+    _metadata,
+    Column("doc_id", BigInteger, primary_key=True, autoincrement=False),
+    Column("kind", String(10), nullable=False),
+    Column("object_id", Integer, nullable=False),
+    Column("project_id", Integer, nullable=False, index=True),
+    Column("title", String(255), nullable=False, default=""),
+    Column("body", Text, nullable=False),
+    Index("ft_search_documents", "title", "body", mysql_prefix="FULLTEXT"),
+    mysql_engine="InnoDB",
+)
+
+# SQLite: la tabla virtual FTS5 expone el doc_id como rowid
+fts5_documents = Table(
+    "search_documents",
+    MetaData(),
+    Column("rowid", Integer, key="doc_id", primary_key=True),
+    Column("title", Text),
+    Column("body", Text),
+    Column("kind", Text),
+    Column("object_id", Integer),
+    Column("project_id", Integer),
+)
+
+def _sources():
+    # Filas de origen de cada tipo con el doc_id ya calculado
+    task, comment, project = models.Task, models.Comment, models.Project
+    return {
+        "task": (task.task_id, select(
+            task.task_id * 4 + KINDS["task"], literal("task"), task.task_id,
+            task.project_id, task.title, task.description,
+        )),
+        "comment": (comment.comment_id, select(
+            comment.comment_id * 4 + KINDS["comment"], literal("comment"), comment.comment_id,
+            comment.project_id, literal(""), comment.content,
+        )),
+        "project": (project.project_id, select(
+            project.project_id * 4 + KINDS["project"], literal("project"), project.project_id,
+            project.project_id, project.title, project.description,
+        )),
+    }
+
+class SQLiteFTS5Backend:
+    table = fts5_documents
+
+    def match(self, terms):
+        # Cada término entre comillas (sin operadores): AND implícito
+        query = " ".join(f'"{term.rstrip("*")}"' + ("*" if term.endswith("*") else "") for term in terms)
+        return literal_column("search_documents").op("MATCH")(query)
+
+    def score(self, terms):
+        # bm25 es menor cuanto más relevante; el título pesa el doble
+        return -func.bm25(literal_column("search_documents"), 2.0, 1.0)
+
+    def snippet(self):
+        return func.snippet(literal_column("search_documents"), 1, "", "", "…", 16)
+
+    async def upsert(self, db, source_query):
+        # FTS5 no admite ON CONFLICT: se borra y se vuelve a insertar
+        doc_ids = source_query.with_only_columns(source_query.selected_columns[0])
+        await db.execute(delete(self.table).where(self.table.c.doc_id.in_(doc_ids)))
+        await db.execute(insert(self.table).from_select(COLUMNS, source_query))
+
+class MySQLFullTextBackend:
+    table = mysql_documents
+
+    def match(self, terms):
+        # Modo booleano: todos los términos obligatorios
+        query = " ".join(f"+{term}" for term in terms)
+        return mysql.match(self.table.c.title, self.table.c.body, against=query).in_boolean_mode()
+
+    def score(self, terms):
+        # La relevancia de MATCH ... AGAINST
+        return self.match(terms)
+
+    def snippet(self):
+        return func.left(self.table.c.body, 160)
+
+    async def upsert(self, db, source_query):
+        stmt = mysql.insert(self.table).from_select(COLUMNS, source_query)
+        await db.execute(stmt.on_duplicate_key_update(
+            project_id=stmt.inserted.project_id,
+            title=stmt.inserted.title,
+            body=stmt.inserted.body,
+        ))
+
+def backend_for(dialect_name: str):
+    if dialect_name == "mysql":
+        return MySQLFullTextBackend()
+    if dialect_name == "sqlite":
+        return SQLiteFTS5Backend()
+    raise NotImplementedError(f"Full-text search not supported on {dialect_name}")
+
+def _backend(db):
+    return backend_for(db.get_bind().dialect.name)
+
+def terms(query: str) -> list:
+    # Sólo palabras, con `*` final opcional para buscar por prefijo (explícito:
+    # expandir cada término por defecto dispara la latencia con 1M de documentos).
+    # El resto de la sintaxis de cada motor no se expone al usuario
+    return re.findall(r"\w+\*?", query.lower())[:10]
+
+# --- Mantenimiento incremental (llamar antes del commit de cada escritura) ---
+
+async def reindex(db, kind: str, condition):
+    """Indexa (o reindexa) los objetos de `kind` que cumplen `condition`."""
+    # La sesión no hace autoflush: el SELECT de origen debe ver los cambios
+    await db.flush()
+    _, source = _sources()[kind]
+    await _backend(db).upsert(db, source.where(condition))
+
+async def reindex_ids(db, kind: str, object_ids):
+    object_ids = list(object_ids)
+    if object_ids:
+        key, _ = _sources()[kind]
+        await reindex(db, kind, key.in_(object_ids))
+
+async def remove(db, kind: str, object_ids):
+    doc_ids = [object_id * 4 + KINDS[kind] for object_id in object_ids]
+    if doc_ids:
+        table = _backend(db).table
+        await db.execute(delete(table).where(table.c.doc_id.in_(doc_ids)))
+
+async def remove_project(db, project_id: int):
+    # El proyecto y, en cascada, sus tareas y comentarios
+    table = _backend(db).table
+    await db.execute(delete(table).where(table.c.project_id == project_id))
+
+# --- Consulta ---
+
+async def search(db, user_id: int, query: str, kinds=None, project_id: int = None,
+                 cursor: str = None, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+    backend = _backend(db)
+    words = terms(query)
+    if not words:
+        return {"items": [], "next_cursor": None}
+
+    table = backend.table
+    score = backend.score(words).label("score")
+    # Sólo proyectos de los que el usuario es miembro activo
+    member_projects = select(models.Membership.project_id).where(
+        models.Membership.user_id == user_id,
+        models.Membership.is_active.is_(True),
+    )
+    stmt = select(
+        table.c.doc_id, table.c.kind, table.c.object_id, table.c.project_id,
+        table.c.title, backend.snippet().label("snippet"), score,
+    ).where(
+        backend.match(words),
+        table.c.project_id.in_(member_projects),
+    )
+    if kinds:
+        stmt = stmt.where(table.c.kind.in_(kinds))
+    if project_id is not None:
+        stmt = stmt.where(table.c.project_id == project_id)
+
+    rows = (await db.execute(keyset(stmt, [score, table.c.doc_id], cursor, limit, descending=True))).all()
+    return make_page(rows, lambda r: (r.score, r.doc_id), limit, lambda r: r._asdict())
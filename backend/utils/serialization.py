@@ -0,0 +1,71 @@
+# utils/serialization.py
+# Camino rápido para los listados: se seleccionan sólo las columnas del
+# esquema como tuplas (sin objetos ORM ni identity map), la salida no se
+# vuelve a validar contra response_model porque viene de la base de datos con
+# la forma del esquema, y se codifica con orjson. El JSON es el mismo que
+# produce pydantic (ver benchmarks/bench_serialization.py).
+import json
+from datetime import datetime
+from enum import Enum
+
+from fastapi import Response
+from sqlalchemy import select
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: pip install orjson
+    orjson = None
+
+def _default(value):
+    # Sólo para el json de la stdlib; orjson ya trata fechas y enums
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        # pydantic escribe UTC como "Z"
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+def json_response(content, status_code: int = 200) -> Response:
+    # FastAPI devuelve tal cual una Response: response_model queda sólo para
+    # la documentación y no se valida la salida otra vez
+    return Response(content=dumps(content), status_code=status_code, media_type="application/json")
+
+class RowSerializer:
+    """Columnas y transformación fila -> dict para un esquema de listado.
+
+    Cada campo de `schema` sale de la columna homónima de `model`, de la
+    indicada en `sources` (p. ej. una de un join) o, si allí es None, de una
+    constante común a todas las filas que se pasa a transform(). `extra` son
+    columnas que hacen falta en la consulta pero no en la salida (la clave
+    keyset): van al final de la fila y zip() las descarta.
+    """
+
+    def __init__(self, model, schema, extra=(), **sources):
+        self.fields, self.constants, self.columns = [], [], []
+        for name in schema.model_fields:
+            column = sources[name] if name in sources else getattr(model, name)
+            if column is None:
+                self.constants.append(name)
+            else:
+                self.fields.append(name)
+                self.columns.append(column.label(name))
+        self.columns.extend(column for column in extra if column.key not in self.fields)
+
+    def select(self):
+        return select(*self.columns)
+
+    def transform(self, **constants):
+        # Para make_page(..., transform=)
+        missing = set(self.constants) - set(constants)
+        if missing:
+            raise TypeError(f"Missing constant fields: {sorted(missing)}")
+        fields = self.fields
+        if constants:
+            return lambda row: {**dict(zip(fields, row)), **constants}
+        return lambda row: dict(zip(fields, row))
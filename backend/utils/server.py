@@ -0,0 +1,393 @@
+# utils/server.py
+# Lanzador de producción (python main.py). Un proceso maestro abre el socket
+# y arranca SERVER_WORKERS workers uvicorn que aceptan conexiones de ese mismo
+# socket; el maestro no atiende peticiones, sólo vigila a los workers:
+# - reciclado: un worker que supera SERVER_MAX_REQUESTS peticiones o
+#   SERVER_MAX_MEMORY_MB de memoria residente pide el relevo; el maestro
+#   arranca su sustituto, espera a que esté listo y sólo entonces le para
+# - SIGHUP: reinicio escalonado de todos los workers, uno a uno y con el mismo
+#   relevo, así que siempre hay workers aceptando. Los workers se arrancan
+#   con spawn (un intérprete nuevo), de modo que cargan el código desplegado
+# - SIGTERM / SIGINT: parada ordenada; cada worker deja de aceptar, pide a
+#   sus clientes keep-alive que cierren (SERVER_DRAIN_SECONDS) y termina sus
+#   peticiones en curso durante SERVER_GRACEFUL_TIMEOUT segundos como mucho
+# - un worker que muere se sustituye; si no llega a arrancar ninguno, el
+#   maestro termina con error
+# - canal (utils/bus.py): lo que un worker envía (invalidaciones de caché,
+#   eventos, escrituras recientes) el maestro lo reenvía a los demás y, cuando
+#   todos los listos lo han aplicado, se lo confirma al que lo envió
+# Las métricas son de cada worker.
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from multiprocessing.connection import wait
+
+import uvicorn
+
+from utils.bus import WaitForPeers, bus
+
+def _default_workers() -> int:
+    # CPUs que puede usar el proceso (en un contenedor pueden ser menos)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0")) or _default_workers()
+# 0 desactiva cada límite de reciclado
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+# Margen aleatorio sobre SERVER_MAX_REQUESTS para que no se reciclen todos a la vez
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", str(SERVER_MAX_REQUESTS // 10)))
+SERVER_MAX_MEMORY_MB = float(os.getenv("SERVER_MAX_MEMORY_MB", "0"))
+SERVER_GRACEFUL_TIMEOUT = float(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+# Al parar un worker: segundos en los que responde con Connection: close antes
+# de cortar las conexiones keep-alive inactivas (el keep-alive de uvicorn es 5)
+SERVER_DRAIN_SECONDS = float(os.getenv("SERVER_DRAIN_SECONDS", "5"))
+# Tiempo máximo para que un worker nuevo termine su lifespan
+SERVER_BOOT_TIMEOUT = float(os.getenv("SERVER_BOOT_TIMEOUT", "60"))
+
+logger = logging.getLogger("server")
+
+def _rss_bytes() -> int:
+    # Memoria residente actual (Linux); en otros sistemas, el pico
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class WorkerServer(uvicorn.Server):
+    """Servidor uvicorn de un worker: avisa al maestro al estar listo y al
+    superar sus límites, y sigue atendiendo hasta que el maestro le pare."""
+
+    def __init__(self, config, channel, max_requests: int, max_memory: int):
+        super().__init__(config)
+        self.channel = channel
+        self.max_requests = max_requests
+        self.max_memory = max_memory
+        self.retiring = False
+        self.draining = False
+        self.master = os.getppid()
+
+    async def startup(self, sockets=None):
+        bus.attach(self.channel)
+        await super().startup(sockets)
+        # Si el lifespan falla, uvicorn marca should_exit y el worker no está listo
+        if not self.should_exit:
+            self.channel.send(("ready",))
+
+    async def shutdown(self, sockets=None):
+        # uvicorn cierra en el acto las conexiones keep-alive inactivas: una
+        # petición que el cliente envíe justo entonces se pierde. Antes se deja
+        # de aceptar y cada respuesta pide al cliente que cierre él
+        for server in self.servers:
+            server.close()
+        self.draining = True
+        deadline = time.monotonic() + SERVER_DRAIN_SECONDS
+        while self.server_state.connections and time.monotonic() < deadline and not self.force_exit:
+            await asyncio.sleep(0.1)
+        await super().shutdown(sockets)
+
+    async def on_tick(self, counter: int) -> bool:
+        should_exit = await super().on_tick(counter)
+        # Sin maestro (muerto con SIGKILL) nadie relevaría a este worker
+        if counter % 10 == 0 and os.getppid() != self.master:
+            logger.warning("Master process is gone, shutting down")
+            self.should_exit = True
+        # on_tick se llama cada 0,1 s; la memoria se mira una vez por segundo
+        if not self.retiring and not should_exit:
+            reason = None
+            if self.max_requests and self.server_state.total_requests >= self.max_requests:
+                reason = f"{self.server_state.total_requests} requests"
+            elif self.max_memory and counter % 10 == 0 and _rss_bytes() > self.max_memory:
+                reason = f"{_rss_bytes() // 2**20} MB resident"
+            if reason is not None:
+                self.retiring = True
+                self.channel.send(("retire", reason))
+        return should_exit
+
+class CloseWhenDraining:
+    """Añade Connection: close a las respuestas de un worker que se está parando."""
+
+    def __init__(self, app, server: WorkerServer):
+        self.app = app
+        self.server = server
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_closing(message):
+            if message["type"] == "http.response.start" and self.server.draining:
+                message = {**message, "headers": [*message.get("headers", []), (b"connection", b"close")]}
+            await send(message)
+
+        await self.app(scope, receive, send_closing)
+
+def _run_worker(app: str, sock, channel, max_requests: int, max_memory: int, log_level: str):
+    # Punto de entrada del proceso worker (spawn: importa la aplicación de cero)
+    config = uvicorn.Config(
+        app,
+        log_level=log_level,
+        timeout_graceful_shutdown=int(SERVER_GRACEFUL_TIMEOUT),
+    )
+    server = WorkerServer(config, channel, max_requests, max_memory)
+    config.load()
+    config.loaded_app = CloseWhenDraining(WaitForPeers(config.loaded_app), server)
+    server.run(sockets=[sock])
+    if not server.started:
+        sys.exit(3)
+
+class Worker:
+    __slots__ = ("process", "channel", "ready", "stop_deadline", "outbox", "sender")
+
+    def __init__(self, process, channel):
+        self.process = process
+        self.channel = channel
+        self.ready = False
+        self.stop_deadline = None  # al pararlo: momento de matarlo si sigue vivo
+        # Lo que el maestro le reenvía sale por un hilo propio: un worker
+        # ocupado que no lee su pipe no bloquea al maestro ni a los demás
+        self.outbox = queue.Queue()
+        self.sender = threading.Thread(target=self._send_outbox, name=f"worker-{process.pid}-outbox", daemon=True)
+        self.sender.start()
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def send(self, message):
+        self.outbox.put(message)
+
+    def close(self):
+        self.outbox.put(None)
+        self.sender.join(timeout=1)
+        self.channel.close()
+
+    def _send_outbox(self):
+        while (message := self.outbox.get()) is not None:
+            try:
+                self.channel.send(message)
+            except OSError:
+                return
+
+class Supervisor:
+    def __init__(self, app: str, host: str, port: int, workers: int, log_level: str = "info"):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.log_level = log_level
+        self.context = multiprocessing.get_context("spawn")
+        self.active = []    # workers que aceptan conexiones
+        self.pending = []   # arrancados que aún no han terminado su lifespan
+        self.stopping = []  # workers parados que terminan sus peticiones
+        self.retire = []    # workers que han pedido el relevo
+        self.dead = []      # workers activos que han muerto sin pararlos
+        # (pid de origen, número) -> pids de los workers que aún no lo han aplicado
+        self.unacked = {}
+        self.shutdown = False
+        self.reload = False
+        self.socket = None
+
+    def bind(self):
+        sock = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.socket = sock
+
+    def spawn(self) -> Worker:
+        channel, worker_channel = self.context.Pipe()
+        # El margen de reciclado se sortea por worker
+        max_requests = SERVER_MAX_REQUESTS
+        if max_requests and SERVER_MAX_REQUESTS_JITTER:
+            max_requests += int.from_bytes(os.urandom(4), "big") % (SERVER_MAX_REQUESTS_JITTER + 1)
+        process = self.context.Process(
+            target=_run_worker,
+            args=(self.app, self.socket, worker_channel, max_requests, int(SERVER_MAX_MEMORY_MB * 2**20),
+                  self.log_level),
+            name="server-worker",
+        )
+        process.start()
+        worker_channel.close()
+        worker = Worker(process, channel)
+        logger.info("Started worker %d", worker.pid)
+        return worker
+
+    def stop(self, worker: Worker):
+        # SIGTERM: uvicorn deja de aceptar y termina lo que tiene en curso
+        if worker in self.active:
+            self.active.remove(worker)
+        if worker.stop_deadline is None:
+            worker.stop_deadline = time.monotonic() + SERVER_DRAIN_SECONDS + SERVER_GRACEFUL_TIMEOUT + 5
+            self.stopping.append(worker)
+            if worker.process.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)
+
+    def relay(self, origin: Worker, seq: int, name: str, args: tuple):
+        # Se espera la confirmación de los workers activos; los que arrancan o
+        # se paran también lo aplican, pero no retienen la respuesta del origen
+        waiting = {worker.pid for worker in self.active if worker is not origin}
+        for worker in self.active + self.pending + self.stopping:
+            if worker is not origin:
+                worker.send(("bus", origin.pid if worker.pid in waiting else 0, seq, name, args))
+        if waiting:
+            self.unacked[(origin.pid, seq)] = waiting
+        else:
+            origin.send(("acked", seq))
+
+    def acked(self, key: tuple, pid: int):
+        waiting = self.unacked.get(key)
+        if waiting is None:
+            return
+        waiting.discard(pid)
+        if not waiting:
+            del self.unacked[key]
+            origin_pid, seq = key
+            for worker in self.active + self.pending + self.stopping:
+                if worker.pid == origin_pid:
+                    worker.send(("acked", seq))
+
+    def forget(self, worker: Worker):
+        # Un worker terminado ya no confirmará nada ni espera confirmaciones
+        for key in list(self.unacked):
+            if key[0] == worker.pid:
+                del self.unacked[key]
+            else:
+                self.acked(key, worker.pid)
+        worker.close()
+
+    def poll(self, timeout: float):
+        # Mensajes de los workers y procesos terminados
+        workers = self.active + self.pending + self.stopping
+        readable = wait([w.channel for w in workers] + [w.process.sentinel for w in workers], timeout)
+        for worker in workers:
+            if worker.channel not in readable:
+                continue
+            try:
+                while worker.channel.poll():
+                    message = worker.channel.recv()
+                    if message[0] == "bus":
+                        self.relay(worker, *message[1:])
+                    elif message[0] == "ack":
+                        self.acked((message[1], message[2]), worker.pid)
+                    elif message[0] == "ready":
+                        worker.ready = True
+                    elif message[0] == "retire" and worker in self.active and worker not in self.retire:
+                        logger.info("Worker %d asks to be recycled (%s)", worker.pid, message[1])
+                        self.retire.append(worker)
+            except (EOFError, OSError):
+                continue
+        for worker in list(self.active):
+            if not worker.process.is_alive():
+                self.active.remove(worker)
+                self.dead.append(worker)
+                self.forget(worker)
+        now = time.monotonic()
+        for worker in list(self.stopping):
+            if not worker.process.is_alive():
+                worker.process.join()
+                self.stopping.remove(worker)
+                self.forget(worker)
+            elif now > worker.stop_deadline:
+                logger.warning("Worker %d did not stop in time, killing it", worker.pid)
+                worker.process.kill()
+
+    def start(self, count: int = 1) -> bool:
+        # Arranca `count` workers a la vez y espera a su lifespan. Si alguno no
+        # llega a estar listo se paran todos y devuelve False
+        workers = [self.spawn() for _ in range(count)]
+        self.pending.extend(workers)
+        deadline = time.monotonic() + SERVER_BOOT_TIMEOUT
+        try:
+            while not all(worker.ready for worker in workers):
+                failed = [worker for worker in workers if not worker.ready and not worker.process.is_alive()]
+                if failed or time.monotonic() > deadline or self.shutdown:
+                    for worker in failed or [worker for worker in workers if not worker.ready]:
+                        logger.error("Worker %d failed to boot", worker.pid)
+                    for worker in workers:
+                        self.stop(worker)
+                    return False
+                self.poll(0.1)
+        finally:
+            for worker in workers:
+                self.pending.remove(worker)
+        self.active.extend(workers)
+        return True
+
+    def replace(self, old: Worker) -> bool:
+        # El sustituto acepta conexiones antes de parar al anterior
+        if not self.start():
+            return False
+        self.stop(old)
+        return True
+
+    def handle_signal(self, signum, frame):
+        if signum == getattr(signal, "SIGHUP", None):
+            self.reload = True
+        else:
+            self.shutdown = True
+
+    def run(self) -> int:
+        self.bind()
+        for signum in (signal.SIGTERM, signal.SIGINT, getattr(signal, "SIGHUP", None)):
+            if signum is not None:
+                signal.signal(signum, self.handle_signal)
+        logger.info("Listening on %s:%d with %d workers (pid %d)", self.host, self.port, self.workers, os.getpid())
+
+        exit_code = 0
+        if not self.start(self.workers):
+            logger.error("Could not start the workers, exiting")
+            self.shutdown, exit_code = True, 1
+        else:
+            logger.info("%d workers ready", self.workers)
+
+        while not self.shutdown:
+            self.poll(0.5)
+            if self.reload:
+                self.reload = False
+                logger.info("Rolling restart of %d workers", len(self.active))
+                for worker in list(self.active):
+                    if self.shutdown or not self.replace(worker):
+                        logger.error("Rolling restart aborted; the remaining workers keep running")
+                        break
+            while self.retire and not self.shutdown:
+                worker = self.retire.pop(0)
+                if worker in self.active and not self.replace(worker):
+                    # Sigue atendiendo; lo volverá a pedir otro worker o un SIGHUP
+                    logger.error("Could not recycle worker %d", worker.pid)
+            while self.dead and not self.shutdown:
+                worker = self.dead.pop(0)
+                worker.process.join()
+                logger.warning("Worker %d died (exit code %s), replacing it", worker.pid, worker.process.exitcode)
+                if not self.start():
+                    # Se reintenta en la siguiente vuelta
+                    self.dead.append(worker)
+                    time.sleep(1)
+
+        logger.info("Shutting down %d workers", len(self.active))
+        for worker in list(self.active):
+            self.stop(worker)
+        while self.stopping:
+            self.poll(0.1)
+        self.socket.close()
+        return exit_code
+
+def run(app: str, host: str = SERVER_HOST, port: int = SERVER_PORT, workers: int = SERVER_WORKERS,
+        log_level: str = "info") -> int:
+    """Arranca el maestro y bloquea hasta la parada; devuelve el código de salida."""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s")
+    return Supervisor(app, host, port, workers, log_level).run()
@@ -0,0 +1,219 @@
+# utils/storage.py
+# Contenido de los archivos subidos, direccionado por su SHA-256, bajo
+# FILES_STORAGE_DIR:
+#   blobs/ab/cd/<sha256>   un blob por contenido: los duplicados lo comparten
+#   tmp/                   subidas en curso y blobs a punto de borrarse
+#   uploads/<upload_id>/   partes de las subidas reanudables
+# El cuerpo se escribe a disco según llega y se hashea a la vez, por bloques
+# de FILES_CHUNK_SIZE en un hilo: la memoria por subida no depende del tamaño
+# del archivo. Todo son renombrados dentro del mismo directorio raíz, así que
+# varios workers (o máquinas con el mismo volumen) pueden compartirlo.
+import asyncio
+import hashlib
+import os
+import secrets
+import shutil
+import time
+from collections import namedtuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+
+import models
+
+FILES_STORAGE_DIR = os.path.abspath(os.getenv("FILES_STORAGE_DIR", "storage"))
+FILES_MAX_BYTES = int(os.getenv("FILES_MAX_BYTES", str(10 * 1024 ** 3)))
+FILES_MAX_PARTS = int(os.getenv("FILES_MAX_PARTS", "10000"))
+FILES_CHUNK_SIZE = int(os.getenv("FILES_CHUNK_SIZE", str(1024 * 1024)))
+FILES_UPLOAD_TTL_HOURS = float(os.getenv("FILES_UPLOAD_TTL_HOURS", "24"))
+# Prefijo de una location `internal` de nginx que apunta a blobs/: la descarga
+# la envía nginx con sendfile (X-Accel-Redirect) y el worker queda libre
+FILES_X_ACCEL_REDIRECT = os.getenv("FILES_X_ACCEL_REDIRECT", "").rstrip("/")
+
+# Archivo recibido en tmp/, pendiente de commit_blob() o discard()
+Stored = namedtuple("Stored", "path content_hash size")
+
+# Como mucho una búsqueda de subidas caducadas por minuto y proceso
+_PURGE_INTERVAL = 60
+_last_purge = 0.0
+
+def _path(*parts) -> str:
+    return os.path.join(FILES_STORAGE_DIR, *parts)
+
+def blob_relpath(content_hash: str) -> str:
+    return f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+def blob_path(content_hash: str) -> str:
+    return _path("blobs", blob_relpath(content_hash))
+
+def accel_path(content_hash: str) -> str:
+    return f"{FILES_X_ACCEL_REDIRECT}/{blob_relpath(content_hash)}"
+
+def _temp_path() -> str:
+    os.makedirs(_path("tmp"), exist_ok=True)
+    return _path("tmp", secrets.token_hex(16))
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def too_large(limit: int = FILES_MAX_BYTES) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"File exceeds the {limit} byte limit"
+    )
+
+def check_length(request, limit: int = FILES_MAX_BYTES):
+    # Con Content-Length se rechaza antes de leer nada (y antes del
+    # `100 Continue` si el cliente lo espera)
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise too_large(limit)
+
+def _write(file, hasher, data):
+    hasher.update(data)
+    file.write(data)
+
+async def receive(request, path: str = None, limit: int = FILES_MAX_BYTES) -> Stored:
+    """Escribe el cuerpo de la petición en `path` (por defecto en tmp/) según llega.
+
+    Si el cliente se corta o pasa de `limit`, el archivo parcial se borra.
+    """
+    path = path or _temp_path()
+    hasher = hashlib.sha256()
+    size = 0
+    buffer = bytearray()
+    file = await asyncio.to_thread(open, path, "wb")
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > limit:
+                raise too_large(limit)
+            buffer += chunk
+            if len(buffer) >= FILES_CHUNK_SIZE:
+                await asyncio.to_thread(_write, file, hasher, buffer)
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(_write, file, hasher, buffer)
+        await asyncio.to_thread(file.close)
+    except BaseException:
+        file.close()
+        _unlink(path)
+        raise
+    return Stored(path, hasher.hexdigest(), size)
+
+def commit_blob(stored: Stored):
+    # Tras el commit de la fila. Se reemplaza aunque el blob ya exista (mismo
+    # contenido): así queda en su sitio aunque un release() concurrente del
+    # mismo hash acabe de retirarlo
+    target = blob_path(stored.content_hash)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(stored.path, target)
+
+def discard(stored: Stored):
+    _unlink(stored.path)
+
+async def _referenced(db, content_hash: str) -> bool:
+    found = await db.scalar(
+        select(models.File.file_id).where(models.File.content_hash == content_hash).limit(1)
+    )
+    # Fin de la transacción: la siguiente comprobación ve los commits nuevos
+    await db.rollback()
+    return found is not None
+
+async def release(db, hashes):
+    """Borra los blobs que ya no referencia ninguna fila de files.
+
+    Llamar tras el commit del borrado. El blob se retira primero a tmp/ y se
+    vuelve a comprobar: si entretanto se ha guardado el mismo contenido, vuelve
+    a su sitio (y quien lo guardó lo repone también en commit_blob()).
+    """
+    for content_hash in set(filter(None, hashes)):
+        if await _referenced(db, content_hash):
+            continue
+        target, trash = blob_path(content_hash), _temp_path()
+        try:
+            os.rename(target, trash)
+        except FileNotFoundError:
+            continue
+        if await _referenced(db, content_hash):
+            os.replace(trash, target)
+        else:
+            await asyncio.to_thread(_unlink, trash)
+
+### Subidas reanudables ###
+def upload_dir(upload_id: str) -> str:
+    return _path("uploads", upload_id)
+
+def new_upload() -> str:
+    # El directorio se crea antes que la fila: una fila sin directorio es una
+    # subida purgada o terminada
+    upload_id = secrets.token_hex(16)
+    os.makedirs(upload_dir(upload_id))
+    return upload_id
+
+def _upload_gone() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+
+async def receive_part(request, upload_id: str, part_number: int) -> int:
+    # Cada envío va a su propio .partial y se renombra al terminar: una parte
+    # reenviada sustituye entera a la anterior, y una cortada no deja nada
+    partial = os.path.join(upload_dir(upload_id), f"{part_number}.{secrets.token_hex(4)}.partial")
+    try:
+        stored = await receive(request, path=partial)
+        os.replace(partial, os.path.join(upload_dir(upload_id), str(part_number)))
+    except FileNotFoundError:
+        # Completada, cancelada o purgada mientras llegaba la parte
+        _unlink(partial)
+        raise _upload_gone()
+    return stored.size
+
+def list_parts(upload_id: str) -> list:
+    # [(número, tamaño)] de las partes completas, en orden
+    try:
+        entries = list(os.scandir(upload_dir(upload_id)))
+    except FileNotFoundError:
+        raise _upload_gone()
+    return sorted(
+        (int(entry.name), entry.stat().st_size) for entry in entries if entry.name.isdigit()
+    )
+
+def assemble(upload_id: str, part_numbers: list) -> Stored:
+    # Concatena las partes en tmp/ hasheando a la vez, con un único búfer
+    path = _temp_path()
+    hasher = hashlib.sha256()
+    size = 0
+    buffer = bytearray(FILES_CHUNK_SIZE)
+    view = memoryview(buffer)
+    try:
+        with open(path, "wb") as out:
+            for part_number in part_numbers:
+                with open(os.path.join(upload_dir(upload_id), str(part_number)), "rb") as part:
+                    while read := part.readinto(buffer):
+                        hasher.update(view[:read])
+                        out.write(view[:read])
+                        size += read
+    except BaseException:
+        _unlink(path)
+        raise
+    return Stored(path, hasher.hexdigest(), size)
+
+def remove_upload(upload_id: str):
+    shutil.rmtree(upload_dir(upload_id), ignore_errors=True)
+
+def stale_uploads() -> list:
+    # Subidas sin partes nuevas en FILES_UPLOAD_TTL_HOURS (el directorio
+    # cambia de mtime con cada parte)
+    global _last_purge
+    now = time.time()
+    if now - _last_purge < _PURGE_INTERVAL:
+        return []
+    _last_purge = now
+    cutoff = now - FILES_UPLOAD_TTL_HOURS * 3600
+    try:
+        entries = list(os.scandir(_path("uploads")))
+    except FileNotFoundError:
+        return []
+    return [entry.name for entry in entries if entry.stat().st_mtime < cutoff]
@@ -343,8 +343,8 @@ const handleProjectEditSubmit = async (e) => {
                         : project.description}
                     </p>
                     <div className="card-footer">
-                      <span>Miembros: {project.members?.length || 0}</span>
-                      <span>Tareas: {project.tasks?.length || 0}</span>
+                      <span>Miembros: {project.stats?.member_count || 0}</span>
+                      <span>Tareas: {project.stats?.task_count || 0}</span>
                     </div>
                   </div>
                   
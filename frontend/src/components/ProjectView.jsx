@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { projectService, taskService, userService, membershipService } from '../services/api';
+import { projectService, taskService, userService, membershipService, eventService } from '../services/api';
 import NavBar from './NavBar';
 import './ProjectView.css';
 
@@ -71,6 +71,11 @@ const ProjectView = () => {
     loadProjectData();
   }, [projectId, loadProjectData]);
 
+  useEffect(() => {
+    // Recargar cuando el proyecto cambia en el servidor (también por otros usuarios)
+    return eventService.subscribeToProject(projectId, () => loadProjectData());
+  }, [projectId, loadProjectData]);
+
   const handleEditSubmit = async (e) => {
     e.preventDefault();
     try {
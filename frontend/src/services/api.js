@@ -2,6 +2,23 @@ import axios from 'axios';
 
 const BASE_URL = "http://localhost:8000/api";
 
+// Los listados del backend vienen paginados como { items, next_cursor }:
+// se sigue next_cursor hasta que llegue a null para devolver la lista completa
+const PAGE_LIMIT = 500;
+
+const fetchAllPages = async (url, config = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const params = { limit: PAGE_LIMIT, ...(config.params || {}) };
+    if (cursor) params.cursor = cursor;
+    const response = await axios.get(url, { ...config, params });
+    items.push(...response.data.items);
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return items;
+};
+
 axios.interceptors.request.use(
   (config) => {
       const token = localStorage.getItem('token');
@@ -90,8 +107,8 @@ const commentService = {
   // Obtener todos los comentarios (con opciones de filtrado)
   getComments: async (params = {}) => {
     try {
-      const response = await axios.get(`${BASE_URL}/comments/`, { params });
-      return response.data;
+      const items = await fetchAllPages(`${BASE_URL}/comments/`, { params });
+      return items;
     } catch (error) {
       throw error;
     }
@@ -130,8 +147,8 @@ const commentService = {
   // Obtener comentarios de un proyecto específico
   getProjectComments: async (projectId, params = {}) => {
     try {
-      const response = await axios.get(`${BASE_URL}/comments/project/${projectId}/comments`, { params });
-      return response.data;
+      const items = await fetchAllPages(`${BASE_URL}/comments/project/${projectId}/comments`, { params });
+      return items;
     } catch (error) {
       throw error;
     }
@@ -140,8 +157,8 @@ const commentService = {
   // Obtener comentarios de un usuario específico
   getUserComments: async (userId, params = {}) => {
     try {
-      const response = await axios.get(`${BASE_URL}/comments/user/${userId}/comments`, { params });
-      return response.data;
+      const items = await fetchAllPages(`${BASE_URL}/comments/user/${userId}/comments`, { params });
+      return items;
     } catch (error) {
       throw error;
     }
@@ -163,8 +180,8 @@ const membershipService = {
     // Obtener todas las membresías (con opciones de filtrado)
     getMemberships: async (params = {}) => {
       try {
-        const response = await axios.get(`${BASE_URL}/memberships/`, { params });
-        return response.data;
+        const items = await fetchAllPages(`${BASE_URL}/memberships/`, { params });
+        return items;
       } catch (error) {
         throw error;
       }
@@ -203,8 +220,8 @@ const membershipService = {
     // Obtener membresías de un usuario específico
     getUserMemberships: async (userId) => {
       try {
-        const response = await axios.get(`${BASE_URL}/memberships/user/${userId}/memberships`);
-        return response.data;
+        const items = await fetchAllPages(`${BASE_URL}/memberships/user/${userId}/memberships`);
+        return items;
       } catch (error) {
         throw error;
       }
@@ -213,9 +230,9 @@ const membershipService = {
     // Obtener membresías de un proyecto específico
     getProjectMemberships: async (projectId) => {
       try {
-        const response = await axios.get(`${BASE_URL}/memberships/project/${projectId}/memberships`);
-        console.log('Respuesta de membresías:', response.data);
-        return response.data;
+        const items = await fetchAllPages(`${BASE_URL}/memberships/project/${projectId}/memberships`);
+        console.log('Respuesta de membresías:', items);
+        return items;
       } catch (error) {
         console.error('Error al obtener membresías:', error);
         throw error;
@@ -248,16 +265,13 @@ const membershipService = {
     getProjects: async () => {
       try {
           const token = localStorage.getItem('token');
-          const response = await axios.get(`${BASE_URL}/projects/`, {
+          const items = await fetchAllPages(`${BASE_URL}/projects/`, {
               headers: {
                   'Authorization': `Bearer ${token}`
-              },
-              params: {
-                  limit: 100 // Asegurarse de pedir suficientes proyectos
               }
           });
-          console.log('Respuesta completa de proyectos:', response.data);
-          return response.data;
+          console.log('Respuesta completa de proyectos:', items);
+          return items;
       } catch (error) {
           console.error('Error al obtener proyectos:', error);
           throw error;
@@ -307,12 +321,12 @@ const membershipService = {
     // Obtener proyectos de un usuario específico
     getUserProjects: async (userId, params = {}) => {
       try {
-        const response = await axios.get(`${BASE_URL}/projects/user/${userId}/projects`, {
+        const items = await fetchAllPages(`${BASE_URL}/projects/user/${userId}/projects`, {
           params: {
             status: params.status
           }
         });
-        return response.data;
+        return items;
       } catch (error) {
         throw error;
       }
@@ -445,13 +459,13 @@ updateTask: async (taskId, updateData) => {
         }
 
         console.log('Obteniendo tareas del proyecto:', projectId);
-        const response = await axios.get(`${BASE_URL}/tasks/project/${projectId}/tasks`, {
+        const items = await fetchAllPages(`${BASE_URL}/tasks/project/${projectId}/tasks`, {
           headers: {
             'Authorization': `Bearer ${token}`
           }
         });
-        console.log('Respuesta de tareas del proyecto:', response.data);
-        return response.data;
+        console.log('Respuesta de tareas del proyecto:', items);
+        return items;
       } catch (error) {
         console.error('Error en getProjectTasks:', error);
         throw error;
@@ -471,14 +485,14 @@ updateTask: async (taskId, updateData) => {
           console.log('URL:', `${BASE_URL}/tasks/user/${userId}/tasks`);
           console.log('Token:', token);
         
-          const response = await axios.get(`${BASE_URL}/tasks/user/${userId}/tasks`, {
+          const items = await fetchAllPages(`${BASE_URL}/tasks/user/${userId}/tasks`, {
               headers: {
                   'Authorization': `Bearer ${token}`
               }
           });
         
-          console.log('Respuesta del servidor (tareas):', response.data);
-          return response.data;
+          console.log('Respuesta del servidor (tareas):', items);
+          return items;
       } catch (error) {
           console.error('Error detallado en getUserTasks:', error.response || error);
           throw error;
@@ -502,14 +516,14 @@ updateTask: async (taskId, updateData) => {
     // Obtener todos los usuarios
     getUsers: async () => {
       try {
-        const response = await axios.get(`${BASE_URL}/users/`, {
+        const items = await fetchAllPages(`${BASE_URL}/users/`, {
           headers: {
             'Authorization': `Bearer ${localStorage.getItem('token')}`
           }
         });
         
-        console.log('Respuesta de usuarios:', response.data); // Para debugging
-        return response.data;
+        console.log('Respuesta de usuarios:', items); // Para debugging
+        return items;
       } catch (error) {
         console.error('Error en getUsers:', error);
         throw error;
@@ -557,13 +571,38 @@ updateTask: async (taskId, updateData) => {
     }
   };
 
+// Cambios de un proyecto en tiempo real (Server-Sent Events) en lugar de
+// volver a pedir tareas y comentarios. EventSource no admite cabeceras, así
+// que el token va en la query; al reconectar envía Last-Event-ID y el servidor
+// reenvía lo perdido (o un evento "reset" si ya no lo tiene).
+const PROJECT_EVENT_TYPES = [
+  'task.created', 'task.updated', 'task.deleted', 'tasks.changed',
+  'comment.created', 'comment.updated', 'comment.deleted',
+  'membership.created', 'membership.updated', 'membership.deleted', 'memberships.changed',
+  'project.updated', 'project.deleted', 'reset'
+];
+
+const eventService = {
+  // Devuelve la función que cierra la suscripción
+  subscribeToProject: (projectId, onEvent) => {
+    const token = localStorage.getItem('token');
+    const source = new EventSource(
+      `${BASE_URL}/events/${projectId}?access_token=${encodeURIComponent(token || '')}`
+    );
+    const handler = (message) => onEvent(JSON.parse(message.data));
+    PROJECT_EVENT_TYPES.forEach((type) => source.addEventListener(type, handler));
+    return () => source.close();
+  }
+};
+
   export {
     authService,
     membershipService,
     commentService,
     projectService,
     taskService,
-    userService
+    userService,
+    eventService
   };
 
 // Exportar la función loginUser directamente para facilitar su uso